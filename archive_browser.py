@@ -0,0 +1,302 @@
+import os
+import stat
+import time
+import tarfile
+import zipfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from archive_extractor import CHUNK, member_parts
+from copy_engine import unique_destination
+from event_loop import notify
+from jobs import Job, device_of
+from panel import DirectoryLoader, FileEntry, ResultPanel, sort_entries
+
+# Archive suffix -> tarfile compression ('zip' for zip files)
+ARCHIVE_MODES = {
+    ".zip": "zip",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.xz": "xz",
+    ".tar.bz2": "bz2",
+    ".tar": "",
+}
+
+# Member indexes kept in memory, keyed by (path, size, mtime_ns)
+INDEX_CACHE_SIZE = 8
+
+_cache: "OrderedDict[Tuple[str, int, int], ArchiveIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def archive_mode(name: str) -> Optional[str]:
+    lower = name.lower()
+    for suffix, mode in ARCHIVE_MODES.items():
+        if lower.endswith(suffix):
+            return mode
+    return None
+
+
+class ArchiveIndex:
+    """Directory tree of an archive's members, built without extracting.
+
+    Zips are read from the central directory; tars are scanned once (one
+    decompression pass, nothing written). Member names are normalized the
+    same way extraction does, so '..' and absolute paths cannot escape.
+    """
+
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        self.members: Dict[str, object] = {}  # inner path -> ZipInfo/TarInfo
+        self.children: Dict[str, Dict[str, bool]] = {"": {}}  # dir -> {name: is_dir}
+
+    def build(self, cancelled=lambda: False):
+        if self.mode == "zip":
+            with zipfile.ZipFile(self.path) as archive:
+                for info in archive.infolist():
+                    self._add(info.filename, info, info.is_dir())
+        else:
+            with tarfile.open(self.path, f"r:{self.mode}") as archive:
+                for info in archive:
+                    if cancelled():
+                        raise InterruptedError("cancelled")
+                    self._add(info.name, info, info.isdir())
+        return self
+
+    def _add(self, name: str, info, is_dir: bool):
+        parts = member_parts(name)
+        if not parts:
+            return
+        # Parent directories are often implied rather than listed
+        for depth in range(len(parts)):
+            parent = "/".join(parts[:depth])
+            child_is_dir = is_dir or depth < len(parts) - 1
+            self.children.setdefault(parent, {})[parts[depth]] = child_is_dir
+            if child_is_dir:
+                self.children.setdefault("/".join(parts[: depth + 1]), {})
+        self.members["/".join(parts)] = info
+
+    def stat_for(self, inner: str, is_dir: bool) -> os.stat_result:
+        info = self.members.get(inner)
+        size, mtime, mode, uid, gid = 0, 0.0, 0, os.getuid(), os.getgid()
+        if isinstance(info, zipfile.ZipInfo):
+            size = info.file_size
+            mtime = _zip_mtime(info)
+            mode = info.external_attr >> 16
+        elif isinstance(info, tarfile.TarInfo):
+            size, mtime, mode, uid, gid = info.size, info.mtime, info.mode, info.uid, info.gid
+        kind = stat.S_IFDIR if is_dir else stat.S_IFREG
+        perms = stat.S_IMODE(mode) or (0o755 if is_dir else 0o644)
+        # st_ino 0 marks the entry as synthetic (no real file behind it)
+        return os.stat_result((kind | perms, 0, 0, 1, uid, gid, size, mtime, mtime, mtime))
+
+    def list_dir(self, inner: str) -> List[FileEntry]:
+        entries = []
+        for name, is_dir in self.children.get(inner, {}).items():
+            child = f"{inner}/{name}" if inner else name
+            entries.append(FileEntry(
+                name, os.path.join(self.path, child), is_dir, False, self.stat_for(child, is_dir)
+            ))
+        sort_entries(entries)
+        return entries
+
+    def files_under(self, inner: str) -> List[str]:
+        """Inner paths of all regular file members at or below inner"""
+        if inner in self.members and inner not in self.children:
+            return [inner]
+        prefix = inner + "/" if inner else ""
+        return [
+            name for name, info in self.members.items()
+            if name.startswith(prefix) and _is_regular(info)
+        ]
+
+    def dirs_under(self, inner: str) -> List[str]:
+        prefix = inner + "/" if inner else ""
+        return [d for d in self.children if d == inner or d.startswith(prefix)]
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+def _is_regular(info) -> bool:
+    if isinstance(info, zipfile.ZipInfo):
+        return not info.is_dir()
+    return info.isreg()
+
+
+def _cache_key(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_size, st.st_mtime_ns
+
+
+def cached_index(path: str) -> Optional[ArchiveIndex]:
+    key = _cache_key(path)
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+        return index
+
+
+def load_index(path: str, cancelled=lambda: False) -> ArchiveIndex:
+    """Index of an archive, built once per (path, size, mtime)"""
+    index = cached_index(path)
+    if index is not None:
+        return index
+    key = _cache_key(path)
+    index = ArchiveIndex(path, archive_mode(path)).build(cancelled)
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+class ArchiveLoader(DirectoryLoader):
+    """Lists one directory inside an archive, indexing the archive if needed"""
+
+    def __init__(self, archive_path: str, inner: str):
+        self.archive_path = archive_path
+        self.inner = inner
+        self.index: Optional[ArchiveIndex] = cached_index(archive_path)
+        super().__init__(archive_path)
+
+    def _run(self):
+        entries: List[FileEntry] = []
+        try:
+            if self.index is None:
+                self.index = load_index(self.archive_path, lambda: self.cancelled)
+            entries = self.index.list_dir(self.inner)
+        except (OSError, EOFError, InterruptedError, tarfile.TarError, zipfile.BadZipFile) as e:
+            self.error = e if isinstance(e, OSError) else OSError(str(e))
+        with self.lock:
+            self.pending.extend(entries)
+            self.result = entries
+            self.done = True
+        notify()
+
+
+class ArchivePanel(ResultPanel):
+    """Read-only virtual panel showing a directory inside an archive"""
+
+    def __init__(self, archive_path: str, origin, inner=""):
+        self.archive_path = archive_path
+        self.inner = inner
+        super().__init__(self._title(), origin, ArchiveLoader(archive_path, inner))
+
+    def _title(self) -> str:
+        return os.path.join(self.archive_path, self.inner) if self.inner else self.archive_path
+
+    def summary(self) -> str:
+        if self.loader is not None and self.loader.index is None:
+            return "indexing archive"
+        if self._last_source.error is not None:
+            return f"Error: {self._last_source.error}"
+        return f"{len(self.files)} entries{self.mark_summary()}"
+
+    def _drop_missing(self):
+        pass  # members are not files on disk
+
+    def inner_path(self, entry: FileEntry) -> str:
+        return os.path.relpath(entry.path, self.archive_path)
+
+    def enter_directory(self):
+        entry = self.get_selected_entry()
+        if entry and entry.is_dir:
+            self._show(self.inner_path(entry))
+
+    def go_up(self) -> bool:
+        """Parent directory inside the archive, False at its root"""
+        if not self.inner:
+            return False
+        parent, _, name = self.inner.rpartition("/")
+        self._show(parent, name)
+        return True
+
+    def _show(self, inner: str, select_name=""):
+        self.cancel_loading()
+        self.inner = inner
+        self.path = self._title()
+        self.cursor_pos = 0
+        self.scroll_offset = 0
+        self.select_after_load = select_name
+        self.clear_marks()
+        self._source = ArchiveLoader(self.archive_path, inner)
+        self.refresh_files()
+
+
+class MemberCopyJob(Job):
+    """Copies archive members (files or whole subtrees) out to a directory"""
+
+    kind = "Extract"
+
+    def __init__(self, archive_path: str, inner_paths: List[str], dest_dir: str):
+        title = os.path.basename(inner_paths[0]) if len(inner_paths) == 1 else f"{len(inner_paths)} members"
+        super().__init__(title, device_of(dest_dir))
+        self.archive_path = archive_path
+        self.inner_paths = inner_paths
+        self.dest_dir = dest_dir
+        self.touched = [dest_dir]
+        self.result = f"Copied {title} out of {os.path.basename(archive_path)}"
+
+    def work(self):
+        index = load_index(self.archive_path, lambda: self.cancelled)
+        self.checkpoint()
+
+        targets: List[Tuple[str, str]] = []  # (member, destination file)
+        for inner in self.inner_paths:
+            root = unique_destination(os.path.join(self.dest_dir, inner.rpartition("/")[2]))
+            if inner in index.children:
+                for d in index.dirs_under(inner):
+                    os.makedirs(os.path.join(root, os.path.relpath(d, inner)), exist_ok=True)
+                for name in index.files_under(inner):
+                    targets.append((name, os.path.join(root, os.path.relpath(name, inner))))
+            else:
+                targets.append((inner, root))
+
+        self.total_files = len(targets)
+        self.total_bytes = sum(index.stat_for(name, False).st_size for name, _t in targets)
+
+        if index.mode == "zip":
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for name, target in targets:
+                    with archive.open(index.members[name]) as src:
+                        self._write(name, src, target)
+        else:
+            # Compressed tars only seek forward cheaply, so go in archive order
+            targets.sort(key=lambda t: index.members[t[0]].offset_data)
+            with tarfile.open(self.archive_path, f"r:{index.mode}") as archive:
+                for name, target in targets:
+                    info = index.members[name]
+                    with archive.extractfile(info) as src:
+                        self._write(name, src, target)
+                    os.chmod(target, stat.S_IMODE(info.mode) & 0o755 | 0o600)
+
+    def _write(self, name: str, src, target: str):
+        self.current = name
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            with open(target, "wb") as dst:
+                while True:
+                    self.checkpoint()
+                    data = src.read(CHUNK)
+                    if not data:
+                        break
+                    dst.write(data)
+                    self.done_bytes += len(data)
+        except BaseException:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
+        self.done_files += 1
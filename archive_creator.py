@@ -0,0 +1,363 @@
+import os
+import gzip
+import lzma
+import stat
+import time
+import zlib
+import struct
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from archive_extractor import pool_context
+from copy_engine import remove_path
+from jobs import Job, device_of
+
+# Processes compressing blocks or members side by side
+COMPRESS_WORKERS = os.cpu_count() or 2
+# Inputs smaller than this are compressed without a process pool
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+# Independent compression units of the tar stream
+GZ_BLOCK = 4 * 1024 * 1024
+XZ_BLOCK = 16 * 1024 * 1024
+# Zip members up to this size are deflated in the pool, larger ones streamed
+ZIP_POOL_MAX = 32 * 1024 * 1024
+CHUNK = 1024 * 1024
+LEVEL = 6
+
+# Output suffix -> format
+CREATE_FORMATS = {
+    ".zip": "zip",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.xz": "xz",
+}
+
+
+def create_format(name: str) -> Optional[str]:
+    lower = name.lower()
+    for suffix, fmt in CREATE_FORMATS.items():
+        if lower.endswith(suffix):
+            return fmt
+    return None
+
+
+# ----- pool workers -----
+def _gzip_block(data: bytes) -> bytes:
+    # Every block is a complete gzip member; gzip readers concatenate them
+    return gzip.compress(data, compresslevel=LEVEL, mtime=0)
+
+
+def _xz_block(data: bytes) -> bytes:
+    # Every block is a complete .xz stream; xz readers concatenate them
+    return lzma.compress(data, preset=LEVEL)
+
+
+def _deflate_file(path: str) -> Tuple[int, int, bytes]:
+    """(crc32, size, raw deflate data) of a whole file"""
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, -15)
+    crc = size = 0
+    parts = []
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(CHUNK)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            parts.append(compressor.compress(data))
+    parts.append(compressor.flush())
+    return crc, size, b"".join(parts)
+
+
+def _done_future(fn, *args) -> Future:
+    """Run fn right away, wrapped like a pool result"""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class _BlockWriter:
+    """File-like sink for a streaming tarfile that compresses fixed blocks
+    on the pool and writes the results to out in their original order."""
+
+    def __init__(self, job, out, submit, compress, block_size, max_pending):
+        self.job = job
+        self.out = out
+        self.submit = submit
+        self.compress = compress
+        self.block_size = block_size
+        self.max_pending = max_pending
+        self.buffer = bytearray()
+        self.pending = deque()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.job.tar_bytes += len(data)
+        while len(self.buffer) >= self.block_size:
+            self._emit(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return len(data)
+
+    def _emit(self, block: bytes):
+        self.job.checkpoint()
+        self.pending.append(self.submit(self.compress, block))
+        while len(self.pending) > self.max_pending:
+            self._write_oldest()
+
+    def _write_oldest(self):
+        self.out.write(self.pending.popleft().result())
+        self.job.done_bytes = min(self.job.tar_bytes, self.job.total_bytes)
+
+    def close(self):
+        if self.buffer:
+            self._emit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self._write_oldest()
+
+
+class _ZipWriter:
+    """Minimal zip writer for members deflated elsewhere (zip64 aware)"""
+
+    def __init__(self, out):
+        self.out = out
+        self.records = []
+
+    @staticmethod
+    def _dos_time(mtime: float) -> Tuple[int, int]:
+        t = time.localtime(max(mtime, 315532800))  # zip dates start in 1980
+        return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+    def begin(self, name: str, mode: int, mtime: float, method: int, large=False) -> dict:
+        """Write a local header with placeholder sizes, returns its record"""
+        record = {
+            "name": name.encode("utf-8"), "mode": mode, "method": method,
+            "offset": self.out.tell(), "crc": 0, "csize": 0, "usize": 0,
+            "large": large, "time": self._dos_time(mtime),
+        }
+        self._local_header(record)
+        self.records.append(record)
+        return record
+
+    def _local_header(self, record: dict):
+        large = record["large"]
+        extra = struct.pack("<HHQQ", 1, 16, record["usize"], record["csize"]) if large else b""
+        self.out.write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if large else 20, 0x0800, record["method"],
+            record["time"][0], record["time"][1], record["crc"],
+            0xFFFFFFFF if large else record["csize"],
+            0xFFFFFFFF if large else record["usize"],
+            len(record["name"]), len(extra),
+        ))
+        self.out.write(record["name"])
+        self.out.write(extra)
+
+    def finish(self, record: dict, crc: int, csize: int, usize: int):
+        """Patch sizes and CRC into the local header after the data"""
+        record.update(crc=crc, csize=csize, usize=usize)
+        if not record["large"] and max(csize, usize) >= 0xFFFFFFFF:
+            raise OSError(f"{record['name'].decode()}: grew past 4GB while being zipped")
+        end = self.out.tell()
+        self.out.seek(record["offset"])
+        self._local_header(record)
+        self.out.seek(end)
+
+    def add(self, name: str, mode: int, mtime: float, method: int, crc: int, usize: int, data: bytes):
+        record = self.begin(name, mode, mtime, method, large=usize >= 0xFFFFFFFF)
+        self.out.write(data)
+        self.finish(record, crc, len(data), usize)
+
+    def close(self):
+        cd_offset = self.out.tell()
+        for r in self.records:
+            fields = []
+            usize, csize, offset = r["usize"], r["csize"], r["offset"]
+            if usize >= 0xFFFFFFFF:
+                fields.append(usize)
+                usize = 0xFFFFFFFF
+            if csize >= 0xFFFFFFFF:
+                fields.append(csize)
+                csize = 0xFFFFFFFF
+            if offset >= 0xFFFFFFFF:
+                fields.append(offset)
+                offset = 0xFFFFFFFF
+            extra = struct.pack(f"<HH{len(fields)}Q", 1, 8 * len(fields), *fields) if fields else b""
+            self.out.write(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | 45, 45 if fields or r["large"] else 20,
+                0x0800, r["method"], r["time"][0], r["time"][1], r["crc"], csize, usize,
+                len(r["name"]), len(extra), 0, 0, 0, (r["mode"] & 0xFFFF) << 16, offset,
+            ))
+            self.out.write(r["name"])
+            self.out.write(extra)
+        cd_size = self.out.tell() - cd_offset
+        count = len(self.records)
+
+        if count >= 0xFFFF or cd_offset >= 0xFFFFFFFF or cd_size >= 0xFFFFFFFF:
+            zip64_end = self.out.tell()
+            self.out.write(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, (3 << 8) | 45, 45, 0, 0, count, count, cd_size, cd_offset
+            ))
+            self.out.write(struct.pack("<IIQI", 0x07064B50, 0, zip64_end, 1))
+            count, cd_size, cd_offset = 0xFFFF, min(cd_size, 0xFFFFFFFF), 0xFFFFFFFF
+        self.out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+
+class CreateArchiveJob(Job):
+    """Packs files and directories into a .zip, .tar.gz or .tar.xz.
+
+    tar.gz and tar.xz split the tar stream into blocks compressed on a
+    process pool and written as concatenated gzip members or xz streams.
+    Zip members are deflated on the pool and written in completion order.
+    """
+
+    kind = "Compress"
+
+    def __init__(self, sources: List[str], dest: str):
+        super().__init__(os.path.basename(dest), device_of(os.path.dirname(dest)))
+        self.sources = sources
+        self.dest = dest
+        self.fmt = create_format(dest)
+        self.touched = [os.path.dirname(dest)]
+        self.tar_bytes = 0
+        self.result = f"Created {os.path.basename(dest)}"
+
+    def work(self):
+        items = self._plan()
+        self.total_files = len(items)
+        self.total_bytes = sum(size for _p, _a, size, _st in items)
+
+        workers = COMPRESS_WORKERS if self.total_bytes >= PARALLEL_MIN_BYTES else 1
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+            submit = pool.submit
+        else:
+            submit = _done_future
+
+        try:
+            with open(self.dest, "xb") as out:
+                if self.fmt == "zip":
+                    self._write_zip(out, items, submit, workers)
+                else:
+                    self._write_tar(out, submit, workers)
+        except BaseException:
+            try:
+                remove_path(self.dest)
+            except OSError:
+                pass
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def _plan(self) -> List[Tuple[str, str, int, os.stat_result]]:
+        """(path, archive name, size, lstat) for everything to pack"""
+        items = []
+        for src in self.sources:
+            base = os.path.dirname(os.path.abspath(src))
+            paths = [src]
+            if os.path.isdir(src) and not os.path.islink(src):
+                for root, dirs, files in os.walk(src):
+                    dirs.sort()
+                    paths.extend(os.path.join(root, name) for name in dirs + sorted(files))
+            for path in paths:
+                self.checkpoint()
+                try:
+                    st = os.lstat(path)
+                except OSError as e:
+                    self.errors.append(f"{path}: {e.strerror or e}")
+                    continue
+                size = st.st_size if stat.S_ISREG(st.st_mode) else 0
+                items.append((path, os.path.relpath(path, base), size, st))
+        return items
+
+    # ----- tar.gz / tar.xz -----
+    def _write_tar(self, out, submit, workers):
+        compress = _gzip_block if self.fmt == "gz" else _xz_block
+        block = GZ_BLOCK if self.fmt == "gz" else XZ_BLOCK
+        sink = _BlockWriter(self, out, submit, compress, block, max_pending=workers * 2)
+        with tarfile.open(fileobj=sink, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            for src in self.sources:
+                self._add_tar(tar, src, os.path.basename(os.path.abspath(src)))
+        sink.close()
+        self.done_bytes = self.total_bytes
+
+    def _add_tar(self, tar, path, arcname):
+        self.checkpoint()
+        self.current = arcname
+        try:
+            tar.add(path, arcname, recursive=False)
+        except OSError as e:
+            self.errors.append(f"{path}: {e.strerror or e}")
+            return
+        self.done_files += 1
+        if os.path.isdir(path) and not os.path.islink(path):
+            try:
+                names = sorted(os.listdir(path))
+            except OSError as e:
+                self.errors.append(f"{path}: {e.strerror or e}")
+                return
+            for name in names:
+                self._add_tar(tar, os.path.join(path, name), f"{arcname}/{name}")
+
+    # ----- zip -----
+    def _write_zip(self, out, items, submit, workers):
+        writer = _ZipWriter(out)
+        pending = deque()
+
+        def drain(limit):
+            while len(pending) > limit:
+                arcname, st, future = pending.popleft()
+                crc, usize, data = future.result()
+                writer.add(arcname, st.st_mode, st.st_mtime, zlib.DEFLATED, crc, usize, data)
+                self.done_bytes += usize
+                self.done_files += 1
+
+        for path, arcname, size, st in items:
+            self.checkpoint()
+            self.current = arcname
+            if stat.S_ISDIR(st.st_mode):
+                writer.add(arcname + "/", st.st_mode, st.st_mtime, 0, 0, 0, b"")
+                self.done_files += 1
+            elif stat.S_ISLNK(st.st_mode):
+                target = os.readlink(path).encode("utf-8", "surrogateescape")
+                writer.add(arcname, st.st_mode, st.st_mtime, 0, zlib.crc32(target), len(target), target)
+                self.done_files += 1
+            elif not stat.S_ISREG(st.st_mode):
+                continue
+            elif size > ZIP_POOL_MAX:
+                self._stream_zip_member(writer, path, arcname, st)
+            else:
+                pending.append((arcname, st, submit(_deflate_file, path)))
+                drain(workers * 2)
+        drain(0)
+        writer.close()
+
+    def _stream_zip_member(self, writer, path, arcname, st):
+        """Deflate a large file here while the pool works on small ones"""
+        record = writer.begin(arcname, st.st_mode, st.st_mtime, zlib.DEFLATED, large=st.st_size >= 0x7FFFFFFF)
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, -15)
+        crc = usize = csize = 0
+        with open(path, "rb") as f:
+            while True:
+                self.checkpoint()
+                data = f.read(CHUNK)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                usize += len(data)
+                packed = compressor.compress(data)
+                writer.out.write(packed)
+                csize += len(packed)
+                self.done_bytes += len(data)
+        packed = compressor.flush()
+        writer.out.write(packed)
+        csize += len(packed)
+        writer.finish(record, crc, csize, usize)
+        self.done_files += 1
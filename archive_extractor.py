@@ -1,74 +1,315 @@
 import os
+import shutil
 import zipfile
 import tarfile
 import curses
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from curses import textpad
 
-class ArchiveExtractor:
+from event_loop import notify
+from jobs import Job, JobCancelled, device_of
+
+
+# Processes extracting zip members side by side
+EXTRACT_WORKERS = os.cpu_count() or 2
+# Zips smaller than this are not worth starting a process pool for
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+# Members handed to a worker at once (until about this many bytes)
+BATCH_BYTES = 8 * 1024 * 1024
+CHUNK = 1024 * 1024
+
+# Set in pool worker processes by _init_worker
+_progress = None
+_cancelled = None
+_resumed = None
+
+
+def member_parts(name):
+    """Path parts of an archive member name without absolute or '..' parts"""
+    return [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+
+
+def zip_member_target(name, extract_dir):
+    """Destination of a zip member inside extract_dir"""
+    parts = member_parts(name)
+    return os.path.join(extract_dir, *parts) if parts else None
+
+
+def _copy_stream(src, target, on_chunk):
+    with open(target, "wb") as dst:
+        while True:
+            data = src.read(CHUNK)
+            if not data:
+                break
+            dst.write(data)
+            on_chunk(len(data))
+
+
+def pool_context():
+    """Multiprocessing context for pools started from a threaded process"""
+    return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else None)
+
+
+def _init_worker(progress, cancelled, resumed):
+    global _progress, _cancelled, _resumed
+    _progress, _cancelled, _resumed = progress, cancelled, resumed
+
+
+def _worker_chunk(size):
+    _resumed.wait()
+    if _cancelled.is_set():
+        raise InterruptedError("cancelled")
+    with _progress.get_lock():
+        _progress.value += size
+
+
+def _extract_zip_batch(zip_path, names, extract_dir):
+    """Pool worker: extract some members of a zip, returns how many"""
+    with zipfile.ZipFile(zip_path, 'r') as archive:
+        for name in names:
+            _extract_zip_member(archive, archive.getinfo(name), extract_dir, _worker_chunk)
+    return len(names)
+
+
+def _extract_zip_member(archive, info, extract_dir, on_chunk):
+    target = zip_member_target(info.filename, extract_dir)
+    if target is None:
+        return
+    if info.is_dir():
+        os.makedirs(target, exist_ok=True)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with archive.open(info) as src:
+        _copy_stream(src, target, on_chunk)
+
+
+class ExtractJob(Job):
+    """Unpacks archives as one background job with per-byte progress.
+
+    Large zips are spread over a process pool in batches of members, since
+    every member inflates independently; tar streams are read in order.
+    """
+
+    kind = "Extract"
+
+    def __init__(self, archives):
+        # archives: (file_path, extract_dir, mode) with mode 'zip', 'gz' or 'xz'
+        first_dir = archives[0][1]
+        title = os.path.basename(archives[0][0]) if len(archives) == 1 else f"{len(archives)} archives"
+        super().__init__(title, device_of(os.path.dirname(first_dir)))
+        self.archives = archives
+        self.touched = sorted({os.path.dirname(d) for _f, d, _m in archives})
+        self.created = []  # extract dirs this job made, removed on cancel
+        if len(archives) == 1:
+            self.result = f"Extracted to {os.path.basename(first_dir)}"
+        else:
+            self.result = f"Extracted {len(archives)} archives"
+
+    def work(self):
+        opened = []
+        try:
+            for file_path, extract_dir, mode in self.archives:
+                archive = self._open(file_path, mode)
+                opened.append((archive, file_path, extract_dir, mode))
+                members = self._members(archive, mode)
+                self.total_files += len(members)
+                self.total_bytes += sum(self._size(m, mode) for m in members)
+
+            for archive, file_path, extract_dir, mode in opened:
+                if not os.path.isdir(extract_dir):
+                    self.created.append(extract_dir)
+                os.makedirs(extract_dir, exist_ok=True)
+                if mode == 'zip':
+                    self._extract_zip(archive, file_path, extract_dir)
+                else:
+                    self._extract_tar(archive, extract_dir)
+        except JobCancelled:
+            self._remove_created()
+            raise
+        finally:
+            for archive, _p, _d, _m in opened:
+                archive.close()
+
+    def _remove_created(self):
+        for extract_dir in self.created:
+            shutil.rmtree(extract_dir, ignore_errors=True)
+
     @staticmethod
-    def extract_zip(stdscr, path, filename):
-        """Handle ZIP file extraction"""
-        file_path = os.path.join(path, filename)
-        extract_dir = os.path.join(path, os.path.splitext(filename)[0])
-        
-        # Create confirmation popup
-        height, width = stdscr.getmaxyx()
-        popup_h = 5
-        popup_w = 60
-        popup = curses.newwin(popup_h, popup_w, height//2 - popup_h//2, width//2 - popup_w//2)
-        popup.border()
-        popup.addstr(0, 2, " Extract ZIP Archive ")
-        popup.addstr(1, 2, f"File: {filename[:popup_w-10]}")
-        popup.addstr(2, 2, f"To: {os.path.basename(extract_dir)[:popup_w-10]}")
-        popup.addstr(3, 2, "Press Y to confirm, any key to cancel")
-        popup.refresh()
+    def _open(file_path, mode):
+        if mode == 'zip':
+            return zipfile.ZipFile(file_path, 'r')
+        return tarfile.open(file_path, f'r:{mode}')
 
-        key = stdscr.getch()
-        if key in [ord('y'), ord('Y')]:
+    @staticmethod
+    def _members(archive, mode):
+        return archive.infolist() if mode == 'zip' else archive.getmembers()
+
+    @staticmethod
+    def _size(member, mode):
+        return member.file_size if mode == 'zip' else member.size
+
+    def _chunk(self, size):
+        self.checkpoint()
+        self.done_bytes += size
+
+    # ----- zip -----
+    def _extract_zip(self, archive, file_path, extract_dir):
+        members = archive.infolist()
+        size = sum(m.file_size for m in members)
+        if size < PARALLEL_MIN_BYTES or len(members) < 2 or EXTRACT_WORKERS < 2:
+            for info in members:
+                self.checkpoint()
+                self.current = info.filename
+                _extract_zip_member(archive, info, extract_dir, self._chunk)
+                self.done_files += 1
+            return
+
+        # Directories first so workers never race on creating them
+        for info in members:
+            if info.is_dir():
+                _extract_zip_member(archive, info, extract_dir, None)
+                self.done_files += 1
+        self._extract_zip_parallel(file_path, [m for m in members if not m.is_dir()], extract_dir)
+
+    def _extract_zip_parallel(self, file_path, members, extract_dir):
+        batches, batch, batch_bytes = [], [], 0
+        for info in members:
+            batch.append(info.filename)
+            batch_bytes += info.file_size
+            if batch_bytes >= BATCH_BYTES:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+        if batch:
+            batches.append(batch)
+
+        ctx = pool_context()
+        progress = ctx.Value('q', 0)
+        cancelled = ctx.Event()
+        resumed = ctx.Event()
+        resumed.set()
+        base_bytes = self.done_bytes
+        self.current = f"{len(batches)} batches on {EXTRACT_WORKERS} processes"
+
+        pool = ProcessPoolExecutor(
+            max_workers=min(EXTRACT_WORKERS, len(batches)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(progress, cancelled, resumed),
+        )
+        try:
+            pending = {pool.submit(_extract_zip_batch, file_path, b, extract_dir) for b in batches}
+            while pending:
+                finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.done_files += future.result()
+                self.done_bytes = base_bytes + progress.value
+                notify()
+                # Mirror pause and cancel into the worker processes
+                if self.resumed.is_set():
+                    resumed.set()
+                else:
+                    resumed.clear()
+                if self.cancelled:
+                    cancelled.set()
+                    resumed.set()
+                    raise JobCancelled()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self.done_bytes = base_bytes + progress.value
+
+    # ----- tar -----
+    def _extract_tar(self, archive, extract_dir):
+        safe = hasattr(tarfile, "data_filter")
+        dirs = []
+        for member in archive.getmembers():
+            self.checkpoint()
+            self.current = member.name
+            if not safe:
+                archive.extract(member, extract_dir)
+                self.done_bytes += member.size
+            elif member.isreg():
+                self._extract_tar_file(archive, member, extract_dir)
+            else:
+                archive.extract(member, extract_dir, filter="data")
+                if member.isdir():
+                    dirs.append(member)
+            self.done_files += 1
+
+        # Directory mtimes change while their files land, set them last
+        for member in reversed(dirs):
             try:
-                os.makedirs(extract_dir, exist_ok=True)
-                with zipfile.ZipFile(file_path, 'r') as archive:
-                    archive.extractall(extract_dir)
-                return True, f"Extracted to {os.path.basename(extract_dir)}"
-            except Exception as e:
-                return False, f"Extraction failed: {str(e)}"
-        return False, "Cancelled"
+                os.utime(os.path.join(extract_dir, member.name), (member.mtime, member.mtime))
+            except OSError:
+                pass
 
+    def _extract_tar_file(self, archive, member, extract_dir):
+        # Same checks as extractall(filter="data"), but streamed in chunks
+        filtered = tarfile.data_filter(member, extract_dir)
+        target = os.path.join(extract_dir, filtered.name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with archive.extractfile(member) as src:
+            _copy_stream(src, target, self._chunk)
+        if filtered.mode is not None:
+            os.chmod(target, filtered.mode)
+        if filtered.mtime is not None:
+            os.utime(target, (filtered.mtime, filtered.mtime))
+
+
+class ArchiveExtractor:
     @staticmethod
-    def extract_tar_gz(stdscr, path, filename):
+    def extract_zip(stdscr, file_paths):
+        """Handle ZIP file extraction"""
+        archives = [
+            (p, os.path.splitext(p)[0], 'zip') for p in file_paths
+        ]
+        return ArchiveExtractor._queue(stdscr, " Extract ZIP Archive ", archives)
+
+    @staticmethod
+    def extract_tar_gz(stdscr, file_paths):
         """Handle TAR.GZ file extraction"""
-        return ArchiveExtractor._extract_tar(stdscr, path, filename, 'gz')
+        return ArchiveExtractor._extract_tar(stdscr, file_paths, 'gz')
 
     @staticmethod
-    def extract_tar_xz(stdscr, path, filename):
+    def extract_tar_xz(stdscr, file_paths):
         """Handle TAR.XZ file extraction"""
-        return ArchiveExtractor._extract_tar(stdscr, path, filename, 'xz')
+        return ArchiveExtractor._extract_tar(stdscr, file_paths, 'xz')
 
     @staticmethod
-    def _extract_tar(stdscr, path, filename, mode):
+    def _extract_tar(stdscr, file_paths, mode):
         """Internal method for tar extraction"""
-        file_path = os.path.join(path, filename)
-        extract_dir = os.path.join(path, os.path.splitext(filename)[0].replace('.tar',''))
+        archives = [
+            (p, os.path.splitext(p)[0].replace('.tar', ''), mode) for p in file_paths
+        ]
         ext_type = 'GZ' if mode == 'gz' else 'XZ'
+        return ArchiveExtractor._queue(stdscr, f" Extract TAR.{ext_type} Archive ", archives)
+
+    @staticmethod
+    def _queue(stdscr, title, archives):
+        """Confirm, then return (ExtractJob or None, message)"""
+        if len(archives) == 1:
+            filename = os.path.basename(archives[0][0])
+            target = os.path.basename(archives[0][1])
+        else:
+            filename = f"{len(archives)} archives"
+            target = "one folder per archive"
+        if ArchiveExtractor._confirm(stdscr, title, filename, target):
+            return ExtractJob(archives), f"Extracting {filename}"
+        return None, "Cancelled"
 
+    @staticmethod
+    def _confirm(stdscr, title, filename, target):
+        """Confirmation popup, True if the user pressed Y"""
         height, width = stdscr.getmaxyx()
         popup_h = 5
         popup_w = 60
         popup = curses.newwin(popup_h, popup_w, height//2 - popup_h//2, width//2 - popup_w//2)
         popup.border()
-        popup.addstr(0, 2, f" Extract TAR.{ext_type} Archive ")
+        popup.addstr(0, 2, title)
         popup.addstr(1, 2, f"File: {filename[:popup_w-10]}")
-        popup.addstr(2, 2, f"To: {os.path.basename(extract_dir)[:popup_w-10]}")
+        popup.addstr(2, 2, f"To: {target[:popup_w-10]}")
         popup.addstr(3, 2, "Press Y to confirm, any key to cancel")
         popup.refresh()
 
         key = stdscr.getch()
-        if key in [ord('y'), ord('Y')]:
-            try:
-                os.makedirs(extract_dir, exist_ok=True)
-                with tarfile.open(file_path, f'r:{mode}') as archive:
-                    archive.extractall(extract_dir)
-                return True, f"Extracted to {os.path.basename(extract_dir)}"
-            except Exception as e:
-                return False, f"Extraction failed: {str(e)}"
-        return False, "Cancelled"
\ No newline at end of file
+        return key in [ord('y'), ord('Y')]
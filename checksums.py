@@ -0,0 +1,300 @@
+import os
+import re
+import stat
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite
+    sqlite3 = None
+
+from dir_size import human_size
+from event_loop import notify
+from file_index import cache_dir
+from panel import DirectoryLoader, FileEntry, ResultPanel, sort_entries
+
+ALGORITHMS = {"sha256": hashlib.sha256, "blake2b": hashlib.blake2b, "md5": hashlib.md5}
+# Checksum list files verify looks for, and the algorithm each one uses
+SUMS_FILES = {"SHA256SUMS": "sha256", "B2SUMS": "blake2b", "MD5SUMS": "md5"}
+# Tags of BSD style lines: "SHA256 (name) = digest"
+BSD_TAGS = {"SHA256": "sha256", "BLAKE2B": "blake2b", "MD5": "md5"}
+
+HASH_CACHE_PATH = os.path.join(cache_dir(), "hashes.db")
+CHECKSUM_WORKERS = 4
+CHUNK = 1024 * 1024
+
+# Failures are listed first
+OK, FAILED, MISSING, ERROR = "OK", "FAILED", "MISSING", "ERROR"
+_RANK = {FAILED: 0, MISSING: 1, ERROR: 2}
+
+_BSD_LINE = re.compile(r"^(\w+) \((.*)\) = ([0-9a-fA-F]+)$")
+_GNU_LINE = re.compile(r"^\\?([0-9a-fA-F]+) [ *](.*)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algo TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, algo)
+) WITHOUT ROWID;
+"""
+
+# (path, algorithm, expected digest or None)
+Task = Tuple[str, str, Optional[str]]
+
+
+class HashCache:
+    """Digests in SQLite keyed by (device, inode, size, mtime_ns, algorithm).
+
+    A file that was not modified keeps its key, so hashing it again is a
+    lookup. One instance per thread; without sqlite3 it caches nothing.
+    """
+
+    def __init__(self, path=HASH_CACHE_PATH):
+        self.conn = None
+        if sqlite3 is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+        except (OSError, sqlite3.Error):
+            self.conn = None
+
+    @staticmethod
+    def _key(st: os.stat_result, algo: str):
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, algo
+
+    def get(self, st: os.stat_result, algo: str) -> Optional[str]:
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT digest FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algo=?",
+                self._key(st, algo),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def put(self, st: os.stat_result, algo: str, digest: str):
+        if self.conn is None:
+            return
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+                    self._key(st, algo) + (digest,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def find_sums_files(directory: str) -> List[str]:
+    """SHA256SUMS-style files in directory (SHA256SUMS.txt counts too)"""
+    found = []
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return found
+    for name in names:
+        if name.upper().split(".")[0] in SUMS_FILES:
+            found.append(os.path.join(directory, name))
+    return found
+
+
+def parse_sums(path: str) -> List[Task]:
+    """Tasks for every line of a checksum list, GNU or BSD format"""
+    default = SUMS_FILES[os.path.basename(path).upper().split(".")[0]]
+    base = os.path.dirname(path)
+    tasks = []
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            bsd = _BSD_LINE.match(line)
+            if bsd and bsd.group(1).upper() in BSD_TAGS:
+                algo, name, digest = BSD_TAGS[bsd.group(1).upper()], bsd.group(2), bsd.group(3)
+            else:
+                gnu = _GNU_LINE.match(line)
+                if not gnu:
+                    continue
+                algo, digest, name = default, gnu.group(1), gnu.group(2)
+                if line.startswith("\\"):
+                    # Names with a backslash or newline are escaped
+                    name = name.replace("\\n", "\n").replace("\\\\", "\\")
+            tasks.append((os.path.join(base, name), algo, digest.lower()))
+    return tasks
+
+
+class ChecksumEntry(FileEntry):
+    """Result row: 'state name  digest', state is the algorithm or OK/FAILED"""
+
+    __slots__ = ("state", "digest")
+
+    def __init__(self, rel: str, path: str, state: str, digest: str, st):
+        super().__init__(f"{state} {rel}  {digest}".rstrip(), path, stat_result=st)
+        self.state = state
+        self.digest = digest
+        self.sort_key = (False, _RANK.get(state, 3), rel.lower())
+
+
+class ChecksumRun(DirectoryLoader):
+    """Computes (or verifies) digests on a worker pool, streaming the results.
+
+    Digests of unchanged files come from the HashCache; only the rest is
+    read, and the footer shows byte progress over those.
+    """
+
+    def __init__(self, root: str, tasks: List[Task]):
+        self.root = root
+        self.tasks = tasks
+        self.verify = any(expected is not None for _p, _a, expected in tasks)
+        self.counts = {}
+        self.files_done = 0
+        self.cached = 0
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.bytes_lock = threading.Lock()
+        self._results: List[FileEntry] = []
+        self.pool = ThreadPoolExecutor(max_workers=CHECKSUM_WORKERS)
+        super().__init__(root)
+
+    def _run(self):
+        results = self._results
+        cache = HashCache()
+        try:
+            todo = []
+            for path, algo, expected in self.tasks:
+                if self.cancelled:
+                    return
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    self._publish(path, MISSING, "", None)
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    self._publish(path, ERROR, "not a regular file", st)
+                    continue
+                digest = cache.get(st, algo)
+                if digest is not None:
+                    self.cached += 1
+                    self._finish(path, algo, digest, expected, st)
+                    continue
+                todo.append((path, algo, expected, st))
+                self.total_bytes += st.st_size
+
+            futures = {
+                self.pool.submit(self._hash, path, algo): (path, algo, expected, st)
+                for path, algo, expected, st in todo
+            }
+            for future in as_completed(futures):
+                if self.cancelled:
+                    return
+                path, algo, expected, st = futures[future]
+                digest = future.result()
+                if digest is None:
+                    self._publish(path, ERROR, "read failed", st)
+                    continue
+                try:
+                    unchanged = self._same_file(st, os.stat(path))
+                except OSError:
+                    unchanged = False
+                # A file written to while it was read must not be cached
+                if unchanged:
+                    cache.put(st, algo, digest)
+                self._finish(path, algo, digest, expected, st)
+        finally:
+            cache.close()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.finished = time.monotonic()
+            with self.lock:
+                sort_entries(results)
+                self.result = results
+                self.done = True
+            notify()
+
+    @staticmethod
+    def _same_file(a: os.stat_result, b: os.stat_result) -> bool:
+        return (a.st_dev, a.st_ino, a.st_size, a.st_mtime_ns) == (b.st_dev, b.st_ino, b.st_size, b.st_mtime_ns)
+
+    def _hash(self, path: str, algo: str) -> Optional[str]:
+        h = ALGORITHMS[algo]()
+        buffer = bytearray(CHUNK)
+        view = memoryview(buffer)
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while not self.cancelled:
+                    n = f.readinto(buffer)
+                    if not n:
+                        return h.hexdigest()
+                    h.update(view[:n])
+                    with self.bytes_lock:
+                        self.done_bytes += n
+                    notify()
+        except OSError:
+            pass
+        return None
+
+    def _finish(self, path: str, algo: str, digest: str, expected: Optional[str], st):
+        if expected is None:
+            self._publish(path, algo, digest, st)
+        else:
+            self._publish(path, OK if digest == expected else FAILED, digest, st)
+
+    def _publish(self, path: str, state: str, digest: str, st):
+        entry = ChecksumEntry(os.path.relpath(path, self.root), path, state, digest, st)
+        with self.lock:
+            self.counts[state] = self.counts.get(state, 0) + 1
+            self.files_done += 1
+            self.pending.append(entry)
+            self._results.append(entry)
+        notify()
+
+    def cancel(self):
+        super().cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> str:
+        if self.verify:
+            text = ", ".join(f"{self.counts.get(s, 0)} {s}" for s in (OK, FAILED, MISSING))
+            if self.counts.get(ERROR):
+                text += f", {self.counts[ERROR]} {ERROR}"
+        else:
+            text = f"{self.files_done}/{len(self.tasks)} files"
+        if self.total_bytes:
+            elapsed = max((self.finished or time.monotonic()) - self.started, 1e-3)
+            text += (
+                f", {human_size(self.done_bytes)}/{human_size(self.total_bytes)}"
+                f" at {human_size(self.done_bytes / elapsed)}/s"
+            )
+        if self.cached:
+            text += f", {self.cached} cached"
+        return text
+
+
+class ChecksumPanel(ResultPanel):
+    """Result panel of a ChecksumRun"""
+
+    def _drop_missing(self):
+        # MISSING rows are about files that are not there in the first place
+        remaining = [
+            entry for entry in self.all_files
+            if entry.state == MISSING or os.path.lexists(entry.path)
+        ]
+        if len(remaining) != len(self.all_files):
+            self._set_files(remaining)
@@ -0,0 +1,308 @@
+import os
+import stat
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from event_loop import notify
+
+# Concurrent file copies; enough to keep disks busy on small files
+COPY_WORKERS = 8
+CHUNK = 1024 * 1024  # 1MB
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+def candidate_paths(path: str):
+    """path, then 'name (1).ext', 'name (2).ext', ... without end"""
+    yield path
+    parent, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    if stem.endswith(".tar"):
+        stem, ext = stem[:-4], ".tar" + ext
+    n = 1
+    while True:
+        yield os.path.join(parent, f"{stem} ({n}){ext}")
+        n += 1
+
+
+def unique_destination(path: str) -> str:
+    """path itself if free, else the first free 'name (n).ext'"""
+    for candidate in candidate_paths(path):
+        if not os.path.lexists(candidate):
+            return candidate
+
+
+def reserve_destination(src: str, path: str) -> str:
+    """Claim the first free name of candidate_paths(path) for src.
+
+    The name is created at once with an exclusive create (an empty
+    directory for a directory, an empty file otherwise), so jobs started
+    at the same time never pick the same destination.
+    """
+    is_dir = os.path.isdir(src) and not os.path.islink(src)
+    for candidate in candidate_paths(path):
+        try:
+            if is_dir:
+                os.mkdir(candidate)
+            else:
+                os.close(os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+            return candidate
+        except FileExistsError:
+            continue
+
+
+def special_file_kind(mode: int):
+    """What a non-copyable file is (pipe, socket, device), None for regular
+    files, directories and symlinks"""
+    if stat.S_ISFIFO(mode):
+        return "named pipe"
+    if stat.S_ISSOCK(mode):
+        return "socket"
+    if stat.S_ISCHR(mode) or stat.S_ISBLK(mode):
+        return "device"
+    return None
+
+
+def same_device(src: str, dest_dir: str) -> bool:
+    try:
+        return os.lstat(src).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+
+def try_rename(src: str, dst: str) -> bool:
+    """Atomic same-filesystem move; False if a copy is needed instead"""
+    if not same_device(src, os.path.dirname(dst)):
+        return False
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        # Bind mounts share st_dev but still refuse cross-mount renames
+        if e.errno == errno.EXDEV:
+            return False
+        raise
+    return True
+
+
+def remove_path(path: str):
+    """Delete a file, symlink or whole directory tree"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+class TreeCopier:
+    """Copies files and directory trees with a bounded worker pool.
+
+    The directory skeleton is created first, then files are copied
+    concurrently. Progress is aggregated over all bytes and files;
+    permissions and mtimes are preserved. Clearing the optional resumed
+    event pauses the copy between chunks.
+
+    Destinations are claimed with reserve_destination when planning and
+    files are created exclusively, so nothing existing is overwritten.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]], workers=COPY_WORKERS, resumed=None):
+        self.pairs = pairs  # (source, destination path)
+        self.workers = workers
+        self.resumed = resumed
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.total_bytes = 0
+        self.total_files = 0
+        self.done_bytes = 0
+        self.done_files = 0
+        self.current = ""
+        self.errors: List[str] = []
+        self.claimed = set()  # placeholders created by reserve_destination
+        self.dirs: List[Tuple[str, str]] = []
+        self.files: List[Tuple[str, str, int]] = []
+
+    @property
+    def progress(self) -> float:
+        if self.total_bytes:
+            return self.done_bytes * 100 / self.total_bytes
+        if self.total_files:
+            return self.done_files * 100 / self.total_files
+        return 100.0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _wait_if_paused(self):
+        if self.resumed is not None:
+            self.resumed.wait()
+        if self.cancelled:
+            raise CopyCancelled()
+
+    def claim(self, src: str, dst: str) -> str:
+        """Reserve a free destination for src, returns the name it got"""
+        dst = reserve_destination(src, dst)
+        self.claimed.add(dst)
+        return dst
+
+    def plan(self):
+        """Claim destinations, collect directories and files to copy and
+        the byte total; self.pairs ends up with the claimed names"""
+        pairs, self.pairs = self.pairs, []
+        for src, dst in pairs:
+            self.plan_one(src, dst)
+
+    def plan_one(self, src: str, dst: str):
+        is_dir = os.path.isdir(src) and not os.path.islink(src)
+        if is_dir:
+            real_src = os.path.realpath(src)
+            real_dst = os.path.realpath(dst)
+            if real_dst == real_src or real_dst.startswith(real_src + os.sep):
+                raise OSError(f"Cannot copy '{os.path.basename(src)}' into itself")
+        elif self._lstat(src) is None:
+            return
+        if dst not in self.claimed:
+            dst = self.claim(src, dst)
+        self.pairs.append((src, dst))
+        if is_dir:
+            self._plan_tree(src, dst)
+        else:
+            self._add_file(src, dst)
+
+    def _plan_tree(self, src_root: str, dst_root: str):
+        stack = [(src_root, dst_root)]
+        while stack:
+            src, dst = stack.pop()
+            self.dirs.append((src, dst))
+            try:
+                with os.scandir(src) as it:
+                    for dir_entry in it:
+                        child_dst = os.path.join(dst, dir_entry.name)
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            stack.append((dir_entry.path, child_dst))
+                        else:
+                            self._add_file(dir_entry.path, child_dst)
+            except OSError as e:
+                self.errors.append(f"{src}: {e.strerror or e}")
+
+    def _lstat(self, src: str):
+        """lstat of src, None (with an error noted) if it cannot be copied"""
+        try:
+            st = os.lstat(src)
+        except OSError as e:
+            self.errors.append(f"{src}: {e.strerror or e}")
+            return None
+        # Reading a pipe or device could block or never end, as in shutil
+        kind = special_file_kind(st.st_mode)
+        if kind:
+            self.errors.append(f"{src}: is a {kind}, not copied")
+            return None
+        return st
+
+    def _add_file(self, src: str, dst: str):
+        st = self._lstat(src)
+        if st is None:
+            return
+        size = st.st_size if stat.S_ISREG(st.st_mode) else 0
+        self.files.append((src, dst, size))
+        self.total_bytes += size
+        self.total_files += 1
+
+    def run(self):
+        """Copy everything planned, raising CopyCancelled if cancelled"""
+        for _src, dst in self.dirs:
+            os.makedirs(dst, exist_ok=True)
+
+        # Bounded in-flight queue so huge trees do not pile up futures
+        slots = threading.BoundedSemaphore(self.workers * 4)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for src, dst, size in self.files:
+                if self.resumed is not None:
+                    self.resumed.wait()
+                if self.cancelled:
+                    break
+                slots.acquire()
+                future = pool.submit(self._copy_one, src, dst, size)
+                future.add_done_callback(lambda _f: slots.release())
+
+        # Directory mtimes change while files land, so set them last,
+        # deepest first
+        if not self.cancelled:
+            for src, dst in reversed(self.dirs):
+                try:
+                    shutil.copystat(src, dst)
+                except OSError:
+                    pass
+
+        if self.cancelled:
+            raise CopyCancelled()
+
+    def cleanup(self):
+        """Remove destinations of a failed or cancelled copy"""
+        for _src, dst in self.pairs:
+            try:
+                remove_path(dst)
+            except OSError:
+                pass
+
+    def _copy_one(self, src: str, dst: str, size: int):
+        if self.cancelled:
+            return
+        self.current = os.path.basename(src)
+        try:
+            if os.path.islink(src):
+                if dst in self.claimed:
+                    os.remove(dst)
+                os.symlink(os.readlink(src), dst)
+            else:
+                self._copy_data(src, dst)
+                shutil.copystat(src, dst)
+        except CopyCancelled:
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+            return
+        except OSError as e:
+            with self.lock:
+                self.errors.append(f"{src}: {e.strerror or e}")
+            return
+        with self.lock:
+            self.done_files += 1
+
+    def _copy_data(self, src: str, dst: str):
+        # Only a claimed placeholder may be written over
+        flags = os.O_WRONLY | (os.O_TRUNC if dst in self.claimed else os.O_CREAT | os.O_EXCL)
+        # Non-blocking open: src may have been swapped for a pipe since planning
+        fsrc = open(os.open(src, os.O_RDONLY | os.O_NONBLOCK), "rb")
+        if not stat.S_ISREG(os.fstat(fsrc.fileno()).st_mode):
+            fsrc.close()
+            raise OSError("no longer a regular file")
+        with fsrc, os.fdopen(os.open(dst, flags, 0o666), "wb") as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            offset = 0
+            use_sendfile = hasattr(os, "sendfile")
+            while True:
+                self._wait_if_paused()
+                if use_sendfile:
+                    try:
+                        sent = os.sendfile(out_fd, in_fd, offset, CHUNK)
+                    except OSError:
+                        # e.g. filesystems without sendfile support
+                        use_sendfile = False
+                        fsrc.seek(offset)
+                        continue
+                else:
+                    data = fsrc.read(CHUNK)
+                    sent = len(data)
+                    if sent:
+                        fdst.write(data)
+                if not sent:
+                    break
+                offset += sent
+                with self.lock:
+                    self.done_bytes += sent
+                notify()
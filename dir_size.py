@@ -0,0 +1,131 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from event_loop import notify
+
+# (st_dev, st_ino, st_mtime_ns) of a directory
+Key = Tuple[int, int, int]
+# (total bytes, file count)
+Totals = Tuple[int, int]
+
+SIZE_WORKERS = 4
+
+
+def human_size(size):
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}PB"
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class DirSizer:
+    """Recursive directory sizes computed on a worker pool.
+
+    Results are cached by (device, inode, mtime) for every directory
+    visited, so revisiting a tree or scrolling never rescans it.
+    """
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=SIZE_WORKERS)
+        self.lock = threading.Lock()
+        self.cache: Dict[Key, Totals] = {}
+        self.pending = set()
+        self.version = 0  # bumped whenever a result arrives
+        self.auto = False
+        self.closed = False
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.pending)
+
+    @staticmethod
+    def key_for(entry) -> Optional[Key]:
+        st = entry.stat
+        # st_ino 0: synthetic entries such as archive members
+        if st is None or not entry.is_dir or entry.is_link or not st.st_ino:
+            return None
+        return st.st_dev, st.st_ino, st.st_mtime_ns
+
+    def get(self, entry) -> Optional[Totals]:
+        key = self.key_for(entry)
+        return self.cache.get(key) if key else None
+
+    def request(self, entry):
+        """Queue a directory for sizing unless it is cached or queued"""
+        key = self.key_for(entry)
+        if key is None or self.closed:
+            return
+        with self.lock:
+            if key in self.cache or key in self.pending:
+                return
+            self.pending.add(key)
+        self.pool.submit(self._compute, entry.path, key)
+
+    def set_auto(self, auto: bool):
+        self.auto = auto
+        self.version += 1
+
+    def label(self, entry) -> str:
+        """Size column text for a directory row"""
+        key = self.key_for(entry)
+        if key is None:
+            return "<DIR>"
+        totals = self.cache.get(key)
+        if totals is not None:
+            return human_size(totals[0])
+        if self.auto:
+            self.request(entry)
+        return "..." if key in self.pending else "<DIR>"
+
+    def _compute(self, path: str, key: Key):
+        try:
+            totals = self._walk(path)
+        except _Cancelled:
+            return
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+        with self.lock:
+            self.cache[key] = totals
+            self.version += 1
+        notify()
+
+    def _walk(self, path: str) -> Totals:
+        total = files = 0
+        try:
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    if self.closed:
+                        raise _Cancelled()
+                    try:
+                        st = dir_entry.stat(follow_symlinks=False)
+                        is_dir = dir_entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not is_dir:
+                        total += st.st_size
+                        files += 1
+                        continue
+
+                    key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+                    sub = self.cache.get(key)
+                    if sub is None:
+                        sub = self._walk(dir_entry.path)
+                        with self.lock:
+                            self.cache[key] = sub
+                    total += sub[0]
+                    files += sub[1]
+        except OSError:
+            pass
+        return total, files
+
+    def close(self):
+        self.closed = True
+        self.pool.shutdown(wait=False, cancel_futures=True)
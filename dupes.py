@@ -0,0 +1,306 @@
+import os
+import hashlib
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple
+
+from dir_size import human_size
+from event_loop import notify
+from finder import ParallelWalker
+from jobs import Job, device_of
+from panel import DirectoryLoader, FileEntry, ResultPanel, sort_entries
+
+# hashlib releases the GIL while hashing, so threads hash in parallel
+HASH_WORKERS = 8
+# Bytes hashed at each end of a file in the partial stage
+PARTIAL_BLOCK = 64 * 1024
+CHUNK = 1024 * 1024
+
+# (path, lstat result)
+Candidate = Tuple[str, os.stat_result]
+
+
+class DuplicateEntry(FileEntry):
+    """One file of a group of identical files, shown as '#group path'"""
+
+    __slots__ = ("group",)
+
+    def __init__(self, rel: str, path: str, group: int, st: os.stat_result):
+        super().__init__(f"#{group} {rel}", path, stat_result=st)
+        self.group = group
+        # Biggest files first, each group kept together
+        self.sort_key = (False, -st.st_size, group, rel.lower())
+
+
+class DuplicateScan(DirectoryLoader):
+    """Finds identical files below root with as few reads as possible.
+
+    1. walk the tree and group regular files by size;
+    2. for sizes shared by several files, hash the first and last
+       PARTIAL_BLOCK bytes (the whole file when it is that small);
+    3. fully hash only files whose partial hashes still collide.
+
+    Hard links to the same inode count once and empty files are ignored.
+    Groups are published as soon as all their members are hashed.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stage = "scanning"
+        self.by_size: Dict[int, List[Candidate]] = {}
+        self.inodes = set()
+        self.files_seen = 0
+        self.to_hash = 0
+        self.hashed = 0
+        self.bytes_hashed = 0
+        self.groups = 0
+        self.duplicates = 0
+        self.wasted = 0
+        self._results: List[FileEntry] = []
+        self.pool = ThreadPoolExecutor(max_workers=HASH_WORKERS)
+        self.walker = ParallelWalker(root, self._on_entry)
+        super().__init__(root)
+
+    def _run(self):
+        results = self._results
+        try:
+            self.walker.run()
+            size_groups = [files for files in self.by_size.values() if len(files) > 1]
+            self.by_size = {}
+
+            self.stage = "partial hash"
+            colliding: List[List[Candidate]] = []
+
+            def partial_match(same: List[Candidate]):
+                # Small files were hashed whole already
+                if same[0][1].st_size <= 2 * PARTIAL_BLOCK:
+                    self._publish(same)
+                else:
+                    colliding.append(same)
+
+            self._hash_stage(size_groups, self._partial_digest, partial_match)
+
+            self.stage = "full hash"
+            self._hash_stage(colliding, self._full_digest, self._publish)
+            self.stage = "done"
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            with self.lock:
+                sort_entries(results)
+                self.result = results
+                self.done = True
+            notify()
+
+    def _on_entry(self, dir_entry: os.DirEntry, is_dir: bool):
+        if is_dir or self.cancelled:
+            return
+        try:
+            if not dir_entry.is_file(follow_symlinks=False):
+                return
+            st = dir_entry.stat(follow_symlinks=False)
+        except OSError:
+            return
+        if not st.st_size:
+            return
+        with self.lock:
+            self.files_seen += 1
+            inode = (st.st_dev, st.st_ino)
+            if inode in self.inodes:
+                return
+            self.inodes.add(inode)
+            self.by_size.setdefault(st.st_size, []).append((dir_entry.path, st))
+
+    def _hash_stage(self, groups: List[List[Candidate]], digest: Callable, on_group: Callable):
+        """Hash all files of all groups on the pool; on_group(files) gets each
+        set of equal files as soon as its whole group is done"""
+        self.to_hash, self.hashed = sum(len(g) for g in groups), 0
+        futures = {}
+        remaining = {}
+        split: Dict[int, Dict[bytes, List[Candidate]]] = {}
+        for index, group in enumerate(groups):
+            remaining[index] = len(group)
+            for candidate in group:
+                if self.cancelled:
+                    return
+                futures[self.pool.submit(digest, candidate)] = (index, candidate)
+
+        for future in as_completed(futures):
+            if self.cancelled:
+                return
+            index, candidate = futures[future]
+            try:
+                value = future.result()
+            except CancelledError:
+                return
+            self.hashed += 1
+            if value is not None:
+                split.setdefault(index, {}).setdefault(value, []).append(candidate)
+            remaining[index] -= 1
+            if not remaining[index]:
+                for same in split.pop(index, {}).values():
+                    if len(same) > 1:
+                        on_group(same)
+            notify()
+
+    def _partial_digest(self, candidate: Candidate):
+        path, st = candidate
+        h = hashlib.blake2b(digest_size=20)
+        try:
+            with open(path, "rb") as f:
+                h.update(f.read(PARTIAL_BLOCK))
+                if st.st_size > PARTIAL_BLOCK:
+                    f.seek(max(st.st_size - PARTIAL_BLOCK, PARTIAL_BLOCK))
+                    h.update(f.read(PARTIAL_BLOCK))
+        except OSError:
+            return None
+        self.bytes_hashed += min(st.st_size, 2 * PARTIAL_BLOCK)
+        return h.digest()
+
+    def _full_digest(self, candidate: Candidate):
+        path, _st = candidate
+        h = hashlib.blake2b(digest_size=20)
+        buffer = bytearray(CHUNK)
+        view = memoryview(buffer)
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while not self.cancelled:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    h.update(view[:n])
+                    self.bytes_hashed += n
+        except OSError:
+            return None
+        return None if self.cancelled else h.digest()
+
+    def _publish(self, files: List[Candidate]):
+        files.sort()
+        with self.lock:
+            # Once cancelled or done the list belongs to the panel
+            if self.cancelled or self.done:
+                return
+            self.groups += 1
+            group = self.groups
+            self.duplicates += len(files) - 1
+            self.wasted += files[0][1].st_size * (len(files) - 1)
+            entries = [
+                DuplicateEntry(os.path.relpath(path, self.root), path, group, st)
+                for path, st in files
+            ]
+            self.pending.extend(entries)
+            self._results.extend(entries)
+        notify()
+
+    def cancel(self):
+        super().cancel()
+        self.walker.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> str:
+        found = f"{self.groups} groups, {human_size(self.wasted)} reclaimable"
+        if self.stage == "scanning":
+            return f"scanning: {self.files_seen} files"
+        if self.stage == "done":
+            return f"{found}, {self.duplicates} copies"
+        return f"{self.stage} {self.hashed}/{self.to_hash}, {human_size(self.bytes_hashed)} read, {found}"
+
+
+class DuplicatePanel(ResultPanel):
+    """Result panel of a DuplicateScan, one block of rows per group"""
+
+    def __init__(self, root: str, origin):
+        super().__init__(f"duplicates in {root}", origin, DuplicateScan(root))
+
+    def _drop_missing(self):
+        # Also drop groups that no longer hold two different files (linked)
+        remaining = []
+        for group in self.groups().values():
+            alive, inodes = [], set()
+            for entry in group:
+                try:
+                    st = os.lstat(entry.path)
+                except OSError:
+                    continue
+                alive.append(entry)
+                inodes.add((st.st_dev, st.st_ino))
+            if len(inodes) > 1:
+                remaining.extend(alive)
+        if len(remaining) != len(self.all_files):
+            self._set_files(remaining)
+
+    def groups(self) -> Dict[int, List[DuplicateEntry]]:
+        groups: Dict[int, List[DuplicateEntry]] = {}
+        for entry in self.all_files:
+            if isinstance(entry, DuplicateEntry):
+                groups.setdefault(entry.group, []).append(entry)
+        return groups
+
+    def mark_copies(self) -> int:
+        """Mark every file of each group except its first one"""
+        for group in self.groups().values():
+            self.marked.discard(group[0].path)
+            self.marked.update(entry.path for entry in group[1:])
+        self._marks_changed()
+        return len(self.marked)
+
+    def link_pairs(self) -> Tuple[List[Tuple[DuplicateEntry, DuplicateEntry]], int]:
+        """(kept file, marked copy) pairs and the number of groups skipped
+        because every file in them is marked"""
+        pairs, skipped = [], 0
+        for group in self.groups().values():
+            marked = [e for e in group if e.path in self.marked]
+            kept = [e for e in group if e.path not in self.marked]
+            if not marked:
+                continue
+            if not kept:
+                skipped += 1
+                continue
+            pairs.extend((kept[0], entry) for entry in marked)
+        return pairs, skipped
+
+
+class HardlinkJob(Job):
+    """Replaces duplicate files by hard links to the file that is kept"""
+
+    kind = "Link"
+
+    def __init__(self, pairs: List[Tuple[DuplicateEntry, DuplicateEntry]], title: str):
+        super().__init__(title, device_of(os.path.dirname(pairs[0][1].path)) if pairs else None)
+        self.pairs = pairs
+        self.touched = sorted({os.path.dirname(copy.path) for _kept, copy in pairs})
+        self.result = f"Linked {title}"
+
+    def work(self):
+        self.total_files = len(self.pairs)
+        for kept, copy in self.pairs:
+            self.checkpoint()
+            self.current = os.path.basename(copy.path)
+            try:
+                self._link(kept, copy)
+            except OSError as e:
+                self.errors.append(f"{copy.path}: {e.strerror or e}")
+            self.done_files += 1
+
+    @staticmethod
+    def _as_scanned(entry: DuplicateEntry, st: os.stat_result) -> bool:
+        """Whether st is still the file the scan hashed for entry"""
+        scanned = entry.stat
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (
+            scanned.st_dev, scanned.st_ino, scanned.st_size, scanned.st_mtime_ns
+        )
+
+    @classmethod
+    def _link(cls, kept: DuplicateEntry, copy: DuplicateEntry):
+        src, dst = os.lstat(kept.path), os.lstat(copy.path)
+        if (src.st_dev, src.st_ino) == (dst.st_dev, dst.st_ino):
+            return
+        # An edit of the same size would otherwise be replaced unnoticed
+        if not (cls._as_scanned(kept, src) and cls._as_scanned(copy, dst)):
+            raise OSError("changed since the scan")
+        # Link under a temporary name first so the copy is never missing
+        temp = f"{copy.path}.zm-link-{os.getpid()}"
+        os.link(kept.path, temp)
+        try:
+            os.replace(temp, copy.path)
+        except OSError:
+            os.remove(temp)
+            raise
@@ -0,0 +1,132 @@
+import os
+import grp
+import pwd
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from event_loop import notify
+
+# Seconds a resolved user/group name is trusted (NSS entries can change)
+NAME_TTL = 300.0
+# Entries whose details are remembered, least recently selected dropped first
+DETAILS_CACHE_SIZE = 256
+
+# (owner, group, symlink target or None)
+Details = Tuple[str, str, Optional[str]]
+# (path, st_ino, st_mtime_ns, st_uid, st_gid)
+Key = Tuple[str, int, int, int, int]
+
+
+def _user_name(uid: int) -> str:
+    return pwd.getpwuid(uid).pw_name
+
+
+def _group_name(gid: int) -> str:
+    return grp.getgrgid(gid).gr_name
+
+
+class NameCache:
+    """uid or gid -> name, each answer kept for NAME_TTL seconds.
+
+    resolve() may block for a long time on LDAP/SSSD hosts, so it is only
+    called from the EntryDetails worker; the UI uses peek().
+    """
+
+    def __init__(self, lookup, ttl: float = NAME_TTL):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.names: Dict[int, Tuple[str, float]] = {}
+
+    def peek(self, ident: int) -> Optional[str]:
+        """Cached name if it is still fresh, never blocks"""
+        cached = self.names.get(ident)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    def resolve(self, ident: int) -> str:
+        name = self.peek(ident)
+        if name is None:
+            try:
+                name = self.lookup(ident)
+            except (KeyError, OverflowError, OSError):
+                name = str(ident)  # no such user/group: show the number
+            self.names[ident] = (name, time.monotonic() + self.ttl)
+        return name
+
+
+class EntryDetails:
+    """Owner, group and symlink target of the selected entry.
+
+    Looked up on one worker thread, once per (path, inode, mtime, owner);
+    while a lookup runs get() returns None and the status bar shows the
+    numeric ids. Requests for entries the cursor already left are skipped,
+    so holding an arrow key never queues up slow lookups.
+    """
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.lock = threading.Lock()
+        self.users = NameCache(_user_name)
+        self.groups = NameCache(_group_name)
+        self.cache: "OrderedDict[Key, Details]" = OrderedDict()
+        self.pending = set()
+        self.wanted: Optional[Key] = None
+        self.version = 0  # bumped whenever a lookup finishes
+
+    @staticmethod
+    def key_for(entry) -> Optional[Key]:
+        st = entry.stat
+        if st is None:
+            return None
+        return entry.path, st.st_ino, st.st_mtime_ns, st.st_uid, st.st_gid
+
+    def get(self, entry) -> Optional[Details]:
+        key = self.key_for(entry)
+        if key is None:
+            return None
+        # Names already known and nothing to read from disk: no round trip
+        if not entry.is_link:
+            owner, group = self.users.peek(key[3]), self.groups.peek(key[4])
+            if owner is not None and group is not None:
+                return owner, group, None
+        with self.lock:
+            self.wanted = key
+            details = self.cache.get(key)
+            if details is not None:
+                self.cache.move_to_end(key)
+                return details
+            if key in self.pending:
+                return None
+            self.pending.add(key)
+        self.pool.submit(self._lookup, entry, key)
+        return None
+
+    def _lookup(self, entry, key: Key):
+        # Numeric ids until the names are known
+        owner, group, target = str(key[3]), str(key[4]), None
+        try:
+            if key != self.wanted:
+                return
+            owner = self.users.resolve(key[3])
+            group = self.groups.resolve(key[4])
+            if entry.is_link and key[1]:  # st_ino 0: synthetic archive member
+                try:
+                    target = os.readlink(entry.path)
+                except OSError:
+                    target = "?"
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+        with self.lock:
+            self.cache[key] = (owner, group, target)
+            while len(self.cache) > DETAILS_CACHE_SIZE:
+                self.cache.popitem(last=False)
+            self.version += 1
+        notify()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
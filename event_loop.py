@@ -0,0 +1,122 @@
+import os
+import time
+import signal
+import selectors
+from typing import Optional, Set
+
+# What woke the loop up
+INPUT = "input"
+RESIZE = "resize"
+WAKE = "wake"
+WATCH = "watch"
+
+# Worker-driven redraws are coalesced to at most one per interval
+FRAME_INTERVAL = 0.05
+
+
+def _pipe():
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    os.set_blocking(w, False)
+    return r, w
+
+
+def _drain(fd: int):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except (BlockingIOError, InterruptedError):
+        pass
+
+
+class Waker:
+    """Self-pipe worker threads write to when the UI has something to show.
+
+    Only the first notify() after each drain() writes, so a thread posting
+    progress in a tight loop costs one flag check per call.
+    """
+
+    def __init__(self):
+        self.r, self.w = _pipe()
+        self.pending = False
+
+    def fileno(self) -> int:
+        return self.r
+
+    def notify(self):
+        if self.pending:
+            return
+        self.pending = True
+        try:
+            os.write(self.w, b"\0")
+        except OSError:
+            pass
+
+    def drain(self):
+        # Empty the pipe before clearing the flag: a notify() in between then
+        # writes nothing, but its update is made before the flag clears, so
+        # the frame drawn after this drain shows it. Clearing first would let
+        # the read swallow the byte of a later notify() and leave the flag
+        # set for good.
+        _drain(self.r)
+        self.pending = False
+
+
+_waker = Waker()
+
+
+def notify():
+    """Wake the main loop (safe to call from any thread)"""
+    _waker.notify()
+
+
+class EventLoop:
+    """Blocks until a key, a terminal resize, an inotify event or a worker
+    notification arrives, so the UI uses no CPU while nothing happens."""
+
+    def __init__(self, input_fd: int, watch_fd: int = -1):
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(input_fd, selectors.EVENT_READ, INPUT)
+        self.resize_r, self.resize_w = _pipe()
+        self.selector.register(self.resize_r, selectors.EVENT_READ, RESIZE)
+        self.selector.register(_waker.fileno(), selectors.EVENT_READ, WAKE)
+        if watch_fd >= 0:
+            self.selector.register(watch_fd, selectors.EVENT_READ, WATCH)
+        self.last_frame = 0.0
+        self.previous_handler = signal.signal(signal.SIGWINCH, self._on_resize)
+
+    def _on_resize(self, signum, frame):
+        # Only note it here; windows are rebuilt by the loop, not in the handler
+        try:
+            os.write(self.resize_w, b"r")
+        except OSError:
+            pass
+
+    def frame_drawn(self):
+        self.last_frame = time.monotonic()
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Kinds of events that are ready, empty when the timeout ran out"""
+        kinds = {key.data for key, _mask in self.selector.select(timeout)}
+
+        if kinds == {WAKE}:
+            delay = self.last_frame + FRAME_INTERVAL - time.monotonic()
+            if delay > 0:
+                # Too soon for another frame: keep listening for keys meanwhile
+                self.selector.unregister(_waker.fileno())
+                try:
+                    kinds |= {key.data for key, _mask in self.selector.select(delay)}
+                finally:
+                    self.selector.register(_waker.fileno(), selectors.EVENT_READ, WAKE)
+
+        if WAKE in kinds:
+            _waker.drain()
+        if RESIZE in kinds:
+            _drain(self.resize_r)
+        return kinds
+
+    def close(self):
+        signal.signal(signal.SIGWINCH, self.previous_handler or signal.SIG_DFL)
+        self.selector.close()
+        os.close(self.resize_r)
+        os.close(self.resize_w)
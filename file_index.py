@@ -0,0 +1,335 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
+
+try:
+    import sqlite3
+except ImportError:  # Python built without sqlite
+    sqlite3 = None
+
+from event_loop import notify
+from panel import DirectoryLoader, FileEntry, sort_entries
+
+
+def cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "zetamanager")
+
+
+INDEX_PATH = os.path.join(cache_dir(), "index.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    UNIQUE (dir, name)
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_file ON trigrams (file_id);
+"""
+
+# (name, is_dir, size, mtime)
+Record = Tuple[str, bool, int, float]
+
+# Commit after this many directories while walking a tree
+COMMIT_EVERY = 200
+
+
+def trigrams(lname: str) -> set:
+    return {lname[i:i + 3] for i in range(len(lname) - 2)}
+
+
+def _like_prefix(path: str) -> str:
+    escaped = path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.rstrip("/") + "/%"
+
+
+class FileIndex:
+    """Persistent filename index in SQLite with a trigram table.
+
+    All writes go through a single background thread; searches open their
+    own connection so they never wait on an update in progress.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.local = threading.local()
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.roots: List[str] = []
+        self.updating = False
+        self.closed = False
+        if self.available:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                conn = self._conn()
+                conn.executescript(SCHEMA)
+                self.roots = [r for (r,) in conn.execute("SELECT path FROM roots")]
+            except (OSError, sqlite3.Error):
+                self.path = None
+
+    @property
+    def available(self) -> bool:
+        return sqlite3 is not None and self.path is not None
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def release(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def close(self):
+        """Stop pending updates so exiting does not wait for a long walk"""
+        self.closed = True
+        self.writer.shutdown(wait=False, cancel_futures=True)
+
+    def covers(self, path: str) -> Optional[str]:
+        """The indexed root containing path, if any"""
+        for root in self.roots:
+            if path == root or path.startswith(root.rstrip("/") + "/"):
+                return root
+        return None
+
+    # =====================================================
+    #                      UPDATES
+    # =====================================================
+    def ingest(self, dir_path: str, entries: Iterable[FileEntry]):
+        """Queue a listing the panels already made, if it lies under a root"""
+        if not self.available or self.closed or not self.covers(dir_path):
+            return
+        entries = list(entries)
+        self.writer.submit(self._ingest, dir_path, entries)
+
+    def _ingest(self, dir_path: str, entries: List[FileEntry]):
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            conn = self._conn()
+            # Unchanged since it was stored: skip the stat of every entry,
+            # the same rule update_tree applies
+            row = conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (dir_path,)).fetchone()
+            if row and row[0] == mtime_ns:
+                return
+            records = []
+            for entry in entries:
+                # Links themselves, as update_tree stores them
+                if entry.is_link:
+                    try:
+                        st = os.lstat(entry.path)
+                    except OSError:
+                        continue
+                else:
+                    st = entry.stat
+                if st is None:
+                    continue
+                records.append((entry.name, entry.is_dir and not entry.is_link, st.st_size, st.st_mtime))
+            with conn:
+                self._sync_dir(conn, dir_path, mtime_ns, records)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def update_tree_async(self, root: str, on_done: Optional[Callable] = None):
+        """Index root (adding it to the roots) on the writer thread"""
+        if not self.available:
+            return
+        root = os.path.abspath(root)
+        if not self.covers(root):
+            self.roots.append(root)
+        self.updating = True
+
+        def job():
+            try:
+                scanned, rescanned = self.update_tree(root)
+                if on_done:
+                    on_done(f"Index updated: {rescanned}/{scanned} dirs rescanned")
+            except (OSError, sqlite3.Error) as e:
+                if on_done:
+                    on_done(f"Error updating index: {e}")
+            finally:
+                self.updating = False
+                notify()
+
+        self.writer.submit(job)
+
+    def update_tree(self, root: str) -> Tuple[int, int]:
+        """Walk root, relisting only directories whose mtime changed"""
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (root,))
+
+        scanned = rescanned = 0
+        stack = [root]
+        while stack and not self.closed:
+            dir_path = stack.pop()
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            scanned += 1
+
+            row = conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (dir_path,)).fetchone()
+            if row and row[0] == mtime_ns:
+                subdirs = conn.execute(
+                    "SELECT name FROM files WHERE dir = ? AND is_dir = 1", (dir_path,)
+                ).fetchall()
+                stack.extend(os.path.join(dir_path, name) for (name,) in subdirs)
+                continue
+
+            records = []
+            try:
+                with os.scandir(dir_path) as it:
+                    for dir_entry in it:
+                        try:
+                            is_dir = dir_entry.is_dir(follow_symlinks=False)
+                            st = dir_entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        records.append((dir_entry.name, is_dir, st.st_size, st.st_mtime))
+                        if is_dir:
+                            stack.append(dir_entry.path)
+            except OSError:
+                continue
+
+            self._sync_dir(conn, dir_path, mtime_ns, records)
+            rescanned += 1
+            if rescanned % COMMIT_EVERY == 0:
+                conn.commit()
+
+        conn.commit()
+        return scanned, rescanned
+
+    def _sync_dir(self, conn, dir_path: str, mtime_ns: int, records: List[Record]):
+        """Make the stored rows of one directory match a fresh listing"""
+        stored = {
+            name: (file_id, is_dir, size, mtime)
+            for file_id, name, is_dir, size, mtime in conn.execute(
+                "SELECT id, name, is_dir, size, mtime FROM files WHERE dir = ?", (dir_path,)
+            )
+        }
+
+        for name, is_dir, size, mtime in records:
+            old = stored.pop(name, None)
+            if old is not None:
+                if bool(old[1]) == is_dir:
+                    if old[2] != size or old[3] != mtime:
+                        conn.execute(
+                            "UPDATE files SET size = ?, mtime = ? WHERE id = ?",
+                            (size, mtime, old[0]),
+                        )
+                    continue
+                self._delete(conn, dir_path, name, old)
+
+            lname = name.lower()
+            cur = conn.execute(
+                "INSERT INTO files (dir, name, lname, is_dir, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                (dir_path, name, lname, int(is_dir), size, mtime),
+            )
+            file_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO trigrams (tri, file_id) VALUES (?, ?)",
+                [(tri, file_id) for tri in trigrams(lname)],
+            )
+
+        for name, old in stored.items():
+            self._delete(conn, dir_path, name, old)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", (dir_path, mtime_ns)
+        )
+
+    def _delete(self, conn, dir_path: str, name: str, old):
+        file_id, is_dir = old[0], old[1]
+        conn.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        if is_dir:
+            # Drop the whole subtree of a vanished directory
+            path = os.path.join(dir_path, name)
+            like = _like_prefix(path)
+            conn.execute(
+                "DELETE FROM trigrams WHERE file_id IN "
+                "(SELECT id FROM files WHERE dir = ? OR dir LIKE ? ESCAPE '\\')",
+                (path, like),
+            )
+            conn.execute("DELETE FROM files WHERE dir = ? OR dir LIKE ? ESCAPE '\\'", (path, like))
+            conn.execute("DELETE FROM dirs WHERE path = ? OR path LIKE ? ESCAPE '\\'", (path, like))
+
+    # =====================================================
+    #                      QUERIES
+    # =====================================================
+    def search(self, query: str, root: str, limit=100000):
+        """Yield (dir, name, is_dir, size, mtime) for names containing query"""
+        lquery = query.lower()
+        params: list = []
+        sql = "SELECT dir, name, is_dir, size, mtime FROM files WHERE "
+
+        grams = sorted(trigrams(lquery))
+        if grams:
+            sql += "id IN (" + " INTERSECT ".join(
+                ["SELECT file_id FROM trigrams WHERE tri = ?"] * len(grams)
+            ) + ") AND "
+            params.extend(grams)
+
+        sql += "instr(lname, ?) > 0 AND (dir = ? OR dir LIKE ? ESCAPE '\\') LIMIT ?"
+        params.extend([lquery, root, _like_prefix(root), limit])
+        yield from self._conn().execute(sql, params)
+
+
+class IndexSearch(DirectoryLoader):
+    """Streams FileIndex matches into a ResultPanel"""
+
+    def __init__(self, index: FileIndex, root: str, query: str):
+        self.index = index
+        self.root = root
+        self.query = query
+        self.matches = 0
+        super().__init__(root)
+
+    def _run(self):
+        results: List[FileEntry] = []
+        batch: List[FileEntry] = []
+        try:
+            for dir_path, name, is_dir, _size, _mtime in self.index.search(self.query, self.root):
+                if self.cancelled:
+                    break
+                path = os.path.join(dir_path, name)
+                entry = FileEntry(os.path.relpath(path, self.root), path, bool(is_dir))
+                batch.append(entry)
+                self.matches += 1
+                if len(batch) >= self.FIRST_BATCH:
+                    results.extend(batch)
+                    self._publish(batch)
+                    batch = []
+            results.extend(batch)
+            self._publish(batch)
+            sort_entries(results)
+        except sqlite3.Error as e:
+            self.error = OSError(str(e))
+        finally:
+            self.index.release()
+        with self.lock:
+            self.result = results
+            self.done = True
+        notify()
+
+    def status(self) -> str:
+        return f"{self.matches} indexed matches"
@@ -1,38 +1,77 @@
 import os
+import re
+import sys
 import curses
 import subprocess
 import shutil
-import pwd
 import stat
 import time
 
 from curses import textpad
 from pathlib import Path
 import traceback
-from panel import FilePanel
+from panel import FilePanel, ResultPanel, PERMISSION_DENIED
 from colors import ColorScheme
 from archive_extractor import ArchiveExtractor
+from archive_creator import CreateArchiveJob, create_format
+from panel_view import Overlay, PanelView
+from event_loop import EventLoop, RESIZE
+from icons import IconResolver
+from watcher import DirectoryWatcher
+from finder import FindQuery, RecursiveFinder
+from file_index import FileIndex, IndexSearch
+from dir_size import DirSizer, human_size
+from entry_details import EntryDetails
+from preview import Preview, PreviewCache
+from pager import Pager, compile_pattern
+from grep import GrepHit, GrepSearch
+from dupes import DuplicatePanel, HardlinkJob
+from checksums import ALGORITHMS, SUMS_FILES, ChecksumPanel, ChecksumRun, find_sums_files, parse_sums
+from row_model import PAIR_FILE
+from copy_engine import unique_destination
+from archive_browser import ArchivePanel, MemberCopyJob, archive_mode
+from trash import PurgeJob, TrashPanel, move_to_trash, restore
+from jobs import CopyJob, DeleteJob, JobScheduler, MoveJob, PAUSED, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NAMES, QUEUED
+
+# Redraw interval while background work runs, for counters and rates
+HEARTBEAT = 0.5
+
 
 class FileManager:
     def __init__(self, stdscr):
         self.stdscr = stdscr
         self.color_scheme = ColorScheme()
+        self.icons = IconResolver()
         self.left_panel = FilePanel(str(Path.home()))
         self.right_panel = FilePanel("/")
         self.active_panel = "left"
         self.search_mode = False
         self.search_query = ""
         self.message = ""
-        self.message_timer = 0
-        self.clipboard_path = ""
+        self.message_until = 0.0
+        self.clipboard_paths = []
         self.clipboard_mode = ""  # "copy" or "cut"
+        self.clipboard_archive = ""  # set when the paths are archive members
         self.right_panel_visible = True
-        self.bg_task = None        # nama task
-        self.bg_progress = 0       # 0–100
-        self.bg_current = ""       # nama file
-        self.bg_done = False       # selesai atau belum
-        self.bg_total = 0
-        self.bg_now = 0
+        self.preview_mode = False  # preview pane in place of the inactive panel
+        self.previews = PreviewCache()
+        self.watcher = DirectoryWatcher()
+        self.file_index = FileIndex()
+        self.dir_sizer = DirSizer()
+        self.entry_details = EntryDetails()
+        self.status_key = None
+        self.status_text = ""
+        for panel in (self.left_panel, self.right_panel):
+            panel.on_listing = self.file_index.ingest
+            if not panel.loading:
+                self.file_index.ingest(panel.path, panel.all_files)
+        self.views = {"left": PanelView(), "right": PanelView()}
+        self.overlays = {"message": Overlay(), "status": Overlay(), "progress": Overlay()}
+        self.painted = {}  # stdscr regions -> what they show now
+        self.layout = None
+        self.needs_full_redraw = True
+        self.needs_touch = False
+        self.jobs = JobScheduler()
         self.create_windows()
         self.init_ui()
 
@@ -51,6 +90,33 @@ class FileManager:
     def inactive_panel(self):
         return self.right_panel if self.active_panel == "left" else self.left_panel
 
+    def set_current_panel(self, panel):
+        if self.active_panel == "left":
+            self.left_panel = panel
+        else:
+            self.right_panel = panel
+
+    def open_virtual_panel(self, panel):
+        """Show a ResultPanel in place of the active panel"""
+        self.set_current_panel(panel)
+
+    def close_virtual_panel(self):
+        """Drop the active ResultPanel and bring back the panel it replaced"""
+        panel = self.current_panel
+        if not panel.virtual:
+            return None
+        panel.cancel_loading()
+        self.set_current_panel(panel.origin)
+        # The hidden panel was not watched meanwhile
+        panel.origin.refresh_files()
+        return panel.origin
+
+    def real_panel(self, panel):
+        """The directory panel behind any stacked virtual panels"""
+        while panel.virtual:
+            panel = panel.origin
+        return panel
+
 
     def create_windows(self):
         h, w = self.stdscr.getmaxyx()
@@ -77,6 +143,7 @@ class FileManager:
     #                    DRAW UI
     # =====================================================
     def draw(self):
+        """Repaint what changed since the last frame and push it in one doupdate"""
         height, width = self.stdscr.getmaxyx()
 
         if height <= 0 or width <= 0:
@@ -87,11 +154,33 @@ class FileManager:
                 self.stdscr.clear()
                 self.stdscr.addstr(0, 0, "Terminal terlalu kecil. Perbesar dan jalankan ulang.")
                 self.stdscr.refresh()
-                curses.napms(2000)
+                self.needs_full_redraw = True
                 return
             except:
                 return
 
+        layout = (height, width, self.right_panel_visible, self.search_mode, self.preview_mode)
+        if layout != self.layout:
+            self.layout = layout
+            self.needs_full_redraw = True
+
+        if self.needs_full_redraw:
+            self.stdscr.erase()
+            self.painted.clear()
+            for view in self.views.values():
+                view.reset()
+            for overlay in self.overlays.values():
+                overlay.reset()
+            self.needs_full_redraw = False
+            self.needs_touch = False
+        elif self.needs_touch:
+            # A popup covered part of the screen: copy our windows over it again,
+            # doupdate only sends the cells that really differ
+            self.stdscr.touchwin()
+            for view in self.views.values():
+                view.touch()
+            self.needs_touch = False
+
         self.draw_header(width)
 
         if self.right_panel_visible:
@@ -102,18 +191,25 @@ class FileManager:
         base_panel_height = max(height - 4, 5)
         panel_height = base_panel_height - (2 if self.search_mode else 0)
 
-        self.draw_panel(
-            self.left_panel,
-            2,
-            1,
-            panel_height,
-            panel_width,
-            self.active_panel == "left",
-        )
+        if self.preview_mode and self.active_panel == "right":
+            self.draw_preview(self.views["left"], 2, 1, panel_height, panel_width)
+        else:
+            self.draw_panel(
+                self.left_panel,
+                self.views["left"],
+                2,
+                1,
+                panel_height,
+                panel_width,
+                self.active_panel == "left",
+            )
 
-        if self.right_panel_visible:
+        if self.preview_mode and self.active_panel == "left":
+            self.draw_preview(self.views["right"], 2, panel_width + 2, panel_height, panel_width)
+        elif self.right_panel_visible:
             self.draw_panel(
                 self.right_panel,
+                self.views["right"],
                 2,
                 panel_width + 2,
                 panel_height,
@@ -121,28 +217,45 @@ class FileManager:
                 self.active_panel == "right",
             )
 
-        if self.message and self.message_timer > 0:
-            self.stdscr.addstr(
+        if self.message and time.monotonic() < self.message_until:
+            self.show_overlay(
+                "message",
                 height - 1,
                 0,
                 self.message.ljust(width - 1),
                 curses.color_pair(8 if "Error" in self.message else 9),
             )
-            self.message_timer -= 1
+        else:
+            self.show_overlay("message", height - 1, 0, "", 0)
 
         self.draw_status_bar(height, width)
         self.draw_progress_bar(height, width)
 
-        self.stdscr.refresh()
-
-
+        self.stdscr.noutrefresh()
+        self.views["left"].noutrefresh()
+        if self.right_panel_visible:
+            self.views["right"].noutrefresh()
+        for overlay in self.overlays.values():
+            overlay.noutrefresh()
+        curses.doupdate()
+
+    def show_overlay(self, name, y, x, text, attr):
+        """Put text on an overlay line; what it uncovered gets copied again"""
+        uncovered = self.overlays[name].show(y, x, text, attr)
+        if uncovered is not None:
+            self.stdscr.touchline(uncovered, 1)
+            for view in self.views.values():
+                view.touch_screen_row(uncovered)
+
+    def paint(self, region, content):
+        """True when region must be drawn because its content changed"""
+        if self.painted.get(region) == content:
+            return False
+        self.painted[region] = content
+        return True
 
     def human_size(self, size):
-        for unit in ["B", "KB", "MB", "GB", "TB"]:
-            if size < 1024:
-                return f"{size:.1f}{unit}"
-            size /= 1024
-        return f"{size:.1f}PB"
+        return human_size(size)
 
     def file_permissions(self, mode):
         perms = [
@@ -155,33 +268,50 @@ class FileManager:
 
 
     def draw_status_bar(self, height, width):
-        selected = self.current_panel.get_selected()
-        if not selected or selected == "[Permission Denied]":
+        entry = self.current_panel.get_selected_entry()
+        if not entry or entry.name == PERMISSION_DENIED:
+            self.status_key = None
+            self.show_overlay("status", height - 2, 1, "", 0)
             return
 
-        full_path = os.path.join(self.current_panel.path, selected)
+        # Formatted once per selection change, not once per frame
+        key = (entry, entry.stat, self.dir_sizer.version, self.entry_details.version)
+        if key != self.status_key:
+            self.status_key = key
+            self.status_text = self.status_line(entry)
 
-        try:
-            stat_info = os.stat(full_path)
-            size = self.human_size(stat_info.st_size) if not os.path.isdir(full_path) else "<DIR>"
-            owner = pwd.getpwuid(stat_info.st_uid).pw_name
-            perms = self.file_permissions(stat_info.st_mode)
-            mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(stat_info.st_mtime))
+        color = self.color_scheme.get(2) | curses.A_BOLD   # warna teks saja, no bg
 
-            info = f"{selected} | {size} | {owner} | {perms} | {mtime}"
+        self.show_overlay("status", height - 2, 1, self.status_text[: width - 2], color)
 
-        except Exception:
-            info = f"{selected} | <no info>"
+    def status_line(self, entry):
+        stat_info = entry.stat
+        if stat_info is None:
+            return f"{entry.name} | <no info>"
 
-        color = self.color_scheme.get(2) | curses.A_BOLD   # warna teks saja, no bg
+        if not entry.is_dir:
+            size = self.human_size(stat_info.st_size)
+        else:
+            totals = self.dir_sizer.get(entry)
+            size = f"<DIR> {self.human_size(totals[0])}, {totals[1]} files" if totals else "<DIR>"
 
-        try:
-            self.stdscr.addstr(height - 2, 1, info[: width - 2], color)
-        except curses.error:
-            pass
+        # Names come from the worker; numeric ids until they arrive
+        details = self.entry_details.get(entry)
+        owner, group, target = details or (str(stat_info.st_uid), str(stat_info.st_gid), None)
+        name = f"{entry.name} -> {target}" if target else entry.name
+        perms = self.file_permissions(stat_info.st_mode)
+        mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(stat_info.st_mtime))
+
+        parts = [name, size, f"{owner}:{group}", perms]
+        if stat_info.st_ino:  # archive members have no inode or links
+            parts += [f"{stat_info.st_nlink} links", f"inode {stat_info.st_ino}"]
+        parts.append(mtime)
+        return " | ".join(parts)
 
 
     def draw_header(self, width):
+        if not self.paint("header", width):
+            return
         header = "[ Zeta Manager ]"
         x = max(0, (width - len(header)) // 2)
         bg_color = self.color_scheme.get(12)
@@ -200,6 +330,7 @@ class FileManager:
     # =====================================================
     def toggle_right_panel(self):
         self.right_panel_visible = not self.right_panel_visible
+        self.preview_mode = False
 
         if not self.right_panel_visible and self.active_panel == "right":
             self.active_panel = "left"
@@ -210,163 +341,20 @@ class FileManager:
         )
 
 
-    def get_icon(self, filename):
-        name = filename.lower()
-        full = os.path.join(self.current_panel.path, filename)
-
-        # ====== DIRECTORY ======
-        if os.path.isdir(full):
-            # Folder open jika aktiv panel & cursor pada file ini
-            if filename == self.current_panel.get_selected():
-                return ""   # nf-fa-folder_open
-            return ""       # nf-fa-folder
-
-        # ====== PERMISSION DENIED ======
-        if filename == "[Permission Denied]":
-            return ""  # lock
-
-        # ====== SYMLINK ======
-        if os.path.islink(full):
-            return ""  # nf-oct-file_symlink
-
-        # ====== HIDDEN FILE ======
-        if name.startswith("."):
-            return ""  # nf-fa-terminal (represent hidden)
-
-        # ====== EXECUTABLES ======
-        if os.access(full, os.X_OK) and not os.path.isdir(full):
-            return ""  # nf-oct-gear
-
-        # ====== PROGRAMMING LANGUAGES ======
-
-        # Python
-        if name.endswith(".py"): return ""
-
-        # C / C++
-        if name.endswith((".c", ".h")): return ""
-        if name.endswith((".cpp", ".hpp", ".cc", ".cxx")): return ""
-
-        # Rust
-        if name.endswith(".rs"): return ""
-
-        # Go
-        if name.endswith(".go"): return ""
-
-        # Java
-        if name.endswith(".java"): return ""
-
-        # Kotlin
-        if name.endswith(".kt"): return ""
-
-        # Swift
-        if name.endswith(".swift"): return ""
-
-        # C#
-        if name.endswith(".cs"): return ""
-
-        # PHP
-        if name.endswith(".php"): return ""
-
-        # Ruby
-        if name.endswith(".rb"): return ""
-
-        # Lua
-        if name.endswith(".lua"): return ""
-
-        # JavaScript
-        if name.endswith(".js"): return ""
-        if name.endswith(".mjs"): return ""
-
-        # TypeScript
-        if name.endswith(".ts"): return ""
-        if name.endswith(".tsx"): return ""
-
-        # HTML / CSS
-        if name.endswith(".html"): return ""
-        if name.endswith(".css"): return ""
-        if name.endswith(".scss"): return ""
-        if name.endswith(".less"): return ""
-        if name.endswith(".svelte"): return ""
-        if name.endswith(".vue"): return "﵂"
-
-        # SQL / DB
-        if name.endswith((".sql", ".db", ".sqlite", ".sqlite3")):
-            return ""
-
-        # JSON / YAML / TOML / Config
-        if name.endswith(".json"): return ""
-        if name.endswith(".yaml") or name.endswith(".yml"): return ""
-        if name.endswith(".toml"): return ""
-        if name.endswith((".ini", ".cfg")): return ""
-
-        # Makefile / build system
-        if name in ("makefile", "gnumakefile") or name.endswith(".mk"):
-            return ""
-        if name.endswith(".cmake"):
-            return "󰔷"
-
-        # Assembly
-        if name.endswith((".asm", ".s")):
-            return ""
-
-        # Shell Script
-        if name.endswith((".sh", ".bash", ".zsh")):
-            return ""
-
-        # Docker / DevOps
-        if name == "dockerfile":
-            return ""
-        if name.endswith(".tf"):
-            return ""
-
-        # Git stuff
-        if name.endswith(".patch"): return ""
-        if name.endswith(".diff"): return ""
-
-        # ====== DOCUMENTS ======
-        if name.endswith(".md"): return ""
-        if name.endswith(".txt"): return ""
-        if name.endswith(".pdf"): return ""
-        if name.endswith((".doc", ".docx")): return ""
-        if name.endswith((".ppt", ".pptx")): return ""
-        if name.endswith((".xls", ".xlsx")): return ""
-
-        # XML
-        if name.endswith(".xml"): return ""
-
-        # ====== MEDIA ======
-        if name.endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")):
-            return ""
-        if name.endswith((".mp4", ".mkv", ".avi", ".mov", ".flv")):
-            return ""
-        if name.endswith((".mp3", ".wav", ".flac", ".ogg")):
-            return ""
-
-        # ====== ARCHIVE ======
-        if name.endswith((".zip", ".rar", ".7z", ".tar", ".gz", ".bz2", ".xz")):
-            return ""
-
-        # ====== FONTS ======
-        if name.endswith((".ttf", ".otf", ".woff", ".woff2")):
-            return ""
-
-        # ====== DEFAULT FILE ======
-        return ""
-
-
     # =====================================================
     #                DRAW PANEL (LEFT/RIGHT)
     # =====================================================
-    def draw_panel(self, panel, y, x, height, width, active):
+    def draw_panel(self, panel, view, y, x, height, width, active):
         # SEARCH MODE
         if active and self.search_mode:
-            search_line = f"[ /: {self.search_query}"
-            search_bg = self.color_scheme.get(12) | curses.A_BOLD
-
-            self.stdscr.attron(search_bg)
-            self.stdscr.addstr(y, x, " " * (width + 1))
-            self.stdscr.addstr(y, x + 2, search_line[: width - 3])
-            self.stdscr.attroff(search_bg)
+            mode = "~" if panel.search.fuzzy else "/"
+            search_line = f"[ {mode}: {self.search_query}"
+            if self.paint(("head", x), ("search", search_line, width)):
+                search_bg = self.color_scheme.get(12) | curses.A_BOLD
+                self.stdscr.attron(search_bg)
+                self.stdscr.addstr(y, x, " " * (width + 1))
+                self.stdscr.addstr(y, x + 2, search_line[: width - 3])
+                self.stdscr.attroff(search_bg)
             panel_y = y + 1
 
         else:
@@ -374,75 +362,64 @@ class FileManager:
             if len(path_line) > width - 4:
                 path_line = "..." + path_line[-(width - 7):]
 
-            header_color = self.color_scheme.get(12 if active else 4)
-            self.stdscr.attron(header_color)
-            self.stdscr.addstr(y, x, " " * (width + 1))
-            self.stdscr.addstr(y, x + 2, path_line.ljust(width - 3))
-            self.stdscr.attroff(header_color)
+            if self.paint(("head", x), ("path", path_line, width, active)):
+                header_color = self.color_scheme.get(12 if active else 4)
+                self.stdscr.attron(header_color)
+                self.stdscr.addstr(y, x, " " * (width + 1))
+                self.stdscr.addstr(y, x + 2, path_line.ljust(width - 3))
+                self.stdscr.attroff(header_color)
             panel_y = y + 1
 
-        # DRAW BORDER
-        border_color = curses.color_pair(2) if active else curses.color_pair(3)
-        self.stdscr.attron(border_color)
-        try:
-            for i in range(panel_y, panel_y + height + 1):
-                if i == panel_y:
-                    self.stdscr.addstr(i, x, "┌" + "─" * (width - 1) + "┐")
-                elif i == panel_y + height:
-                    self.stdscr.addstr(i, x, "└" + "─" * (width - 1) + "┘")
-                else:
-                    self.stdscr.addstr(i, x, "│")
-                    self.stdscr.addstr(i, x + width, "│")
-        except curses.error:
-            pass
-        self.stdscr.attroff(border_color)
+        # BORDER + FOOTER SUMMARY (only redrawn when one of them changes)
+        view.place(panel_y, x, height, width)
+        summary_text = f"[ {panel.summary()}{' ...' if panel.loading else ''} ]"
+        view.draw_frame(
+            active,
+            summary_text,
+            curses.color_pair(2) if active else curses.color_pair(3),
+            self.color_scheme.get(9 if active else 8) | curses.A_BOLD,
+        )
 
-        # FILES
-        total_files = len(panel.files)
+        # FILES (only rows that differ from the screen are written)
         visible_items = height - 2
-        start = panel.scroll_offset
-        end = min(start + visible_items, total_files)
+        rows = panel.row_model.visible_rows(
+            visible_items, width, self.icons.resolve, self.dir_sizer
+        )
+        view.render(panel, rows, self.color_scheme.get)
+
+    def draw_preview(self, view, y, x, height, width):
+        """Head of the selected file, drawn where the inactive panel was"""
+        entry = self.current_panel.get_selected_entry()
+        cols = width - 3
+        if entry is None or entry.name == PERMISSION_DENIED:
+            preview, title = Preview([], 0), "Preview"
+        else:
+            preview, title = self.previews.get(entry, height - 2, cols), entry.name
+        if len(title) > width - 4:
+            title = "..." + title[-(width - 7):]
 
-        for i, item in enumerate(panel.files[start:end]):
-            idx = start + i
-            is_selected = idx == panel.cursor_pos
-            full_path = os.path.join(panel.path, item)
-            is_dir = os.path.isdir(full_path)
+        if self.paint(("head", x), ("preview", title, width)):
+            header_color = self.color_scheme.get(4)
+            self.stdscr.attron(header_color)
+            self.stdscr.addstr(y, x, " " * (width + 1))
+            self.stdscr.addstr(y, x + 2, title.ljust(width - 3))
+            self.stdscr.attroff(header_color)
 
-            if is_dir:
-                size_str = "<DIR>"
-            else:
-                try:
-                    size_str = f"{os.path.getsize(full_path)} B"
-                except:
-                    size_str = "N/A"
-
-            icon = self.get_icon(item)
-            name_trim = item if len(item) <= width - 20 else item[:width - 23] + "..."
-            display_name = f"{icon} {name_trim}"
-            line = f"{display_name:<{width - 15}} {size_str:>10}"
-
-            color = (
-                self.color_scheme.get(7) if is_selected and is_dir
-                else self.color_scheme.get(5) if is_selected
-                else self.color_scheme.get(6) if is_dir
-                else self.color_scheme.get(1)
-            )
+        view.place(y + 1, x, height, width)
+        view.draw_frame(
+            False,
+            f"[ {preview.summary or 'preview'} ]", curses.color_pair(3), self.color_scheme.get(8) | curses.A_BOLD
+        )
+        lines = preview.lines[: height - 2]
+        rows = [(line[:cols].ljust(cols), PAIR_FILE) for line in lines]
+        rows += [(" " * cols, PAIR_FILE)] * (height - 2 - len(rows))
+        view.render(preview, rows, self.color_scheme.get)
 
-            try:
-                self.stdscr.addstr(panel_y + 1 + i, x + 2, line[: width - 3], color)
-            except curses.error:
-                pass
-
-        # FOOTER SUMMARY
-        try:
-            summary_text = f"[ {total_files} files ]"
-            summary_color = self.color_scheme.get(9 if active else 8) | curses.A_BOLD
-            self.stdscr.attron(summary_color)
-            self.stdscr.addstr(panel_y + height, x + 2, summary_text[: width - 4])
-            self.stdscr.attroff(summary_color)
-        except curses.error:
-            pass
+    def toggle_preview(self):
+        self.preview_mode = not self.preview_mode
+        if self.preview_mode:
+            self.right_panel_visible = True
+        self.show_message(f"Preview {'on' if self.preview_mode else 'off'}", 2)
 
     # =====================================================
     #                FILE OPERATIONS
@@ -453,6 +430,10 @@ class FileManager:
             self.show_message("No directory selected", 2)
             return
 
+        if self.current_panel.virtual:
+            self.show_message("Error: create files in a directory panel", 5)
+            return
+
         height, width = self.stdscr.getmaxyx()
         popup_h = 5
         popup_w = min(50, width - 10)
@@ -476,158 +457,228 @@ class FileManager:
 
             if new_file_name:
                 new_file_path = os.path.join(self.current_panel.path, new_file_name)
-                with open(new_file_path, "w") as f:
-                    f.write("")
-                self.show_message(f"Created '{new_file_name}'", 3)
-                self.current_panel.refresh_files()
+                try:
+                    with open(new_file_path, "w") as f:
+                        f.write("")
+                    self.show_message(f"Created '{new_file_name}'", 3)
+                    self.refresh_panel(self.current_panel)
+                except OSError as e:
+                    self.show_message(f"Error: {e.strerror or e}", 5)
 
         finally:
             curses.curs_set(0)
-            self.stdscr.touchwin()
-            self.stdscr.refresh()
+            self.needs_touch = True
 
     # =====================================================
     #      FULL COPY / CUT / PASTE (NO DELETE!)
     # =====================================================
-    def copy_file(self):
-        selected = self.current_panel.get_selected()
-        if not selected or selected == "[Permission Denied]":
-            self.show_message("No file selected", 2)
-            return
+    def selected_entries(self, panel=None):
+        """Marked entries of the panel, or just the one under the cursor"""
+        panel = panel or self.current_panel
+        entries = panel.marked_entries()
+        if entries:
+            return entries
+        entry = panel.get_selected_entry()
+        if not entry or entry.name == PERMISSION_DENIED:
+            return []
+        return [entry]
+
+    def describe(self, entries):
+        return entries[0].name if len(entries) == 1 else f"{len(entries)} items"
 
-        self.clipboard_path = os.path.join(self.current_panel.path, selected)
-        self.clipboard_mode = "copy"
-        self.show_message(f"Copied: {selected}", 3)
+    def copy_file(self):
+        self.set_clipboard("copy", "Copied")
 
     def cut_file(self):
-        selected = self.current_panel.get_selected()
-        if not selected or selected == "[Permission Denied]":
+        self.set_clipboard("cut", "Cut")
+
+    def set_clipboard(self, mode, verb):
+        panel = self.current_panel
+        entries = self.selected_entries()
+        if not entries:
             self.show_message("No file selected", 2)
             return
 
-        self.clipboard_path = os.path.join(self.current_panel.path, selected)
-        self.clipboard_mode = "cut"
-        self.show_message(f"Cut: {selected}", 3)
+        if isinstance(panel, ArchivePanel):
+            if mode == "cut":
+                self.show_message("Error: archives are read-only, use copy", 5)
+                return
+            self.clipboard_archive = panel.archive_path
+            self.clipboard_paths = [panel.inner_path(entry) for entry in entries]
+        else:
+            self.clipboard_archive = ""
+            self.clipboard_paths = [entry.path for entry in entries]
+        self.clipboard_mode = mode
+        self.current_panel.clear_marks()
+        self.show_message(f"{verb}: {self.describe(entries)}", 3)
 
     def draw_progress_bar(self, height, width):
-        if not self.bg_task or self.bg_done:
+        active = self.jobs.active
+        if not active:
+            self.show_overlay("progress", height - 3, 1, "", 0)
             return
 
-        bar_width = width - 20
-        filled = int((self.bg_progress / 100) * bar_width)
+        total = sum(job.meter.total_bytes for job in active)
+        done = sum(job.meter.done_bytes for job in active)
+        if total:
+            progress = done * 100 / total
+        else:
+            progress = sum(job.progress for job in active) / len(active)
+
+        bar_width = max(width - 50, 10)
+        filled = int((progress / 100) * bar_width)
         empty = bar_width - filled
 
+        job = active[0]
+        label = f"{job.kind}: {job.meter.current or job.title}"
+        if len(active) > 1:
+            label = f"{len(active)} jobs | {label}"
         bar = "[" + "=" * filled + " " * empty + "]"
-        line = (
-            f"{self.bg_task}: {self.bg_current} "
-            f"{bar} {self.bg_progress:.0f}% "
-        )
+        line = f"{label[:34]} {bar} {progress:.0f}% "
 
-        try:
-            self.stdscr.addstr(height - 3, 1, line[: width - 2], self.color_scheme.get(3) | curses.A_BOLD)
-        except curses.error:
-            pass
+        self.show_overlay("progress", height - 3, 1, line[: width - 2], self.color_scheme.get(3) | curses.A_BOLD)
 
 
     def paste_file(self):
-        """Paste file with progress bar"""
-        if not self.clipboard_path:
+        """Queue the clipboard as one background copy or move job"""
+        if not self.clipboard_paths:
             self.show_message("Clipboard empty", 2)
             return
 
-        src = self.clipboard_path
-        dest_dir = self.current_panel.path
-        filename = os.path.basename(src)
-        dest = os.path.join(dest_dir, filename)
-
-        if os.path.isdir(src):
-            self.show_message("Folder copy not yet supported with progress", 3)
+        if self.current_panel.virtual:
+            self.show_message("Error: paste into a directory panel", 5)
             return
 
-        self.bg_task = "Copy" if self.clipboard_mode == "copy" else "Move"
-        self.bg_progress = 0
-        self.bg_current = filename
-        self.bg_done = False
+        dest_dir = self.current_panel.path
+        moving = self.clipboard_mode == "cut"
+        sources = self.clipboard_paths
 
-        try:
-            self.bg_total = os.path.getsize(src)
-        except:
-            self.show_message("Error getting file size", 5)
+        if self.clipboard_archive:
+            # Only the chosen members are decompressed, nothing else hits the disk
+            job = self.jobs.submit(MemberCopyJob(self.clipboard_archive, sources, dest_dir))
+            self.show_message(f"{job.kind} queued: {job.title}", 2)
             return
-            
-        self.bg_now = 0
 
-        import threading
-        
-        def worker():
-            try:
-                with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
-                    chunk = 1024 * 1024  # 1MB
-                    while True:
-                        if self.bg_done:  # Check jika di-cancel
-                            break
-                        
-                        data = fsrc.read(chunk)
-                        if not data:
-                            break
-                        
-                        fdst.write(data)
-                        self.bg_now += len(data)
-                        self.bg_progress = (self.bg_now / self.bg_total) * 100
-                        
-            except Exception as e:
-                self.bg_done = True
-                self.show_message(f"Error during copy: {e}", 5)
+        if moving:
+            sources = [
+                src for src in sources
+                if os.path.dirname(os.path.abspath(src)) != os.path.abspath(dest_dir)
+            ]
+            if not sources:
+                self.show_message("Error: source and destination are the same", 5)
                 return
 
-            # Hapus source jika cut mode
-            if not self.bg_done and self.clipboard_mode == "cut":
-                try:
-                    os.remove(src)
-                except:
-                    pass
+        # Never overwrite: when it starts, the job claims 'name (1).ext' on a clash
+        pairs = [(src, os.path.join(dest_dir, os.path.basename(src))) for src in sources]
 
-            # Reset status
-            if not self.bg_done:
-                self.bg_done = True
+        title = os.path.basename(pairs[0][1]) if len(pairs) == 1 else f"{len(pairs)} items"
+        job_class = MoveJob if moving else CopyJob
+        job = job_class(pairs, title)
+        if moving:
+            # Second paste of the same cut must not move it again
+            self.clipboard_paths = []
+        self.jobs.submit(job)
+        self.show_message(f"{job.kind} queued: {job.title}", 2)
 
-        # Start thread
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
-        
-        # Mode non-blocking untuk handle input selama proses
-        self.stdscr.nodelay(True)
-        while thread.is_alive():
-            self.draw()  # Hanya main thread yang boleh draw
-            key = self.stdscr.getch()
-            if key != -1:
-                if key == 27:  # ESC untuk cancel
-                    self.bg_done = True
-                    # Tunggu thread berhenti
-                    thread.join(timeout=1)
-                    self.show_message("Operation cancelled", 3)
-                    self.stdscr.nodelay(False)
-                    return
-                self.handle_input()
-            curses.napms(50)  # Update setiap 50ms
-        
-        self.stdscr.nodelay(False)
-        
-        # Selesai
-        self.current_panel.refresh_files()
-        self.show_message(f"{self.bg_task} done: {filename}", 3)
-        self.bg_task = None  # Reset
+    # =====================================================
+    #                      JOBS
+    # =====================================================
+    def poll_jobs(self):
+        """Start queued jobs and report the ones that finished"""
+        for job in self.jobs.tick():
+            self.show_message(job.summary(), 5)
+            for panel in (self.left_panel, self.right_panel):
+                if panel.path not in job.touched:
+                    continue
+                if panel.virtual:
+                    panel.refresh_files()
+                else:
+                    self.refresh_panel(panel)
+
+    def format_job(self, job, width):
+        m = job.meter
+        rate = job.rate()
+        eta = job.eta()
+        parts = [
+            f"#{job.id:<3} {job.state:<9} {PRIORITY_NAMES[job.priority]:<6} {job.kind:<7}",
+            f"{job.progress:3.0f}%",
+            f"{m.done_files}/{m.total_files}",
+            f"{human_size(rate)}/s" if rate else "-",
+            time.strftime("ETA %H:%M:%S", time.gmtime(eta)) if eta is not None else "",
+            job.title,
+        ]
+        return " ".join(parts)[: width]
+
+    def show_jobs(self):
+        """Jobs popup: p pause/resume, c cancel, +/- priority, C clear finished"""
+        selected = 0
+        self.stdscr.timeout(500)
+        try:
+            while True:
+                self.poll_jobs()
+                jobs = self.jobs.jobs
+                height, width = self.stdscr.getmaxyx()
+                popup_h = min(max(len(jobs), 1) + 4, height - 4)
+                popup_w = min(100, width - 4)
+                popup = curses.newwin(
+                    popup_h, popup_w, max(1, (height - popup_h) // 2), max(1, (width - popup_w) // 2)
+                )
+                popup.border()
+                popup.addstr(0, 2, f" Jobs ({len(self.jobs.active)} active) ")
+
+                selected = min(selected, max(len(jobs) - 1, 0))
+                rows = popup_h - 4
+                top = max(0, selected - rows + 1)
+                if not jobs:
+                    popup.addstr(1, 2, "No jobs")
+                for i, job in enumerate(jobs[top: top + rows]):
+                    attr = curses.A_REVERSE if top + i == selected else 0
+                    popup.addstr(i + 1, 2, self.format_job(job, popup_w - 4), attr)
+
+                popup.addstr(popup_h - 2, 2, "p pause/resume  c cancel  +/- priority  C clear  ESC close"[: popup_w - 4])
+                popup.refresh()
+
+                key = self.stdscr.getch()
+                job = jobs[selected] if jobs else None
+                if key in (27, ord("j"), ord("q")):
+                    break
+                elif key == curses.KEY_UP:
+                    selected = max(selected - 1, 0)
+                elif key == curses.KEY_DOWN:
+                    selected = min(selected + 1, max(len(jobs) - 1, 0))
+                elif key == ord("C"):
+                    self.jobs.clear_finished()
+                elif job is None:
+                    continue
+                elif key == ord("p"):
+                    if job.state == PAUSED:
+                        job.resume()
+                    else:
+                        job.pause()
+                elif key == ord("c"):
+                    job.cancel()
+                elif key in (ord("+"), ord("-")) and job.state == QUEUED:
+                    step = -1 if key == ord("+") else 1
+                    job.priority = min(max(job.priority + step, PRIORITY_HIGH), PRIORITY_LOW)
+        finally:
+            self.stdscr.timeout(-1)
+            self.needs_touch = True
 
     # =====================================================
     #                   DELETE FILE
     # =====================================================
     def delete_file(self):
-        selected = self.current_panel.get_selected()
-        if not selected:
+        entries = self.selected_entries()
+        if not entries:
             self.show_message("No file selected", 2)
             return
 
-        path = os.path.join(self.current_panel.path, selected)
+        if isinstance(self.current_panel, ArchivePanel):
+            self.show_message("Error: archives are read-only", 5)
+            return
+
+        selected = self.describe(entries)
+        in_trash = isinstance(self.current_panel, TrashPanel)
         height, width = self.stdscr.getmaxyx()
 
         popup_h = 5
@@ -637,43 +688,125 @@ class FileManager:
         )
         popup.border()
         popup.addstr(0, 2, " Confirm Delete ")
-        popup.addstr(1, 2, f"Delete '{selected[:30]}'?")
-        popup.addstr(2, 2, "This action cannot be undone!")
-        popup.addstr(3, 2, "Press Y to confirm, any key to cancel")
+        if in_trash:
+            popup.addstr(1, 2, f"Purge '{selected[:30]}' from trash?")
+            popup.addstr(2, 2, "This action cannot be undone!")
+            popup.addstr(3, 2, "Press Y to confirm, any key to cancel")
+        else:
+            popup.addstr(1, 2, f"Delete '{selected[:30]}'?")
+            popup.addstr(2, 2, "Y: move to trash, D: delete forever")
+            popup.addstr(3, 2, "Any other key to cancel")
         popup.refresh()
 
         key = self.stdscr.getch()
+        self.needs_touch = True
+        paths = [entry.path for entry in entries]
+
+        if in_trash and key in [ord("Y"), ord("y")]:
+            self.current_panel.clear_marks()
+            self.jobs.submit(PurgeJob(trashed=paths))
+        elif key in [ord("Y"), ord("y")]:
+            self.trash_entries(paths, selected)
+        elif not in_trash and key == ord("D"):
+            job = DeleteJob(paths, selected)
+            job.result = f"Deleted '{selected}'"
+            if self.current_panel.virtual:
+                # The result panel drops the deleted rows once the job is done
+                job.touched.append(self.current_panel.path)
+            self.current_panel.clear_marks()
+            self.jobs.submit(job)
 
-        if key in [ord("Y"), ord("y")]:
+    # =====================================================
+    #                      TRASH
+    # =====================================================
+    def trash_entries(self, paths, selected):
+        """Rename entries into the trash of their filesystem, no data is copied"""
+        errors = []
+        for path in paths:
             try:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
-                else:
-                    os.remove(path)
-                self.show_message(f"Deleted '{selected}'", 3)
-                self.current_panel.refresh_files()
-            except Exception as e:
-                self.show_message(f"Error deleting: {e}", 5)
+                move_to_trash(path)
+            except OSError as e:
+                errors.append(f"{os.path.basename(path)}: {e.strerror or e}")
+
+        panel = self.current_panel
+        panel.clear_marks()
+        if panel.virtual:
+            # A result panel drops the rows of the items that went to the trash
+            panel.refresh_files()
+        else:
+            self.refresh_panel(panel)
+        if errors:
+            self.show_message(f"Error: {errors[0]} (D deletes forever)", 5)
+        else:
+            self.show_message(f"Moved '{selected}' to trash", 3)
+
+    def show_trash(self):
+        if isinstance(self.current_panel, TrashPanel):
+            self.close_virtual_panel()
+            return
+        self.open_virtual_panel(TrashPanel(self.current_panel))
+
+    def restore_from_trash(self):
+        panel = self.current_panel
+        entries = self.selected_entries()
+        if not entries:
+            return
+        restored, errors = [], []
+        for entry in entries:
+            try:
+                restored.append(restore(entry.path))
+            except OSError as e:
+                errors.append(f"{os.path.basename(entry.path)}: {e.strerror or e}")
+
+        panel.clear_marks()
+        panel.refresh_files()
+        self.refresh_panel(self.real_panel(panel))
+        if errors:
+            self.show_message(f"Error restoring {errors[0]}", 5)
+        else:
+            self.show_message(f"Restored {self.describe(entries)} to {os.path.dirname(restored[0])}", 3)
+
+    def empty_trash(self):
+        purge_days = self.jobs.config.getfloat("Trash", "purge_after_days", fallback=0)
+        height, width = self.stdscr.getmaxyx()
+        popup_h = 5 if purge_days > 0 else 4
+        popup_w = 50
+        popup = curses.newwin(
+            popup_h, popup_w, height // 2 - popup_h // 2, width // 2 - popup_w // 2
+        )
+        popup.border()
+        popup.addstr(0, 2, " Empty Trash ")
+        popup.addstr(1, 2, "Permanently delete everything in the trash?")
+        if purge_days > 0:
+            popup.addstr(2, 2, f"O: only items older than {purge_days:g} days")
+        popup.addstr(popup_h - 2, 2, "Press Y to confirm, any key to cancel")
+        popup.refresh()
+
+        key = self.stdscr.getch()
+        self.needs_touch = True
+        if key in [ord("Y"), ord("y")]:
+            self.jobs.submit(PurgeJob())
+            self.show_message("Emptying trash in the background", 3)
+        elif purge_days > 0 and key in [ord("O"), ord("o")]:
+            self.jobs.submit(PurgeJob(max_age_days=purge_days))
+            self.show_message(f"Purging trash older than {purge_days:g} days in the background", 3)
 
     # =====================================================
     #                   USER INPUT HANDLER
     # =====================================================
     def handle_input(self):
-        # Jika ada operasi background yang sedang berjalan, gunakan timeout
-        if self.bg_task and not self.bg_done:
-            self.stdscr.timeout(100)  # Timeout 100ms agar tidak blocking
-        else:
-            self.stdscr.timeout(-1)  # Blocking jika tidak ada operasi
-        
-        key = self.stdscr.getch()
-        
-        # Reset ke blocking setelah getch
-        self.stdscr.timeout(-1)
-        
-        # Jika timeout terjadi (key == -1), tetap return True agar loop berlanjut
-        if key == -1:
-            return True
+        """Handle every key already typed, False once the user quits"""
+        while True:
+            # Non-blocking read; popups opened by an action read blocking again
+            self.stdscr.nodelay(True)
+            key = self.stdscr.getch()
+            self.stdscr.nodelay(False)
+            if key == -1:
+                return True
+            if not self.handle_key(key):
+                return False
 
+    def handle_key(self, key):
         if self.search_mode:
             self.handle_search_input(key)
             return True
@@ -681,9 +814,10 @@ class FileManager:
         actions = {
             curses.KEY_UP: lambda: self.current_panel.navigate(-1, self.get_visible_height()),
             curses.KEY_DOWN: lambda: self.current_panel.navigate(1, self.get_visible_height()),
-            curses.KEY_LEFT: self.current_panel.go_up,
-            curses.KEY_RIGHT: self.current_panel.enter_directory,
+            curses.KEY_LEFT: self.go_up,
+            curses.KEY_RIGHT: self.enter_directory,
 
+            curses.KEY_F3: self.toggle_preview,
             curses.KEY_F4: self.toggle_right_panel,
 
             curses.KEY_F6: self.copy_file,
@@ -696,13 +830,35 @@ class FileManager:
             10: self.execute_or_enter,
             9: self.toggle_panel,
 
+            32: self.current_panel.toggle_mark,
+            ord("a"): self.current_panel.mark_all,
+            ord("*"): self.current_panel.invert_marks,
+            ord("+"): lambda: self.mark_by_glob(True),
+            ord("-"): lambda: self.mark_by_glob(False),
+
             ord("/"): self.start_search,
+            ord("j"): self.show_jobs,
+            ord("t"): self.show_trash,
+            ord("T"): self.empty_trash,
+            ord("f"): self.find_files,
+            ord("i"): self.search_index,
+            ord("I"): self.update_index,
+            ord("s"): self.size_directory,
+            ord("S"): self.toggle_auto_sizes,
             ord("n"): self.create_new_file,
             ord("r"): self.rename_file,
             ord("R"): self.rename_file,
             ord('z'): self.extract_zip,
             ord('g'): self.extract_tar_gz,
             ord('x'): self.extract_tar_xz,
+            ord('c'): self.create_archive,
+            ord('v'): self.view_file,
+            ord('G'): self.grep_files,
+            ord('D'): self.find_duplicates,
+            ord('m'): self.mark_duplicate_copies,
+            ord('L'): self.hardlink_duplicates,
+            ord('h'): self.compute_checksums,
+            ord('H'): self.verify_checksums,
 
             curses.KEY_F10: self.exit_program,
             
@@ -717,12 +873,55 @@ class FileManager:
         return True
 
     def cancel_background_task(self):
-        """Cancel operasi background yang sedang berjalan"""
-        if self.bg_task and not self.bg_done:
-            self.bg_done = True
-            self.show_message("Operation cancelled", 3)
-            return True
-        return False
+        """Cancel scan direktori atau operasi background yang sedang berjalan"""
+        if self.current_panel.loading:
+            self.current_panel.cancel_loading()
+            self.show_message("Scan cancelled", 3)
+        elif self.current_panel.virtual:
+            self.close_virtual_panel()
+        elif self.jobs.active:
+            # Newest job first, like the single operation this replaced
+            self.cancel_job(self.jobs.active[-1])
+
+    def cancel_job(self, job):
+        """Cancel job once the user confirms it by name"""
+        height, width = self.stdscr.getmaxyx()
+        popup_h = 4
+        popup_w = 50
+        popup = curses.newwin(
+            popup_h, popup_w, height // 2 - popup_h // 2, width // 2 - popup_w // 2
+        )
+        popup.border()
+        popup.addstr(0, 2, " Cancel Job ")
+        popup.addstr(1, 2, f"Cancel {job.kind.lower()} '{job.title[:30]}'?")
+        popup.addstr(2, 2, "Press Y to confirm, any key to cancel")
+        popup.refresh()
+
+        key = self.stdscr.getch()
+        self.needs_touch = True
+        if key in [ord("Y"), ord("y")] and not job.done:
+            job.cancel()
+            self.show_message(f"Cancelling {job.kind.lower()}: {job.title}", 3)
+
+    def panels_loading(self):
+        return self.left_panel.loading or self.right_panel.loading
+
+    def poll_panels(self):
+        """Merge streamed directory entries and live changes from inotify"""
+        panels = (self.left_panel, self.right_panel)
+        for panel in panels:
+            panel.poll_loader()
+
+        self.watcher.sync(panel.path for panel in panels if not panel.virtual)
+        changes = self.watcher.read_events()
+        for panel in panels:
+            if panel.path in changes:
+                panel.apply_changes(changes[panel.path])
+
+    def refresh_panel(self, panel):
+        """Rescan a panel unless inotify already reports its changes"""
+        if not self.watcher.watching(panel.path):
+            panel.refresh_files()
 
 
     def get_visible_height(self):
@@ -736,14 +935,25 @@ class FileManager:
     #            SEARCH, RENAME, ETC.
     # =====================================================
     def execute_or_enter(self):
-        selected = self.current_panel.get_selected()
-        if not selected:
+        if isinstance(self.current_panel, (TrashPanel, ArchivePanel)):
+            self.enter_directory()
+            return
+        entry = self.current_panel.get_selected_entry()
+        if not entry or entry.name == PERMISSION_DENIED:
+            return
+
+        if isinstance(entry, GrepHit):
+            self.view_file()
+            return
+
+        if not entry.is_dir and archive_mode(entry.name) is not None:
+            self.enter_directory()
             return
 
-        full_path = os.path.join(self.current_panel.path, selected)
+        full_path = entry.path
 
-        if os.path.isdir(full_path):
-            self.current_panel.enter_directory()
+        if entry.is_dir:
+            self.enter_directory()
             return
 
         try:
@@ -812,14 +1022,31 @@ class FileManager:
                     )
                 else:
                     # View file content
-                    subprocess.Popen(
-                        [terminal, "-e", "bash", "-c", f'echo "=== File: {os.path.basename(full_path)} ===" && echo && cat "{full_path}" && echo && echo "=== End of file ===" && echo && echo "Press Enter to close..."; read'],
-                        start_new_session=True,
-                    )
+                    self.view_file()
 
         except Exception as e:
             self.show_message(f"Error executing: {str(e)}", 5)
 
+    def view_file(self):
+        """Open the selected file (or grep hit) in the built-in pager"""
+        entry = self.current_panel.get_selected_entry()
+        if not entry or entry.is_dir or entry.name == PERMISSION_DENIED:
+            self.show_message("No file selected", 2)
+            return
+        if entry.stat is None or not stat.S_ISREG(entry.stat.st_mode) or not entry.stat.st_ino:
+            self.show_message("Error: only regular files can be viewed", 5)
+            return
+        try:
+            line = entry.line if isinstance(entry, GrepHit) else None
+            pager = Pager(self.stdscr, entry.path, self.prompt, line)
+        except (OSError, ValueError) as e:
+            self.show_message(f"Error: {e}", 5)
+            return
+        try:
+            pager.run()
+        finally:
+            self.needs_touch = True
+
     def detect_terminal_safe(self):
         """Pilih terminal yang paling stabil, hindari yang bermasalah"""
         # Prioritaskan terminal yang stabil
@@ -849,6 +1076,249 @@ class FileManager:
         # Fallback ke xterm (harusnya selalu ada)
         return "xterm"
 
+    def go_up(self):
+        panel = self.current_panel
+        if isinstance(panel, ArchivePanel) and panel.go_up():
+            return
+        if panel.virtual:
+            self.close_virtual_panel()
+        else:
+            self.current_panel.go_up()
+
+    def enter_directory(self):
+        panel = self.current_panel
+        if isinstance(panel, TrashPanel):
+            self.restore_from_trash()
+            return
+        if isinstance(panel, ArchivePanel):
+            entry = panel.get_selected_entry()
+            if entry and entry.is_dir:
+                panel.enter_directory()
+            elif entry:
+                self.show_message("F6 copies members out, F8 in the other panel pastes", 3)
+            return
+        if not panel.virtual:
+            entry = panel.get_selected_entry()
+            if entry and not entry.is_dir and archive_mode(entry.name) is not None:
+                self.open_virtual_panel(ArchivePanel(entry.path, panel))
+                return
+            panel.enter_directory()
+            return
+
+        entry = panel.get_selected_entry()
+        if not entry:
+            return
+        origin = self.real_panel(panel)
+        panel.cancel_loading()
+        self.set_current_panel(origin)
+        if entry.is_dir:
+            origin.go_to(entry.path)
+        else:
+            origin.go_to(os.path.dirname(entry.path), os.path.basename(entry.path))
+
+    def prompt(self, title, label, initial=""):
+        """Single-line input popup, returns the stripped text ('' if empty)"""
+        height, width = self.stdscr.getmaxyx()
+        popup_h = 5
+        popup_w = min(70, width - 4)
+        popup_y = max(1, height // 2 - popup_h // 2)
+        popup_x = max(1, width // 2 - popup_w // 2)
+
+        popup = curses.newwin(popup_h, popup_w, popup_y, popup_x)
+        popup.border()
+        popup.addstr(0, 2, f" {title} ")
+        popup.addstr(1, 2, label[: popup_w - 4])
+        popup.refresh()
+
+        input_win = curses.newwin(1, popup_w - 4, popup_y + 2, popup_x + 2)
+        input_win.addstr(0, 0, initial[: popup_w - 5])
+
+        curses.curs_set(1)
+        curses.noecho()
+        try:
+            return textpad.Textbox(input_win).edit().strip()
+        finally:
+            curses.curs_set(0)
+            self.needs_touch = True
+
+    def find_files(self):
+        """Recursive find below the active panel, results stream into a virtual panel"""
+        root = self.real_panel(self.current_panel).path
+        text = self.prompt(
+            "Find Files",
+            "Name/glob, size>10M, mtime<7d, type:f|d:",
+        )
+        if not text:
+            return
+        try:
+            query = FindQuery(text)
+        except ValueError as e:
+            self.show_message(f"Error: {e}", 5)
+            return
+
+        finder = RecursiveFinder(root, query)
+        self.open_virtual_panel(
+            ResultPanel(f"find: {text} in {root}", self.current_panel, finder)
+        )
+
+    def grep_files(self):
+        """Search file contents below the active panel, hits stream into a virtual panel"""
+        root = self.real_panel(self.current_panel).path
+        text = self.prompt("Grep", "Regular expression (lowercase ignores case):")
+        if not text:
+            return
+        try:
+            pattern = compile_pattern(text)
+        except re.error as e:
+            self.show_message(f"Error: bad pattern: {e}", 5)
+            return
+
+        self.open_virtual_panel(
+            ResultPanel(f"grep: {text} in {root}", self.current_panel, GrepSearch(root, pattern))
+        )
+
+    def find_duplicates(self):
+        """Scan the active panel's tree for identical files, groups stream into a virtual panel"""
+        if isinstance(self.current_panel, DuplicatePanel):
+            self.close_virtual_panel()
+            return
+        root = self.real_panel(self.current_panel).path
+        self.open_virtual_panel(DuplicatePanel(root, self.current_panel))
+
+    def mark_duplicate_copies(self):
+        if not isinstance(self.current_panel, DuplicatePanel):
+            self.show_message("Only in the duplicates panel (D)", 2)
+            return
+        count = self.current_panel.mark_copies()
+        self.show_message(f"Marked {count} copies, first file of each group kept", 3)
+
+    def hardlink_duplicates(self):
+        """Replace the marked copies by hard links to an unmarked file of their group"""
+        panel = self.current_panel
+        if not isinstance(panel, DuplicatePanel):
+            self.show_message("Only in the duplicates panel (D)", 2)
+            return
+        pairs, skipped = panel.link_pairs()
+        if not pairs:
+            self.show_message("Mark the copies to replace first (m marks all but one)", 3)
+            return
+
+        height, width = self.stdscr.getmaxyx()
+        popup_h = 5
+        popup_w = 50
+        popup = curses.newwin(
+            popup_h, popup_w, height // 2 - popup_h // 2, width // 2 - popup_w // 2
+        )
+        popup.border()
+        popup.addstr(0, 2, " Confirm Hard Link ")
+        popup.addstr(1, 2, f"Replace {len(pairs)} files by hard links?")
+        if skipped:
+            popup.addstr(2, 2, f"{skipped} fully marked groups are skipped")
+        popup.addstr(3, 2, "Press Y to confirm, any key to cancel")
+        popup.refresh()
+
+        key = self.stdscr.getch()
+        self.needs_touch = True
+        if key in [ord("Y"), ord("y")]:
+            panel.clear_marks()
+            job = HardlinkJob(pairs, f"{len(pairs)} copies")
+            job.touched.append(panel.path)
+            self.jobs.submit(job)
+
+    def compute_checksums(self):
+        """Digests of the selected or marked files, computed on a worker pool"""
+        if isinstance(self.current_panel, ArchivePanel):
+            self.show_message("Error: extract archive members first", 5)
+            return
+        entries = [e for e in self.selected_entries() if not e.is_dir]
+        if not entries:
+            self.show_message("No file selected", 2)
+            return
+        algo = self.prompt("Checksum", f"Algorithm ({', '.join(ALGORITHMS)}):", "sha256").lower()
+        if not algo:
+            return
+        if algo not in ALGORITHMS:
+            self.show_message(f"Error: unknown algorithm {algo}", 5)
+            return
+
+        root = self.real_panel(self.current_panel).path
+        tasks = [(entry.path, algo, None) for entry in entries]
+        self.open_virtual_panel(ChecksumPanel(
+            f"{algo}: {self.describe(entries)} in {root}", self.current_panel, ChecksumRun(root, tasks)
+        ))
+
+    def verify_checksums(self):
+        """Check the files listed in the directory's SHA256SUMS-style files"""
+        root = self.real_panel(self.current_panel).path
+        sums = find_sums_files(root)
+        if not sums:
+            self.show_message(f"No {'/'.join(SUMS_FILES)} in {root}", 3)
+            return
+        tasks = []
+        for path in sums:
+            try:
+                tasks.extend(parse_sums(path))
+            except OSError as e:
+                self.show_message(f"Error: {os.path.basename(path)}: {e.strerror or e}", 5)
+                return
+        if not tasks:
+            self.show_message("No checksums found in " + ", ".join(os.path.basename(p) for p in sums), 3)
+            return
+
+        names = ", ".join(os.path.basename(p) for p in sums)
+        self.open_virtual_panel(
+            ChecksumPanel(f"verify: {names} in {root}", self.current_panel, ChecksumRun(root, tasks))
+        )
+
+    def size_directory(self):
+        """Compute the recursive size of the selected directory in the background"""
+        entry = self.current_panel.get_selected_entry()
+        if not entry or not entry.is_dir:
+            self.show_message("Select a directory first", 2)
+            return
+        self.dir_sizer.request(entry)
+
+    def toggle_auto_sizes(self):
+        self.dir_sizer.set_auto(not self.dir_sizer.auto)
+        self.show_message(
+            f"Directory sizes {'automatic' if self.dir_sizer.auto else 'on demand'}", 2
+        )
+
+    def update_index(self):
+        """Add the active panel's tree to the filename index, or refresh it"""
+        if not self.file_index.available:
+            self.show_message("Error: filename index needs sqlite3", 5)
+            return
+        if self.file_index.updating:
+            self.show_message("Index update already running", 3)
+            return
+        root = self.real_panel(self.current_panel).path
+        self.file_index.update_tree_async(
+            root, lambda message: self.show_message(message, 5)
+        )
+        self.show_message(f"Indexing {root} ...", 3)
+
+    def search_index(self):
+        """Substring search over the filename index of the active tree"""
+        root = self.real_panel(self.current_panel).path
+        if not self.file_index.available or not self.file_index.covers(root):
+            self.show_message("Not indexed, press I to index this tree", 3)
+            return
+        text = self.prompt("Index Search", f"Name contains (in {root}):")
+        if not text:
+            return
+        search = IndexSearch(self.file_index, root, text)
+        self.open_virtual_panel(
+            ResultPanel(f"index: {text} in {root}", self.current_panel, search)
+        )
+
+    def mark_by_glob(self, mark):
+        pattern = self.prompt("Mark" if mark else "Unmark", "Glob pattern (e.g. *.log):")
+        if not pattern:
+            return
+        count = self.current_panel.mark_matching(pattern, mark)
+        self.show_message(f"{'Marked' if mark else 'Unmarked'} {count} entries", 2)
+
     def toggle_panel(self):
         self.active_panel = "right" if self.active_panel == "left" else "left"
 
@@ -870,38 +1340,46 @@ class FileManager:
         #return False
 
     def handle_search_input(self, key):
+        panel = self.current_panel
+
         if key == 27:
             self.search_mode = False
-            self.current_panel.filter = ""
-            self.current_panel.refresh_files()
+            panel.set_search("")
 
         elif key in [curses.KEY_BACKSPACE, 127]:
             self.search_query = self.search_query[:-1]
-            self.current_panel.filter = self.search_query
-            self.current_panel.refresh_files()
+            panel.set_search(self.search_query)
 
         elif key in [10, curses.KEY_ENTER]:
             self.search_mode = False
 
+        elif key == 9:  # Tab: substring <-> fuzzy
+            panel.set_fuzzy(not panel.search.fuzzy)
+
         elif 32 <= key <= 126:
             self.search_query += chr(key)
-            self.current_panel.filter = self.search_query
-            self.current_panel.refresh_files()
+            panel.set_search(self.search_query)
 
     def show_message(self, message, duration=3):
         self.message = message
-        self.message_timer = duration
+        self.message_until = time.monotonic() + duration
 
     # =====================================================
     #                      RENAME
     # =====================================================
     def rename_file(self):
-        selected = self.current_panel.get_selected()
-        if not selected or selected == "[Permission Denied]":
+        entry = self.current_panel.get_selected_entry()
+        if not entry or entry.name == PERMISSION_DENIED:
             self.show_message("Invalid selection", 2)
             return
 
-        old_path = os.path.join(self.current_panel.path, selected)
+        if isinstance(self.current_panel, (TrashPanel, ArchivePanel)):
+            self.show_message("Error: restore or extract it before renaming", 5)
+            return
+
+        old_path = entry.path
+        # Result panel rows show a relative path, so only the name is edited
+        selected = os.path.basename(old_path)
         height, width = self.stdscr.getmaxyx()
 
         popup_h = 5
@@ -928,18 +1406,19 @@ class FileManager:
             new_name = box.edit().strip()
 
             if new_name and new_name != selected:
-                new_path = os.path.join(self.current_panel.path, new_name)
+                new_path = os.path.join(os.path.dirname(old_path), new_name)
                 try:
                     os.rename(old_path, new_path)
                     self.show_message(f"Renamed to '{new_name[:20]}'", 3)
-                    self.current_panel.refresh_files()
+                    self.refresh_panel(self.current_panel)
+                    if self.current_panel.virtual:
+                        self.refresh_panel(self.real_panel(self.current_panel))
                 except OSError as e:
-                    self.show_message(f"Error: {e.strerror}", 5)
+                    self.show_message(f"Error: {e.strerror or e}", 5)
 
         finally:
             curses.curs_set(0)
-            self.stdscr.touchwin()
-            self.stdscr.refresh()
+            self.needs_touch = True
 
     # =====================================================
     #                      MOUNTS
@@ -972,107 +1451,91 @@ class FileManager:
         popup.addstr(popup_h - 2, 2, "Press any key to close")
         popup.refresh()
         self.stdscr.getch()
-        self.stdscr.touchwin()
-        self.stdscr.refresh()
+        self.needs_touch = True
 
     # =====================================================
     #                      EXTRACTORS
     # =====================================================
     def extract_zip(self):
-        selected = self.current_panel.get_selected()
-        if not selected or not selected.endswith('.zip'):
-            self.show_message("Select a .zip file first", 2)
-            return
-        
-        success, message = ArchiveExtractor.extract_zip(
-            self.stdscr, 
-            self.current_panel.path, 
-            selected
-        )
-        self.show_message(message, 3)
-        if success:
-            self.current_panel.refresh_files()
+        self.extract_selected(ArchiveExtractor.extract_zip, (".zip",), "Select a .zip file first")
 
     def extract_tar_gz(self):
-        selected = self.current_panel.get_selected()
-        if not selected or not (selected.endswith('.tar.gz') or selected.endswith('.tgz')):
-            self.show_message("Select a .tar.gz or .tgz file first", 2)
-            return
-        
-        success, message = ArchiveExtractor.extract_tar_gz(
-            self.stdscr,
-            self.current_panel.path,
-            selected
+        self.extract_selected(
+            ArchiveExtractor.extract_tar_gz, (".tar.gz", ".tgz"), "Select a .tar.gz or .tgz file first"
         )
-        self.show_message(message, 3)
-        if success:
-            self.current_panel.refresh_files()
 
     def extract_tar_xz(self):
-        selected = self.current_panel.get_selected()
-        if not selected or not selected.endswith('.tar.xz'):
-            self.show_message("Select a .tar.xz file first", 2)
+        self.extract_selected(ArchiveExtractor.extract_tar_xz, (".tar.xz",), "Select a .tar.xz file first")
+
+    def extract_selected(self, extractor, suffixes, hint):
+        """Extract the selected (or all marked) archives of one type as one job"""
+        paths = [
+            entry.path for entry in self.selected_entries()
+            if not entry.is_dir and entry.name.endswith(suffixes)
+        ]
+        if not paths:
+            self.show_message(hint, 2)
             return
-        
-        success, message = ArchiveExtractor.extract_tar_xz(
-            self.stdscr,
-            self.current_panel.path,
-            selected
-        )
+
+        job, message = extractor(self.stdscr, paths)
+        self.needs_touch = True
         self.show_message(message, 3)
-        if success:
-            self.current_panel.refresh_files()
+        if job:
+            self.current_panel.clear_marks()
+            self.jobs.submit(job)
+
+    def create_archive(self):
+        """Pack the selected (or all marked) entries into a new archive"""
+        if self.current_panel.virtual:
+            self.show_message("Error: create archives from a directory panel", 5)
+            return
+        entries = self.selected_entries()
+        if not entries:
+            self.show_message("No file selected", 2)
+            return
+
+        base = entries[0].name if len(entries) == 1 else os.path.basename(self.current_panel.path) or "archive"
+        name = self.prompt("Create Archive", "Name (.zip, .tar.gz or .tar.xz):", f"{base}.tar.gz")
+        if not name:
+            return
+        if "/" in name or not create_format(name):
+            self.show_message("Error: name must end in .zip, .tar.gz, .tgz or .tar.xz", 5)
+            return
+
+        dest = unique_destination(os.path.join(self.current_panel.path, name))
+        self.current_panel.clear_marks()
+        job = self.jobs.submit(CreateArchiveJob([entry.path for entry in entries], dest))
+        self.show_message(f"{job.kind} queued: {job.title}", 2)
 
     # =====================================================
     #                      MAIN LOOP
     # =====================================================
     def run(self):
-        import signal
-        
         running = True
         self.needs_full_redraw = True
-
-        def hard_clear_terminal():
-            os.system("printf '\\033[2J\\033[H'")
-
-        def on_resize(signum, frame):
-            try:
-                curses.endwin()
-
-                hard_clear_terminal()
-
-                h, w = self.stdscr.getmaxyx()
-                curses.resizeterm(h, w)
-
-                self.stdscr.erase()
-                curses.doupdate()
-
-                self.create_windows()
-
-                self.left_panel.scroll_offset = 0
-                self.right_panel.scroll_offset = 0
-
-                self.needs_full_redraw = True
-
-            except:
-                pass
-
-        signal.signal(signal.SIGWINCH, on_resize)
+        loop = EventLoop(sys.stdin.fileno(), self.watcher.fileno())
 
         try:
             while running:
-                if self.needs_full_redraw:
-                    self.stdscr.erase()
-                    self.draw()
-                    self.needs_full_redraw = False
-                else:
-                    self.draw()
+                self.poll_panels()
+                self.poll_jobs()
 
-                running = self.handle_input()
+                self.draw()
+                loop.frame_drawn()
 
-                curses.napms(16)  # limiter ~60 FPS → anti tearing
+                # Sleep until a key, a resize, inotify or a worker wakes us up
+                events = loop.wait(self.next_timeout())
+                if RESIZE in events:
+                    self.resize()
+                running = self.handle_input()
 
         finally:
+            loop.close()
+            self.jobs.cancel_all()
+            self.watcher.close()
+            self.file_index.close()
+            self.dir_sizer.close()
+            self.entry_details.close()
             try:
                 curses.nocbreak()
                 self.stdscr.keypad(False)
@@ -1082,3 +1545,27 @@ class FileManager:
                 pass
 
         return False
+
+    def next_timeout(self):
+        """Seconds the loop may sleep, None to wait for the next event"""
+        timeouts = []
+        if self.message and self.message_until > time.monotonic():
+            timeouts.append(self.message_until - time.monotonic())
+        if self.jobs.busy or self.panels_loading() or self.dir_sizer.busy or self.file_index.updating:
+            timeouts.append(HEARTBEAT)
+        return min(timeouts) if timeouts else None
+
+    def resize(self):
+        """Rebuild the windows for the new terminal size (outside the signal handler)"""
+        try:
+            size = os.get_terminal_size(sys.__stdout__.fileno())
+        except OSError:
+            return
+        curses.resizeterm(size.lines, size.columns)
+        self.stdscr.clear()
+        self.create_windows()
+
+        self.left_panel.scroll_offset = 0
+        self.right_panel.scroll_offset = 0
+
+        self.needs_full_redraw = True
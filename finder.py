@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from event_loop import notify
+from panel import DirectoryLoader, FileEntry, sort_entries
+
+# scandir is I/O bound, so more threads than cores pays off on NFS
+WALK_WORKERS = 16
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_PREDICATE = re.compile(r"^(size|mtime)([<>])(\d+(?:\.\d+)?)([a-z]?)$", re.I)
+
+
+class ParallelWalker:
+    """Walks a directory tree with a pool of os.scandir workers.
+
+    on_entry(dir_entry, is_dir) is called from worker threads for every
+    entry below root. Symlinked directories are not followed.
+    """
+
+    def __init__(self, root: str, on_entry: Callable, workers=WALK_WORKERS):
+        self.root = root
+        self.on_entry = on_entry
+        self.workers = workers
+        self.cancelled = False
+        self.dirs_scanned = 0
+        self.cond = threading.Condition()
+        self.pending = 0
+        self.pool: Optional[ThreadPoolExecutor] = None
+
+    def cancel(self):
+        self.cancelled = True
+        with self.cond:
+            self.cond.notify_all()
+
+    def run(self):
+        """Walk the whole tree, returns when done or cancelled"""
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            self._submit(self.root)
+            with self.cond:
+                while self.pending and not self.cancelled:
+                    self.cond.wait()
+        finally:
+            self.pool.shutdown(wait=not self.cancelled, cancel_futures=True)
+
+    def _submit(self, path: str):
+        with self.cond:
+            self.pending += 1
+        try:
+            self.pool.submit(self._scan, path)
+        except RuntimeError:
+            # Pool already shut down after a cancel
+            self._finish()
+
+    def _finish(self):
+        with self.cond:
+            self.pending -= 1
+            self.dirs_scanned += 1
+            if not self.pending:
+                self.cond.notify_all()
+
+    def _scan(self, path: str):
+        try:
+            if self.cancelled:
+                return
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    if self.cancelled:
+                        return
+                    try:
+                        is_dir = dir_entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        self._submit(dir_entry.path)
+                    self.on_entry(dir_entry, is_dir)
+        except OSError:
+            pass
+        finally:
+            self._finish()
+
+
+class FindQuery:
+    """Parsed find expression.
+
+    Terms: plain text (substring) or a glob such as *.log, matched against
+    the name case-insensitively; size>10M, size<4k; mtime<7d (changed in
+    the last 7 days), mtime>1w; type:f or type:d.
+    """
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        self.names: List[str] = []
+        self.globs: List = []
+        self.min_size = self.max_size = None
+        self.newer_than = self.older_than = None
+        self.kind = None
+
+        now = time.time()
+        for term in self.text.split():
+            m = _PREDICATE.match(term)
+            if m:
+                field, op, number, unit = m.groups()
+                number, unit = float(number), unit.lower()
+                if field.lower() == "size":
+                    if unit not in _SIZE_UNITS:
+                        raise ValueError(f"Unknown size unit: {term}")
+                    value = number * _SIZE_UNITS[unit]
+                    if op == ">":
+                        self.min_size = value
+                    else:
+                        self.max_size = value
+                else:
+                    if unit not in _AGE_UNITS:
+                        raise ValueError(f"Unknown age unit: {term}")
+                    cutoff = now - number * _AGE_UNITS[unit]
+                    if op == "<":
+                        self.newer_than = cutoff
+                    else:
+                        self.older_than = cutoff
+            elif term.lower() in ("type:f", "type:d"):
+                self.kind = term[-1].lower()
+            elif any(c in term for c in "*?["):
+                self.globs.append(re.compile(fnmatch.translate(term.lower())).match)
+            else:
+                self.names.append(term.lower())
+
+    @property
+    def needs_stat(self) -> bool:
+        return any(v is not None for v in (
+            self.min_size, self.max_size, self.newer_than, self.older_than
+        ))
+
+    def matches(self, name: str, is_dir: bool, st: Optional[os.stat_result]) -> bool:
+        if self.kind == "f" and is_dir or self.kind == "d" and not is_dir:
+            return False
+        lower = name.lower()
+        for term in self.names:
+            if term not in lower:
+                return False
+        for glob in self.globs:
+            if not glob(lower):
+                return False
+        if st is None:
+            return not self.needs_stat
+        if self.min_size is not None and (is_dir or st.st_size <= self.min_size):
+            return False
+        if self.max_size is not None and (is_dir or st.st_size >= self.max_size):
+            return False
+        if self.newer_than is not None and st.st_mtime < self.newer_than:
+            return False
+        if self.older_than is not None and st.st_mtime > self.older_than:
+            return False
+        return True
+
+
+class RecursiveFinder(DirectoryLoader):
+    """Streams matches of a FindQuery below root into a ResultPanel"""
+
+    def __init__(self, root: str, query: FindQuery):
+        self.root = root
+        self.query = query
+        self.matches = 0
+        self._results: List[FileEntry] = []
+        self.walker = ParallelWalker(root, self._on_entry)
+        super().__init__(root)
+
+    def _run(self):
+        results = self._results
+        try:
+            self.walker.run()
+        finally:
+            with self.lock:
+                sort_entries(results)
+                self.result = results
+                self.done = True
+            notify()
+
+    def _on_entry(self, dir_entry: os.DirEntry, is_dir: bool):
+        query = self.query
+        st = None
+        if query.needs_stat:
+            try:
+                st = dir_entry.stat(follow_symlinks=False)
+            except OSError:
+                return
+        if not query.matches(dir_entry.name, is_dir, st):
+            return
+
+        rel = os.path.relpath(dir_entry.path, self.root)
+        entry = FileEntry.from_dir_entry(dir_entry, name=rel)
+        with self.lock:
+            # Once cancelled or done the list belongs to the panel
+            if self.cancelled or self.done:
+                return
+            self.pending.append(entry)
+            self._results.append(entry)
+            self.matches += 1
+        notify()
+
+    def cancel(self):
+        super().cancel()
+        self.walker.cancel()
+
+    def status(self) -> str:
+        return f"{self.matches} matches, {self.walker.dirs_scanned} dirs"
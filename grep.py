@@ -0,0 +1,173 @@
+import os
+import mmap
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from dir_size import human_size
+from event_loop import notify
+from finder import ParallelWalker
+from panel import DirectoryLoader, FileEntry, sort_entries
+from preview import SNIFF_BYTES, looks_binary, printable
+
+# Regex matching holds the GIL, but reads and page faults do not
+GREP_WORKERS = 8
+# Larger files are skipped
+GREP_MAX_FILE_SIZE = 512 * 1024 * 1024
+# Files at least this big are mapped instead of read into memory
+GREP_MMAP_MIN = 4 * 1024 * 1024
+# Mapped files are searched in line-aligned windows of about this size
+GREP_WINDOW = 16 * 1024 * 1024
+# The search stops once this many lines matched
+GREP_MAX_HITS = 10000
+# Matching lines reported per file
+GREP_FILE_HITS = 200
+# Characters of a matching line kept for display
+HIT_TEXT = 200
+
+
+class GrepHit(FileEntry):
+    """One matching line: shown as 'path:line: text', path is the file"""
+
+    __slots__ = ("line",)
+
+    def __init__(self, rel: str, path: str, line: int, text: str, st: os.stat_result):
+        super().__init__(f"{rel}:{line + 1}: {text}", path, stat_result=st)
+        self.line = line  # 0-based
+        self.sort_key = (False, rel.lower(), line)
+
+
+class GrepSearch(DirectoryLoader):
+    """Searches file contents below root, streaming GrepHits to a ResultPanel.
+
+    The tree is walked by a ParallelWalker and each file is searched on a
+    separate pool. Binaries (judged from their first bytes) and files over
+    GREP_MAX_FILE_SIZE are skipped; the whole file is searched with a single
+    regex pass and line numbers are only worked out around matches.
+    """
+
+    def __init__(self, root: str, pattern):
+        self.root = root
+        self.pattern = pattern
+        self.hits = 0
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.skipped = 0
+        self.limited = False
+        self.started = time.monotonic()
+        self.finished = None
+        self._results: List[FileEntry] = []
+        self.pool = ThreadPoolExecutor(max_workers=GREP_WORKERS)
+        self.walker = ParallelWalker(root, self._on_entry)
+        super().__init__(root)
+
+    def _run(self):
+        results = self._results
+        try:
+            self.walker.run()
+            self.pool.shutdown(wait=not self.cancelled, cancel_futures=self.cancelled)
+        finally:
+            self.finished = time.monotonic()
+            with self.lock:
+                sort_entries(results)
+                self.result = results
+                self.done = True
+            notify()
+
+    def _on_entry(self, dir_entry: os.DirEntry, is_dir: bool):
+        if is_dir or self.cancelled:
+            return
+        try:
+            if not dir_entry.is_file(follow_symlinks=False):
+                return
+            st = dir_entry.stat(follow_symlinks=False)
+        except OSError:
+            return
+        if not st.st_size:
+            return
+        if st.st_size > GREP_MAX_FILE_SIZE:
+            with self.lock:
+                self.skipped += 1
+            return
+        try:
+            self.pool.submit(self._scan, dir_entry.path, st)
+        except RuntimeError:
+            pass  # pool shut down by a cancel
+
+    def _scan(self, path: str, st: os.stat_result):
+        if self.cancelled:
+            return
+        try:
+            with open(path, "rb") as f:
+                head = f.read(SNIFF_BYTES)
+                if looks_binary(head):
+                    with self.lock:
+                        self.skipped += 1
+                    return
+                if st.st_size < GREP_MMAP_MIN:
+                    hits = self._search(path, st, head + f.read())
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        hits = self._search(path, st, data)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            # Once cancelled or done the list belongs to the panel
+            if self.cancelled or self.done:
+                return
+            self.files_scanned += 1
+            self.bytes_scanned += st.st_size
+            if not hits or self.limited:
+                return
+            hits = hits[: GREP_MAX_HITS - self.hits]
+            self.pending.extend(hits)
+            self._results.extend(hits)
+            self.hits += len(hits)
+            if self.hits >= GREP_MAX_HITS:
+                self.limited = True
+        if self.limited:
+            self.cancel()
+        notify()
+
+    def _search(self, path: str, st: os.stat_result, data) -> List[GrepHit]:
+        rel = os.path.relpath(path, self.root)
+        search = self.pattern.search
+        size = len(data)
+        hits: List[GrepHit] = []
+        pos = counted = line = 0
+        while pos < size and len(hits) < GREP_FILE_HITS and not self.cancelled:
+            # Windows end on a line boundary so no line is split between two
+            end = data.find(b"\n", min(pos + GREP_WINDOW, size)) + 1 or size
+            match = search(data, pos, end)
+            if match is None:
+                pos = end
+                continue
+
+            start = match.start()
+            newline = data.rfind(b"\n", pos, start)
+            begin = newline + 1 if newline >= 0 else pos
+            line += data[counted:begin].count(b"\n")
+            counted = begin
+            finish = data.find(b"\n", start, end)
+            finish = end if finish < 0 else finish
+            text = printable(data[begin: min(finish, begin + HIT_TEXT * 4)]).strip()
+            hits.append(GrepHit(rel, path, line, text[:HIT_TEXT], st))
+            # One hit per line, like grep
+            pos = finish + 1
+        return hits
+
+    def cancel(self):
+        super().cancel()
+        self.walker.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> str:
+        elapsed = max((self.finished or time.monotonic()) - self.started, 1e-3)
+        text = (
+            f"{self.hits} hits in {self.files_scanned} files, "
+            f"{self.files_scanned / elapsed:.0f} files/s, {human_size(self.bytes_scanned / elapsed)}/s"
+        )
+        if self.skipped:
+            text += f", {self.skipped} skipped"
+        return text + (", limit reached" if self.limited else "")
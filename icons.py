@@ -0,0 +1,228 @@
+import configparser
+from typing import Dict
+
+from panel import PERMISSION_DENIED
+
+# ====== SPECIAL TYPES ======
+TYPE_ICONS: Dict[str, str] = {
+    "directory": "",  # nf-fa-folder
+    "directory_open": "",  # nf-fa-folder_open
+    "locked": "",  # lock
+    "symlink": "",  # nf-oct-file_symlink
+    "hidden": "",  # nf-fa-terminal (represent hidden)
+    "executable": "",  # nf-oct-gear
+    "default": "",  # plain file
+}
+
+# ====== EXACT FILE NAMES (lowercase) ======
+NAME_ICONS: Dict[str, str] = {
+    "makefile": "",
+    "gnumakefile": "",
+    "dockerfile": "",
+}
+
+# ====== SUFFIXES (lowercase, compound suffixes allowed) ======
+SUFFIX_ICONS: Dict[str, str] = {
+    # ====== PROGRAMMING LANGUAGES ======
+    # Python
+    ".py": "",
+
+    # C / C++
+    ".c": "",
+    ".h": "",
+    ".cpp": "",
+    ".hpp": "",
+    ".cc": "",
+    ".cxx": "",
+
+    # Rust
+    ".rs": "",
+
+    # Go
+    ".go": "",
+
+    # Java
+    ".java": "",
+
+    # Kotlin
+    ".kt": "",
+
+    # Swift
+    ".swift": "",
+
+    # C#
+    ".cs": "",
+
+    # PHP
+    ".php": "",
+
+    # Ruby
+    ".rb": "",
+
+    # Lua
+    ".lua": "",
+
+    # JavaScript
+    ".js": "",
+    ".mjs": "",
+
+    # TypeScript
+    ".ts": "",
+    ".tsx": "",
+
+    # HTML / CSS
+    ".html": "",
+    ".css": "",
+    ".scss": "",
+    ".less": "",
+    ".svelte": "",
+    ".vue": "﵂",
+
+    # SQL / DB
+    ".sql": "",
+    ".db": "",
+    ".sqlite": "",
+    ".sqlite3": "",
+
+    # JSON / YAML / TOML / Config
+    ".json": "",
+    ".yaml": "",
+    ".yml": "",
+    ".toml": "",
+    ".ini": "",
+    ".cfg": "",
+
+    # Makefile / build system
+    ".mk": "",
+    ".cmake": "󰔷",
+
+    # Assembly
+    ".asm": "",
+    ".s": "",
+
+    # Shell Script
+    ".sh": "",
+    ".bash": "",
+    ".zsh": "",
+
+    # Docker / DevOps
+    ".tf": "",
+
+    # Git stuff
+    ".patch": "",
+    ".diff": "",
+
+    # ====== DOCUMENTS ======
+    ".md": "",
+    ".txt": "",
+    ".pdf": "",
+    ".doc": "",
+    ".docx": "",
+    ".ppt": "",
+    ".pptx": "",
+    ".xls": "",
+    ".xlsx": "",
+
+    # XML
+    ".xml": "",
+
+    # ====== MEDIA ======
+    ".png": "",
+    ".jpg": "",
+    ".jpeg": "",
+    ".gif": "",
+    ".bmp": "",
+    ".webp": "",
+    ".mp4": "",
+    ".mkv": "",
+    ".avi": "",
+    ".mov": "",
+    ".flv": "",
+    ".mp3": "",
+    ".wav": "",
+    ".flac": "",
+    ".ogg": "",
+
+    # ====== ARCHIVE ======
+    ".zip": "",
+    ".rar": "",
+    ".7z": "",
+    ".tar": "",
+    ".gz": "",
+    ".bz2": "",
+    ".xz": "",
+    ".tar.gz": "",
+    ".tar.bz2": "",
+    ".tar.xz": "",
+    ".tgz": "",
+
+    # ====== FONTS ======
+    ".ttf": "",
+    ".otf": "",
+    ".woff": "",
+    ".woff2": "",
+}
+
+
+class IconResolver:
+    """Table-driven icon lookup, extendable through icons.settings"""
+
+    def __init__(self, settings_file="icons.settings"):
+        self.types = dict(TYPE_ICONS)
+        self.names = dict(NAME_ICONS)
+        self.suffixes = dict(SUFFIX_ICONS)
+
+        self.config = configparser.ConfigParser(interpolation=None)
+        self.config.read(settings_file, encoding="utf-8")
+        self._load_overrides()
+
+    def _load_overrides(self):
+        """Merge user entries from the [Types], [Names] and [Suffixes] sections"""
+        for section, table in (
+            ("Types", self.types),
+            ("Names", self.names),
+            ("Suffixes", self.suffixes),
+        ):
+            if not self.config.has_section(section):
+                continue
+            for key, icon in self.config[section].items():
+                if section == "Suffixes" and not key.startswith("."):
+                    key = "." + key
+                table[key] = icon.strip()
+
+    def for_name(self, name: str) -> str:
+        """Icon for a plain file name, longest matching suffix wins"""
+        name = name.lower()
+        icon = self.names.get(name)
+        if icon is not None:
+            return icon
+
+        suffixes = self.suffixes
+        dot = name.find(".", 1)
+        while dot != -1:
+            icon = suffixes.get(name[dot:])
+            if icon is not None:
+                return icon
+            dot = name.find(".", dot + 1)
+        return self.types["default"]
+
+    def resolve(self, entry, selected=False) -> str:
+        """Icon for a panel entry, using only its cached type information"""
+        if entry.is_dir:
+            return self.types["directory_open" if selected else "directory"]
+
+        icon = entry.icon
+        if icon is None:
+            icon = entry.icon = self._resolve_file(entry)
+        return icon
+
+    def _resolve_file(self, entry) -> str:
+        if entry.name == PERMISSION_DENIED:
+            return self.types["locked"]
+        if entry.is_link:
+            return self.types["symlink"]
+        if entry.name.startswith("."):
+            return self.types["hidden"]
+        if entry.is_executable:
+            return self.types["executable"]
+        return self.for_name(entry.name)
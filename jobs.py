@@ -0,0 +1,367 @@
+import os
+import time
+import threading
+import configparser
+from typing import Dict, List, Optional, Tuple
+
+from copy_engine import CopyCancelled, TreeCopier, remove_path, try_rename
+from event_loop import notify
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def device_of(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+class Job:
+    """A background operation run by the JobScheduler.
+
+    Subclasses implement work() and call checkpoint() between units of
+    work, which is where pause and cancel take effect. Progress is read
+    from self.meter: any object with total_bytes, done_bytes, total_files,
+    done_files and current.
+    """
+
+    kind = "Job"
+    _ids = 0
+
+    def __init__(self, title: str, device: Optional[int] = None, priority=PRIORITY_NORMAL):
+        Job._ids += 1
+        self.id = Job._ids
+        self.title = title
+        self.device = device
+        self.priority = priority
+        self.state = QUEUED
+        self.error = ""
+        self.errors: List[str] = []
+        self.result = ""
+        self.touched: List[str] = []  # directories to refresh when done
+        self.cancelled = False
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.started = 0.0
+        self.finished = 0.0
+        self.paused_at = 0.0
+        self.paused_total = 0.0
+        self.thread: Optional[threading.Thread] = None
+
+        self.meter = self
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.total_files = 0
+        self.done_files = 0
+        self.current = ""
+
+    # ----- called from the worker thread -----
+    def work(self):
+        raise NotImplementedError
+
+    def checkpoint(self):
+        """Block while paused, raise JobCancelled once cancelled.
+
+        Also the point where the UI hears about new progress.
+        """
+        notify()
+        if not self.resumed.is_set():
+            self.resumed.wait()
+        if self.cancelled:
+            raise JobCancelled()
+
+    def run(self):
+        try:
+            self.work()
+            self.state = FAILED if self.errors else DONE
+        except (JobCancelled, CopyCancelled):
+            self.state = CANCELLED
+        except Exception as e:
+            self.error = str(e)
+            self.state = FAILED
+        finally:
+            self.finished = time.time()
+            notify()
+
+    # ----- called from the UI thread -----
+    def start(self):
+        self.state = RUNNING
+        self.started = time.time()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def pause(self):
+        if self.state == RUNNING:
+            self.resumed.clear()
+            self.paused_at = time.time()
+            self.state = PAUSED
+
+    def resume(self):
+        if self.state == PAUSED:
+            self.paused_total += time.time() - self.paused_at
+            self.state = RUNNING
+            self.resumed.set()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.state == QUEUED:
+            self.state = CANCELLED
+            self.finished = time.time()
+        self.resumed.set()
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED and not (self.thread and self.thread.is_alive())
+
+    @property
+    def progress(self) -> float:
+        m = self.meter
+        if m.total_bytes:
+            return min(m.done_bytes * 100 / m.total_bytes, 100.0)
+        if m.total_files:
+            return min(m.done_files * 100 / m.total_files, 100.0)
+        return 100.0 if self.state == DONE else 0.0
+
+    def active_seconds(self) -> float:
+        if not self.started:
+            return 0.0
+        end = self.finished or time.time()
+        paused = self.paused_total
+        if self.state == PAUSED:
+            paused += end - self.paused_at
+        return max(end - self.started - paused, 0.0)
+
+    def rate(self) -> float:
+        """Bytes per second while running"""
+        seconds = self.active_seconds()
+        return self.meter.done_bytes / seconds if seconds > 0.5 else 0.0
+
+    def eta(self) -> Optional[float]:
+        rate = self.rate()
+        if not rate or self.state != RUNNING:
+            return None
+        return (self.meter.total_bytes - self.meter.done_bytes) / rate
+
+    def summary(self) -> str:
+        """Result message once finished"""
+        if self.state == CANCELLED:
+            return f"{self.kind} cancelled: {self.title}"
+        if self.state == FAILED:
+            return f"Error in {self.kind.lower()}: {self.error or self.errors[0]}"
+        return self.result or f"{self.kind} done: {self.title}"
+
+
+class CopyJob(Job):
+    """Copies (source, destination) pairs with a TreeCopier"""
+
+    kind = "Copy"
+
+    def __init__(self, pairs: List[Tuple[str, str]], title: str, priority=PRIORITY_NORMAL):
+        dest_dir = os.path.dirname(pairs[0][1])
+        super().__init__(title, device_of(dest_dir), priority)
+        self.pairs = pairs
+        self.touched = [dest_dir]
+        self.copier = TreeCopier(pairs, resumed=self.resumed)
+        self.meter = self.copier
+
+    def cancel(self):
+        # Before super() resumes a paused copy, so it wakes up cancelled
+        self.copier.cancel()
+        super().cancel()
+
+    def work(self):
+        try:
+            self.copier.plan()
+        except BaseException:
+            self.copier.cleanup()
+            raise
+        self.copy()
+
+    def copy(self):
+        try:
+            self.copier.run()
+        except BaseException:
+            # Cancelled or failed: no claimed placeholder or partial tree stays
+            self.copier.cleanup()
+            raise
+        self.errors = self.copier.errors
+
+
+class MoveJob(CopyJob):
+    """Renames within a filesystem, copies and then deletes across them"""
+
+    kind = "Move"
+
+    def __init__(self, pairs: List[Tuple[str, str]], title: str, priority=PRIORITY_NORMAL):
+        super().__init__(pairs, title, priority)
+        self.touched.extend({os.path.dirname(src) for src, _dst in pairs})
+
+    def work(self):
+        remaining = []
+        for src, dst in self.pairs:
+            self.checkpoint()
+            # The rename replaces the placeholder the claim created
+            dst = self.copier.claim(src, dst)
+            try:
+                moved = try_rename(src, dst)
+            except OSError:
+                remove_path(dst)
+                raise
+            if moved:
+                self.copier.done_files += 1
+            else:
+                remaining.append((src, dst))
+        if not remaining:
+            return
+
+        # Cross-device: the source goes only after a complete copy
+        self.copier.pairs = remaining
+        self.copier.plan()
+        self.copier.total_files += len(self.pairs) - len(remaining)
+        self.copy()
+        if self.errors:
+            self.copier.cleanup()
+            return
+        for src, _dst in remaining:
+            try:
+                remove_path(src)
+            except OSError as e:
+                self.errors.append(f"Copied, but removing {src} failed: {e.strerror or e}")
+
+
+class DeleteJob(Job):
+    """Removes files and directory trees bottom-up"""
+
+    kind = "Delete"
+
+    def __init__(self, paths: List[str], title: str, priority=PRIORITY_NORMAL):
+        device = device_of(os.path.dirname(paths[0])) if paths else None
+        super().__init__(title, device, priority)
+        self.paths = paths
+        self.touched = sorted({os.path.dirname(p) for p in paths})
+
+    def work(self):
+        for path in self.paths:
+            if os.path.isdir(path) and not os.path.islink(path):
+                for _root, dirs, files in os.walk(path):
+                    self.total_files += len(files) + len(dirs)
+            self.total_files += 1
+
+        for path in self.paths:
+            self.checkpoint()
+            self.current = os.path.basename(path)
+            if os.path.isdir(path) and not os.path.islink(path):
+                for root, dirs, files in os.walk(path, topdown=False):
+                    for name in files:
+                        self.checkpoint()
+                        self._unlink(os.path.join(root, name), os.remove)
+                    for name in dirs:
+                        self._unlink(os.path.join(root, name), self._remove_dir)
+                self._unlink(path, os.rmdir)
+            else:
+                self._unlink(path, os.remove)
+
+    @staticmethod
+    def _remove_dir(path: str):
+        if os.path.islink(path):
+            os.remove(path)
+        else:
+            os.rmdir(path)
+
+    def _unlink(self, path: str, remove):
+        try:
+            remove(path)
+        except OSError as e:
+            self.errors.append(f"{path}: {e.strerror or e}")
+        self.done_files += 1
+
+
+class JobScheduler:
+    """Queue of background jobs with per-device concurrency limits.
+
+    tick() is called from the main loop: it starts queued jobs in
+    priority order while their device has free slots and returns the
+    jobs that finished since the last call.
+    """
+
+    def __init__(self, settings_file="jobs.settings"):
+        config = configparser.ConfigParser()
+        config.read(settings_file)
+        self.config = config
+        self.max_per_device = config.getint("Jobs", "max_per_device", fallback=2)
+        self.max_running = config.getint("Jobs", "max_running", fallback=4)
+        self.keep_finished = config.getint("Jobs", "keep_finished", fallback=20)
+        self.jobs: List[Job] = []
+        self.reported = set()
+
+    def submit(self, job: Job) -> Job:
+        self.jobs.append(job)
+        self.tick()
+        return job
+
+    @property
+    def active(self) -> List[Job]:
+        return [job for job in self.jobs if not job.done]
+
+    @property
+    def busy(self) -> bool:
+        return any(not job.done for job in self.jobs)
+
+    def tick(self) -> List[Job]:
+        finished = []
+        for job in self.jobs:
+            if job.done and job.id not in self.reported:
+                self.reported.add(job.id)
+                finished.append(job)
+
+        running = [job for job in self.jobs if job.state == RUNNING]
+        per_device: Dict[Optional[int], int] = {}
+        for job in running:
+            per_device[job.device] = per_device.get(job.device, 0) + 1
+
+        queued = sorted(
+            (job for job in self.jobs if job.state == QUEUED),
+            key=lambda job: (job.priority, job.id),
+        )
+        for job in queued:
+            if len(running) >= self.max_running:
+                break
+            if per_device.get(job.device, 0) >= self.max_per_device:
+                continue
+            job.start()
+            running.append(job)
+            per_device[job.device] = per_device.get(job.device, 0) + 1
+
+        self._trim()
+        return finished
+
+    def _trim(self):
+        done = [job for job in self.jobs if job.done and job.id in self.reported]
+        for job in done[: max(len(done) - self.keep_finished, 0)]:
+            self.jobs.remove(job)
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if not job.done or job.id not in self.reported]
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if not job.done:
+                job.cancel()
@@ -0,0 +1,447 @@
+import os
+import re
+import mmap
+import bisect
+import curses
+import threading
+from typing import List, Optional
+
+from preview import printable
+
+# Newlines are counted per block; block i starts at byte i * INDEX_BLOCK
+INDEX_BLOCK = 1024 * 1024
+# How far past the top of the screen the index is built ahead of the user
+INDEX_AHEAD = 64 * 1024 * 1024
+# Longest line shown as one line; the rest continues on the next row
+MAX_LINE = 64 * 1024
+# Search scans the mapping this many bytes at a time
+SEARCH_CHUNK = 8 * 1024 * 1024
+# A match may start in one chunk and end up to this far into the next
+SEARCH_OVERLAP = 64 * 1024
+# Columns moved by Left/Right
+PAN_STEP = 8
+
+PAGER_HELP = "q close  g line  % percent  / ? search  n N again  <- -> pan"
+
+
+def compile_pattern(text: str):
+    """Bytes regex for searching file content; all lowercase means ignore case"""
+    flags = re.IGNORECASE if text == text.lower() else 0
+    return re.compile(text.encode("utf-8", "surrogateescape"), flags | re.MULTILINE)
+
+
+def line_start(data, pos: int) -> int:
+    """Start of the line containing byte pos"""
+    if pos <= 0:
+        return 0
+    low = max(0, pos - MAX_LINE)
+    newline = data.rfind(b"\n", low, pos)
+    return newline + 1 if newline >= 0 else low
+
+
+def next_line(data, pos: int) -> int:
+    """Start of the line after the one starting at pos"""
+    size = len(data)
+    newline = data.find(b"\n", pos, min(size, pos + MAX_LINE))
+    return newline + 1 if newline >= 0 else min(size, pos + MAX_LINE)
+
+
+def prev_line(data, pos: int) -> int:
+    return line_start(data, pos - 1) if pos > 0 else 0
+
+
+class LineIndex:
+    """Sparse line index of a mapped file, built in the background.
+
+    counts[i] is the number of newlines before byte i * INDEX_BLOCK, so a
+    line number or a line's offset costs at most one block scan. Blocks
+    are only counted up to where the user is looking (plus INDEX_AHEAD)
+    or up to a line that was asked for, never the whole file up front.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.counts: List[int] = [0]
+        self.wanted = 0
+        self.wanted_line: Optional[int] = None
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def covered(self) -> int:
+        return min((len(self.counts) - 1) * INDEX_BLOCK, self.size)
+
+    @property
+    def complete(self) -> bool:
+        return self.covered >= self.size
+
+    @property
+    def busy(self) -> bool:
+        return not self.complete and (self.covered < self.wanted or self.wanted_line is not None)
+
+    def total_lines(self) -> Optional[int]:
+        if not self.complete:
+            return None
+        unterminated = self.size and self.data[self.size - 1: self.size] != b"\n"
+        return self.counts[-1] + (1 if unterminated else 0)
+
+    def want(self, offset: int):
+        with self.cond:
+            if offset > self.wanted:
+                self.wanted = offset
+                self.cond.notify()
+
+    def want_line(self, line: Optional[int]):
+        with self.cond:
+            self.wanted_line = line
+            self.cond.notify()
+
+    def line_of(self, offset: int) -> Optional[int]:
+        """0-based line number of the line starting at offset, None if not indexed yet"""
+        block = offset // INDEX_BLOCK
+        if block >= len(self.counts):
+            return None
+        start = block * INDEX_BLOCK
+        return self.counts[block] + self.data[start:offset].count(b"\n")
+
+    def offset_of(self, line: int) -> Optional[int]:
+        """Start of a 0-based line, None while its block is not indexed yet"""
+        if line <= 0:
+            return 0
+        counts = self.counts
+        block = bisect.bisect_left(counts, line) - 1
+        if block + 1 >= len(counts):
+            if not self.complete:
+                return None
+            # Past the last line: the start of the last one
+            return line_start(self.data, self.size - 1)
+        pos = block * INDEX_BLOCK
+        for _ in range(line - counts[block]):
+            pos = self.data.find(b"\n", pos) + 1
+        # The "line" after a final newline is empty: stop at the last real one
+        return pos if pos < self.size else line_start(self.data, self.size - 1)
+
+    def _needed(self) -> bool:
+        if self.closed or self.complete:
+            return False
+        if self.wanted_line is not None and self.counts[-1] <= self.wanted_line:
+            return True
+        return self.covered < self.wanted
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.closed and not self._needed():
+                    self.cond.wait()
+                if self.closed:
+                    return
+                start = self.covered
+            end = min(start + INDEX_BLOCK, self.size)
+            try:
+                newlines = self.data[start:end].count(b"\n")
+            except ValueError:  # mapping closed underneath us
+                return
+            with self.cond:
+                self.counts.append(self.counts[-1] + newlines)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join(1)
+
+
+class PagerSearch:
+    """Regex search through the mapping in SEARCH_CHUNK steps, on a thread"""
+
+    def __init__(self, data, pattern, start: int, backward: bool):
+        self.data = data
+        self.pattern = pattern
+        self.start = start
+        self.backward = backward
+        self.result: Optional[int] = None
+        self.scanned = 0
+        self.done = False
+        self.cancelled = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run(self):
+        try:
+            self.result = self._backward() if self.backward else self._forward()
+        except ValueError:  # mapping closed
+            pass
+        self.done = True
+
+    def _forward(self) -> Optional[int]:
+        size = len(self.data)
+        pos = self.start
+        while pos < size and not self.cancelled:
+            end = min(size, pos + SEARCH_CHUNK)
+            match = self.pattern.search(self.data, pos, min(size, end + SEARCH_OVERLAP))
+            # Leftmost match: one starting in the overlap is found by the next chunk
+            if match and match.start() < end:
+                return match.start()
+            self.scanned += end - pos
+            pos = end
+        return None
+
+    def _backward(self) -> Optional[int]:
+        size = len(self.data)
+        end = self.start
+        while end > 0 and not self.cancelled:
+            low = max(0, end - SEARCH_CHUNK)
+            last = None
+            for match in self.pattern.finditer(self.data, low, min(size, end + SEARCH_OVERLAP)):
+                if match.start() >= end:
+                    break
+                last = match.start()
+            if last is not None:
+                return last
+            self.scanned += end - low
+            end = low
+        return None
+
+
+class Pager:
+    """Full-screen viewer for files of any size.
+
+    The file is memory-mapped and only the visible lines are read, so
+    opening a multi-gigabyte log is instant. Line numbers come from a
+    LineIndex that grows as the user scrolls or jumps; line (0-based)
+    opens the pager there.
+    """
+
+    def __init__(self, stdscr, path: str, prompt, line: Optional[int] = None):
+        self.stdscr = stdscr
+        self.path = path
+        self.prompt = prompt
+        self.file = open(path, "rb")
+        try:
+            size = os.fstat(self.file.fileno()).st_size
+            # An empty file cannot be mapped
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+        self.size = size
+        self.index = LineIndex(self.data)
+        self.top = 0
+        self.hscroll = 0
+        self.pending_line: Optional[int] = None
+        if line:
+            self.pending_line = line
+            self.index.want_line(line)
+        self.search: Optional[PagerSearch] = None
+        self.last_search = None  # (compiled pattern, backward)
+        self.message = ""
+        self.win = None
+
+    @property
+    def rows(self) -> int:
+        height, _ = self.stdscr.getmaxyx()
+        return max(height - 2, 1)
+
+    @property
+    def busy(self) -> bool:
+        return self.search is not None or self.pending_line is not None or self.index.busy
+
+    def run(self):
+        try:
+            while True:
+                self.poll()
+                self.draw()
+                # Keep repainting while the index or a search makes progress
+                self.stdscr.timeout(100 if self.busy else -1)
+                key = self.stdscr.getch()
+                if key != -1 and not self.handle_key(key):
+                    break
+        finally:
+            self.stdscr.timeout(-1)
+            self.close()
+
+    def close(self):
+        if self.search is not None:
+            self.search.cancel()
+        self.index.close()
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except BufferError:
+                pass  # a search thread still holds a view; the GC frees it
+        self.file.close()
+
+    # ---------------------------------------------------------------
+    def poll(self):
+        self.index.want(self.top + INDEX_AHEAD)
+
+        if self.search is not None and self.search.done:
+            search, self.search = self.search, None
+            if search.cancelled:
+                self.message = "Search cancelled"
+            elif search.result is None:
+                self.message = "Pattern not found"
+            else:
+                self.top = line_start(self.data, search.result)
+                self.message = ""
+
+        if self.pending_line is not None:
+            offset = self.index.offset_of(self.pending_line)
+            if offset is not None:
+                self.top = offset
+                self.pending_line = None
+                self.index.want_line(None)
+                self.message = ""
+
+    def draw(self):
+        height, width = self.stdscr.getmaxyx()
+        if self.win is None or self.win.getmaxyx() != (height, width):
+            self.win = curses.newwin(height, width, 0, 0)
+        win = self.win
+        win.erase()
+
+        line = self.index.line_of(self.top)
+        total = self.index.total_lines()
+        percent = self.top * 100 // self.size if self.size else 100
+        where = f"line {line + 1 if line is not None else '?'}/{total or '?'}  {percent}%"
+        title = f" {self.path}"[: max(width - len(where) - 3, 0)]
+        try:
+            win.addstr(0, 0, f"{title}{where.rjust(width - len(title) - 1)} ", curses.A_REVERSE)
+        except curses.error:
+            pass
+
+        pos = self.top
+        for row in range(1, height - 1):
+            if pos >= self.size:
+                text = "~"
+            else:
+                end = next_line(self.data, pos)
+                shown = min(end, pos + (self.hscroll + width) * 4)
+                text = printable(self.data[pos:shown].rstrip(b"\n"))[self.hscroll: self.hscroll + width - 1]
+                pos = end
+            try:
+                win.addstr(row, 0, text)
+            except curses.error:
+                pass
+
+        status = self.message or PAGER_HELP
+        if self.search is not None:
+            status = f"Searching... {self.search.scanned * 100 // max(self.size, 1)}%  (ESC cancels)"
+        elif self.pending_line is not None:
+            status = f"Indexing lines... {self.index.covered * 100 // max(self.size, 1)}%  (ESC cancels)"
+        try:
+            win.addstr(height - 1, 0, status[: width - 1], curses.A_BOLD)
+        except curses.error:
+            pass
+
+        # A prompt may have covered part of the window: copy all of it again
+        win.touchwin()
+        win.refresh()
+
+    # ---------------------------------------------------------------
+    def handle_key(self, key) -> bool:
+        """False closes the pager"""
+        if key == 27 and (self.search is not None or self.pending_line is not None):
+            if self.search is not None:
+                self.search.cancel()
+            self.pending_line = None
+            self.index.want_line(None)
+            return True
+        if key in (27, ord("q")):
+            return False
+
+        if key in (curses.KEY_DOWN, ord("j")):
+            self.scroll(1)
+        elif key in (curses.KEY_UP, ord("k")):
+            self.scroll(-1)
+        elif key in (curses.KEY_NPAGE, ord(" ")):
+            self.scroll(self.rows)
+        elif key == curses.KEY_PPAGE:
+            self.scroll(-self.rows)
+        elif key == curses.KEY_HOME:
+            self.top = 0
+        elif key == curses.KEY_END:
+            self.top = self.last_page()
+        elif key == curses.KEY_LEFT:
+            self.hscroll = max(self.hscroll - PAN_STEP, 0)
+        elif key == curses.KEY_RIGHT:
+            self.hscroll += PAN_STEP
+        elif key in (ord("g"), ord(":")):
+            self.go_to_line()
+        elif key == ord("%"):
+            self.go_to_percent()
+        elif key in (ord("/"), ord("?")):
+            self.start_search(key == ord("?"))
+        elif key in (ord("n"), ord("N")) and self.last_search is not None:
+            pattern, backward = self.last_search
+            self.find(pattern, backward if key == ord("n") else not backward)
+        return True
+
+    def scroll(self, lines: int):
+        last = self.last_page()
+        for _ in range(abs(lines)):
+            if lines > 0:
+                if self.top >= last:
+                    break
+                self.top = next_line(self.data, self.top)
+            else:
+                if self.top == 0:
+                    break
+                self.top = prev_line(self.data, self.top)
+
+    def last_page(self) -> int:
+        if not self.size:
+            return 0
+        top = line_start(self.data, self.size - 1)
+        for _ in range(self.rows - 1):
+            if top == 0:
+                break
+            top = prev_line(self.data, top)
+        return top
+
+    def go_to_line(self):
+        text = self.prompt("Go to Line", "Line number:")
+        if not text:
+            return
+        try:
+            line = int(text)
+        except ValueError:
+            self.message = f"Not a line number: {text}"
+            return
+        self.pending_line = max(line - 1, 0)
+        self.index.want_line(self.pending_line)
+
+    def go_to_percent(self):
+        text = self.prompt("Go to Percent", "Percent of the file (0-100):").rstrip("%")
+        if not text:
+            return
+        try:
+            percent = min(max(float(text), 0.0), 100.0)
+        except ValueError:
+            self.message = f"Not a percentage: {text}"
+            return
+        self.top = line_start(self.data, min(int(self.size * percent / 100), max(self.size - 1, 0)))
+
+    def start_search(self, backward: bool):
+        text = self.prompt("Search Backward" if backward else "Search", "Regular expression:")
+        if not text:
+            return
+        try:
+            pattern = compile_pattern(text)
+        except re.error as e:
+            self.message = f"Bad pattern: {e}"
+            return
+        self.last_search = (pattern, backward)
+        self.find(pattern, backward)
+
+    def find(self, pattern, backward: bool):
+        if self.search is not None:
+            self.search.cancel()
+        # Start past the top line so repeating moves on to the next match
+        start = self.top if backward else next_line(self.data, self.top)
+        self.search = PagerSearch(self.data, pattern, start, backward)
@@ -1,29 +1,484 @@
 import os
+import re
+import stat
 import curses
-from typing import List
+import fnmatch
+import threading
+from operator import attrgetter
+from typing import Callable, List, Optional, Set
+
+from event_loop import notify
+from row_model import RowModel
+from search_filter import SearchFilter
+from watcher import Change, CREATED, DELETED, MODIFIED, RESET
+
+PERMISSION_DENIED = "[Permission Denied]"
+
+_UNSET = object()
+
+
+class FileEntry:
+    """Directory entry with type and stat info cached from os.scandir"""
+
+    __slots__ = ("name", "path", "is_dir", "is_link", "sort_key", "icon", "_dir_entry", "_stat")
+
+    def __init__(self, name: str, path: str, is_dir=False, is_link=False, stat_result=_UNSET):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.is_link = is_link
+        self.sort_key = (not is_dir, name.lower())
+        self.icon = None
+        self._dir_entry = None
+        self._stat = stat_result
+
+    @classmethod
+    def from_dir_entry(cls, dir_entry: os.DirEntry, name=None) -> "FileEntry":
+        try:
+            is_dir = dir_entry.is_dir()
+        except OSError:
+            is_dir = False
+        try:
+            is_link = dir_entry.is_symlink()
+        except OSError:
+            is_link = False
+        entry = cls(name or dir_entry.name, dir_entry.path, is_dir, is_link)
+        entry._dir_entry = dir_entry
+        return entry
+
+    @classmethod
+    def from_path(cls, path: str) -> Optional["FileEntry"]:
+        """Build an entry for a single path, None if it no longer exists"""
+        try:
+            lst = os.lstat(path)
+        except OSError:
+            return None
+        is_link = stat.S_ISLNK(lst.st_mode)
+        st = lst
+        if is_link:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+        is_dir = st is not None and stat.S_ISDIR(st.st_mode)
+        return cls(os.path.basename(path), path, is_dir, is_link, st)
+
+    @classmethod
+    def placeholder(cls, name: str) -> "FileEntry":
+        return cls(name, "", stat_result=None)
+
+    @property
+    def stat(self) -> Optional[os.stat_result]:
+        """Stat result (follows symlinks), fetched once then reused"""
+        if self._stat is _UNSET:
+            try:
+                if self._dir_entry is not None:
+                    self._stat = self._dir_entry.stat()
+                else:
+                    self._stat = os.stat(self.path)
+            except OSError:
+                self._stat = None
+            self._dir_entry = None
+        return self._stat
+
+    @property
+    def size(self) -> Optional[int]:
+        st = self.stat
+        return st.st_size if st is not None else None
+
+    @property
+    def is_executable(self) -> bool:
+        st = self.stat
+        return (
+            st is not None
+            and not self.is_dir
+            and stat.S_ISREG(st.st_mode)
+            and bool(st.st_mode & 0o111)
+        )
+
+
+def sort_entries(entries: List[FileEntry]):
+    """Directories first, then case-insensitive name order"""
+    entries.sort(key=attrgetter("sort_key"))
+
+
+def bisect_entries(entries: List[FileEntry], key) -> int:
+    """Leftmost insertion index for a sort key in a sorted entry list"""
+    lo, hi = 0, len(entries)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if entries[mid].sort_key < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class DirectoryLoader:
+    """Lists a directory on a worker thread and hands out entry batches"""
+
+    FIRST_BATCH = 256
+    MAX_BATCH = 8192
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending: List[FileEntry] = []
+        self.result: Optional[List[FileEntry]] = None
+        self.error: Optional[OSError] = None
+        self.done = False
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        entries: List[FileEntry] = []
+        batch: List[FileEntry] = []
+        batch_size = self.FIRST_BATCH
+        try:
+            with os.scandir(self.path) as it:
+                for dir_entry in it:
+                    if self.cancelled:
+                        return
+                    batch.append(FileEntry.from_dir_entry(dir_entry))
+                    if len(batch) >= batch_size:
+                        entries.extend(batch)
+                        self._publish(batch)
+                        batch = []
+                        batch_size = min(batch_size * 2, self.MAX_BATCH)
+            entries.extend(batch)
+            self._publish(batch)
+            sort_entries(entries)
+        except OSError as e:
+            self.error = e
+        with self.lock:
+            self.result = entries
+            self.done = True
+        notify()
+
+    def _publish(self, batch: List[FileEntry]):
+        if batch:
+            with self.lock:
+                self.pending.extend(batch)
+            notify()
+
+    def wait(self, timeout: float):
+        self.thread.join(timeout)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def drain(self):
+        """Return (new entries, final sorted list or None while still running)"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+            return batch, self.result
+
 
 class FilePanel:
+    # How long enter/refresh waits for a listing before painting partial results
+    LOAD_GRACE = 0.03
+    # Virtual panels show results instead of a real directory
+    virtual = False
+
     def __init__(self, path: str):
         self.path = path
-        self.files: List[str] = []
+        self.all_files: List[FileEntry] = []  # sorted, unfiltered
+        self.files: List[FileEntry] = self.all_files  # what is shown
         self.cursor_pos = 0
         self.scroll_offset = 0
-        self.filter = ""
+        self.visible_height = 10
+        self.search = SearchFilter()
+        self.generation = 0
+        self.row_model = RowModel(self)
+        self.loader: Optional[DirectoryLoader] = None
+        self.loader_path = None  # self.path when the loader was started
+        self.loaded_path = None
+        self.select_after_load = ""
+        self.marked: Set[str] = set()  # paths of marked entries
+        self.mark_version = 0
+        # Called with (path, entries) whenever a full listing is loaded
+        self.on_listing: Optional[Callable] = None
         self.refresh_files()
 
+    @property
+    def loading(self) -> bool:
+        return self.loader is not None
+
+    @property
+    def filter(self) -> str:
+        return self.search.query
+
+    def summary(self) -> str:
+        return f"{len(self.files)} files{self.mark_summary()}"
+
+    def mark_summary(self) -> str:
+        return f", {len(self.marked)} marked" if self.marked else ""
+
     def refresh_files(self):
+        """Start (re)listing the directory in the background.
+
+        A reload of the same directory keeps the current list on screen until
+        the new one is complete; a new directory streams in batch by batch.
+        """
+        self.cancel_loading()
+        self.loader = DirectoryLoader(self.path)
+        self.loader_path = self.path
+        if self.path != self.loaded_path:
+            self.all_files = []
+            self.files = self.all_files if not self.filter else []
+            self.search.reset()
+            self.clear_marks()
+            self.generation += 1
+        self.loader.wait(self.LOAD_GRACE)
+        self.poll_loader()
+
+    def poll_loader(self) -> bool:
+        """Merge entries published by the loader, returns True if files changed"""
+        loader = self.loader
+        if loader is None:
+            return False
+
+        batch, result = loader.drain()
+        streaming = self.path != self.loaded_path
+
+        if result is None:
+            if not streaming or not batch:
+                return False
+            self.all_files.extend(batch)
+            if self.files is not self.all_files:
+                self.files.extend(self.search.match(batch, self.filter))
+            self.generation += 1
+            return True
+
+        self.loader = None
+        if isinstance(loader.error, PermissionError):
+            result = [FileEntry.placeholder(PERMISSION_DENIED)]
+        self._set_files(result, keep_selection=not streaming or self.cursor_pos > 0)
+        self.loaded_path = self.path
+        if self.on_listing and not self.virtual and loader.error is None:
+            self.on_listing(self.path, self.all_files)
+        if self.select_after_load:
+            self._select_name(self.select_after_load)
+            self.select_after_load = ""
+            self._clamp_cursor()
+        return True
+
+    def cancel_loading(self):
+        """Stop the running scan, keeping whatever has been listed so far"""
+        loader = self.loader
+        if loader is None:
+            return
+        loader.cancel()
+        self.loader = None
+        # A panel that already moved on streams its new directory from empty
+        if self.path != self.loaded_path and self.loader_path == self.path:
+            entries = list(self.all_files)
+            sort_entries(entries)
+            self._set_files(entries)
+            self.loaded_path = self.path
+
+    # =====================================================
+    #                  SEARCH FILTER
+    # =====================================================
+    def set_search(self, query: str):
+        """Filter the cached listing in memory, no directory rescan"""
+        selected = self.get_selected_entry()
+        self.files = self.search.apply(self.all_files, query)
+        self.generation += 1
+        if query:
+            self.cursor_pos = 0
+            self.scroll_offset = 0
+        else:
+            self._select_entry(selected)
+        self._clamp_cursor()
+
+    def set_fuzzy(self, fuzzy: bool):
+        self.search.set_fuzzy(fuzzy)
+        self.set_search(self.search.query)
+
+    # =====================================================
+    #                     MARKING
+    # =====================================================
+    def is_marked(self, entry: FileEntry) -> bool:
+        return entry.path in self.marked
+
+    def _markable(self, entries: List[FileEntry]) -> List[FileEntry]:
+        return [e for e in entries if e.path and e.name != PERMISSION_DENIED]
+
+    def _marks_changed(self):
+        self.mark_version += 1
+
+    def toggle_mark(self):
+        """Mark or unmark the selected entry and move to the next one"""
+        entry = self.get_selected_entry()
+        if not entry or not self._markable([entry]):
+            return
+        if entry.path in self.marked:
+            self.marked.discard(entry.path)
+        else:
+            self.marked.add(entry.path)
+        self._marks_changed()
+        if self.cursor_pos < len(self.files) - 1:
+            self.navigate(1, self.visible_height)
+
+    def mark_matching(self, pattern: str, mark=True) -> int:
+        """Mark (or unmark) shown entries whose name matches a glob"""
+        matcher = re.compile(fnmatch.translate(pattern.lower())).match
+        paths = {e.path for e in self._markable(self.files) if matcher(e.name.lower())}
+        if mark:
+            self.marked |= paths
+        else:
+            self.marked -= paths
+        self._marks_changed()
+        return len(paths)
+
+    def invert_marks(self):
+        paths = {e.path for e in self._markable(self.files)}
+        self.marked = (paths - self.marked) | (self.marked - paths)
+        self._marks_changed()
+
+    def mark_all(self):
+        """Mark every shown entry, or clear the marks if all are marked"""
+        paths = {e.path for e in self._markable(self.files)}
+        if paths <= self.marked:
+            self.marked -= paths
+        else:
+            self.marked |= paths
+        self._marks_changed()
+
+    def clear_marks(self):
+        if self.marked:
+            self.marked = set()
+            self._marks_changed()
+
+    def marked_entries(self) -> List[FileEntry]:
+        """Marked entries in listing order"""
+        if not self.marked:
+            return []
+        return [e for e in self.all_files if e.path in self.marked]
+
+    # =====================================================
+    #                  LIVE CHANGES
+    # =====================================================
+    def apply_changes(self, changes: List[Change]):
+        """Apply watcher events as in-place inserts and removals.
+
+        The cursor and scroll window stay on the same entries unless the
+        selected entry itself is removed.
+        """
+        if self.loading or (self.all_files and self.all_files[0].name == PERMISSION_DENIED):
+            return
+
+        filtered = self.files is not self.all_files
+        selected = self.get_selected()
+        changed = False
+
+        for kind, name, is_dir in changes:
+            if kind == RESET:
+                while not os.path.isdir(self.path) and os.path.dirname(self.path) != self.path:
+                    self.path = os.path.dirname(self.path)
+                self.refresh_files()
+                return
+
+            idx = self._find(name, is_dir)
+            if kind == DELETED:
+                self.marked.discard(os.path.join(self.path, name))
+            if kind == DELETED or kind == CREATED:
+                if idx is not None:
+                    self._remove_at(idx)
+                    changed = True
+                if kind == CREATED:
+                    entry = FileEntry.from_path(os.path.join(self.path, name))
+                    if entry is not None:
+                        self._insert(entry)
+                        changed = True
+            elif kind == MODIFIED and idx is not None:
+                entry = FileEntry.from_path(self.all_files[idx].path)
+                if entry is None:
+                    self._remove_at(idx)
+                elif entry.is_dir == self.all_files[idx].is_dir:
+                    self.all_files[idx] = entry
+                else:
+                    self._remove_at(idx)
+                    self._insert(entry)
+                changed = True
+
+        if not changed:
+            return
+        if filtered:
+            self.search.reset()
+            self.files = self.search.apply(self.all_files, self.filter)
+            self._select_name(selected)
+        self.generation += 1
+        self._clamp_cursor()
+
+    def _find(self, name: str, is_dir: bool) -> Optional[int]:
+        # Symlinks to directories are listed as directories but reported as
+        # plain files by inotify, so try both groups
+        files = self.all_files
+        lower = name.lower()
+        for dir_group in (is_dir, not is_dir):
+            idx = bisect_entries(files, (not dir_group, lower))
+            while idx < len(files) and files[idx].sort_key == (not dir_group, lower):
+                if files[idx].name == name:
+                    return idx
+                idx += 1
+        return None
+
+    def _insert(self, entry: FileEntry):
+        idx = bisect_entries(self.all_files, entry.sort_key)
+        self.all_files.insert(idx, entry)
+        if self.files is self.all_files and idx <= self.cursor_pos and len(self.files) > 1:
+            self.cursor_pos += 1
+            if idx < self.scroll_offset:
+                self.scroll_offset += 1
+
+    def _remove_at(self, idx: int):
+        del self.all_files[idx]
+        if self.files is self.all_files and idx < self.cursor_pos:
+            self.cursor_pos -= 1
+            if idx < self.scroll_offset:
+                self.scroll_offset -= 1
+
+    def _set_files(self, entries: List[FileEntry], keep_selection=True):
+        """Replace the listing, optionally keeping the cursor on the same name"""
+        selected = self.get_selected() if keep_selection else ""
+        self.all_files = entries
+        if self.marked:
+            # Reload of the same directory: drop marks of vanished entries
+            self.marked &= {e.path for e in entries}
+            self._marks_changed()
+        self.search.reset()
+        self.files = self.search.apply(entries, self.filter)
+        self.generation += 1
+        self._select_name(selected)
+        self._clamp_cursor()
+
+    def _select_entry(self, entry: Optional[FileEntry]):
+        if entry is None:
+            return
         try:
-            files = os.listdir(self.path)
-            self.files = sorted(
-                files,
-                key=lambda x: (not os.path.isdir(os.path.join(self.path, x)), x.lower())
-            )
-            if self.filter:
-                self.files = [f for f in self.files if self.filter.lower() in f.lower()]
-        except PermissionError:
-            self.files = ["[Permission Denied]"]
+            self.cursor_pos = self.files.index(entry)
+        except ValueError:
+            pass
+
+    def _select_name(self, name: str):
+        if not name:
+            return
+        for idx, entry in enumerate(self.files):
+            if entry.name == name:
+                self.cursor_pos = idx
+                return
+
+    def _clamp_cursor(self):
+        if self.cursor_pos >= len(self.files):
+            self.cursor_pos = max(len(self.files) - 1, 0)
+        if not (self.scroll_offset <= self.cursor_pos < self.scroll_offset + self.visible_height):
+            self.scroll_offset = max(self.cursor_pos - self.visible_height // 2, 0)
 
     def navigate(self, direction: int, visible_height=10):
+        self.visible_height = visible_height
         if not self.files:
             return
 
@@ -39,19 +494,31 @@ class FilePanel:
         elif self.cursor_pos >= self.scroll_offset + visible_height:
             self.scroll_offset = self.cursor_pos - visible_height + 1
 
-    def get_selected(self) -> str:
+    def get_selected_entry(self) -> Optional[FileEntry]:
         if not self.files or self.cursor_pos >= len(self.files):
-            return ""
+            return None
         return self.files[self.cursor_pos]
 
+    def get_selected(self) -> str:
+        entry = self.get_selected_entry()
+        return entry.name if entry else ""
+
     def enter_directory(self):
-        selected = self.get_selected()
-        if selected and os.path.isdir(os.path.join(self.path, selected)):
-            self.path = os.path.join(self.path, selected)
+        entry = self.get_selected_entry()
+        if entry and entry.is_dir:
+            self.path = entry.path
             self.cursor_pos = 0
             self.scroll_offset = 0
             self.refresh_files()
 
+    def go_to(self, path: str, select_name=""):
+        """Show another directory, optionally placing the cursor on a name"""
+        self.path = path
+        self.cursor_pos = 0
+        self.scroll_offset = 0
+        self.select_after_load = select_name
+        self.refresh_files()
+
     def go_up(self):
         parent = os.path.dirname(self.path)
         if parent != self.path:
@@ -59,3 +526,49 @@ class FilePanel:
             self.cursor_pos = 0
             self.scroll_offset = 0
             self.refresh_files()
+
+
+class ResultPanel(FilePanel):
+    """Virtual panel filled by a background search instead of a directory.
+
+    Entries carry their real paths; the names shown are relative to the
+    search root. origin is the panel this one temporarily replaces.
+    """
+
+    virtual = True
+
+    def __init__(self, title: str, origin: FilePanel, source: DirectoryLoader):
+        self.origin = origin
+        self._source: Optional[DirectoryLoader] = source
+        self._last_source = source
+        super().__init__(title)
+
+    def summary(self) -> str:
+        status = getattr(self.loader or self._last_source, "status", None)
+        return status() + self.mark_summary() if status else super().summary()
+
+    def refresh_files(self):
+        # Results are streamed in once; later refreshes only drop the rows
+        # whose files were deleted, trashed or renamed meanwhile
+        if self._source is None:
+            if not self.loading:
+                self._drop_missing()
+            return
+        self.loader, self._last_source, self._source = self._source, self._source, None
+        self.loader_path = self.path
+        self.loader.wait(self.LOAD_GRACE)
+        self.poll_loader()
+
+    def _drop_missing(self):
+        remaining = [entry for entry in self.all_files if os.path.lexists(entry.path)]
+        if len(remaining) != len(self.all_files):
+            self._set_files(remaining)
+
+    def enter_directory(self):
+        pass
+
+    def go_up(self):
+        pass
+
+    def apply_changes(self, changes: List[Change]):
+        pass
@@ -0,0 +1,160 @@
+import curses
+from typing import List, Optional
+
+from row_model import Row
+
+
+class PanelView:
+    """Curses windows of one panel: the border box and its file rows.
+
+    Remembers what every row shows, so a frame only writes the rows whose
+    text or color changed (old and new cursor row, changed entries). When
+    the panel scrolled the rows window is shifted first and only the newly
+    exposed rows are written. Nothing reaches the terminal until doupdate.
+    """
+
+    def __init__(self):
+        self.box = None
+        self.rows = None
+        self.geometry = None
+        self.frame = None  # (active, summary) drawn on the border
+        self.painted: List[Optional[Row]] = []
+        self.panel = None
+        self.generation = -1
+        self.scroll_offset = 0
+
+    def reset(self):
+        self.geometry = None
+        self.panel = None
+
+    def place(self, y: int, x: int, height: int, width: int):
+        """Border box covering rows y..y+height and columns x..x+width"""
+        geometry = (y, x, height, width)
+        if geometry == self.geometry:
+            return
+        self.geometry = geometry
+        self.box = curses.newwin(height + 1, width + 1, y, x)
+        self.rows = self.box.derwin(max(height - 2, 1), max(width - 3, 1), 1, 2)
+        # Lets doupdate use the terminal's own scrolling when whole lines move
+        self.rows.idlok(True)
+        self.painted = [None] * max(height - 2, 1)
+        self.frame = None
+        self.panel = None
+
+    def draw_frame(self, active: bool, summary: str, border_attr: int, summary_attr: int):
+        if self.frame == (active, summary):
+            return
+        self.frame = (active, summary)
+        height, width = self.geometry[2], self.geometry[3]
+        box = self.box
+        box.attron(border_attr)
+        try:
+            for i in range(height + 1):
+                if i == 0:
+                    box.addstr(i, 0, "┌" + "─" * (width - 1) + "┐")
+                elif i == height:
+                    box.addstr(i, 0, "└" + "─" * (width - 1) + "┘")
+                else:
+                    box.addstr(i, 0, "│")
+                    box.addstr(i, width, "│")
+        except curses.error:
+            pass
+        box.attroff(border_attr)
+        try:
+            box.addstr(height, 2, summary[: width - 4], summary_attr)
+        except curses.error:
+            pass
+
+    def render(self, panel, rows: List[Row], color_for) -> int:
+        """Write the rows that differ from what is on screen, returns how many"""
+        if panel is not self.panel:
+            self.painted = [None] * len(self.painted)
+        elif panel.generation == self.generation:
+            self._shift(panel.scroll_offset - self.scroll_offset)
+        self.panel = panel
+        self.generation = panel.generation
+        self.scroll_offset = panel.scroll_offset
+
+        written = 0
+        columns = self.rows.getmaxyx()[1]
+        for i, row in enumerate(rows[: len(self.painted)]):
+            if row == self.painted[i]:
+                continue
+            line, pair = row
+            try:
+                self.rows.addstr(i, 0, line, color_for(pair))
+                # A longer row may have been here before (a full row wraps the cursor)
+                if len(line) < columns:
+                    self.rows.clrtoeol()
+            except curses.error:
+                pass
+            self.painted[i] = row
+            written += 1
+        return written
+
+    def _shift(self, lines: int):
+        if not lines or abs(lines) >= len(self.painted):
+            return
+        self.rows.scrollok(True)
+        self.rows.scroll(lines)
+        self.rows.scrollok(False)
+        if lines > 0:
+            self.painted = self.painted[lines:] + [None] * lines
+        else:
+            self.painted = [None] * -lines + self.painted[:lines]
+
+    def touch(self):
+        if self.box is not None:
+            self.box.touchwin()
+
+    def touch_screen_row(self, y: int):
+        if self.geometry is not None and 0 <= y - self.geometry[0] <= self.geometry[2]:
+            self.box.touchline(y - self.geometry[0], 1)
+
+    def noutrefresh(self):
+        if self.box is not None:
+            self.box.noutrefresh()
+            self.rows.noutrefresh()
+
+
+class Overlay:
+    """One-line window drawn over the panels (status, progress, message)"""
+
+    def __init__(self):
+        self.win = None
+        self.y: Optional[int] = None
+        self.content = None
+
+    def reset(self):
+        self.win = None
+        self.y = None
+        self.content = None
+
+    def show(self, y: int, x: int, text: str, attr: int) -> Optional[int]:
+        """Returns the screen row it covered before if it changed, else None"""
+        if not text:
+            return self.hide()
+        content = (y, x, text, attr)
+        if content == self.content:
+            return None
+        previous = self.y if self.y is not None else y
+        if self.win is None or self.content[:2] != (y, x) or len(self.content[2]) != len(text):
+            self.win = curses.newwin(1, len(text), y, x)
+        try:
+            self.win.addstr(0, 0, text, attr)
+        except curses.error:
+            pass
+        self.y = y
+        self.content = content
+        return previous
+
+    def hide(self) -> Optional[int]:
+        previous = self.y
+        self.reset()
+        return previous
+
+    def noutrefresh(self):
+        # Windows below may have repainted this row, so always copy it again
+        if self.win is not None:
+            self.win.touchwin()
+            self.win.noutrefresh()
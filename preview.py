@@ -0,0 +1,172 @@
+import os
+import mmap
+import stat
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Rendered previews kept in memory (approximate characters)
+PREVIEW_CACHE_BYTES = 4 * 1024 * 1024
+# Longest line kept for the preview pane
+PREVIEW_MAX_COLS = 512
+# Bytes looked at to tell text from binary
+SNIFF_BYTES = 4096
+# How far past a truncated line we look for its end before giving up
+LINE_SCAN = 64 * 1024
+
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
+
+# (st_dev, st_ino, st_mtime_ns), or the path for entries without an inode
+Key = Tuple
+
+
+class Preview:
+    """Lines showing the head of one file, as text or as a hex dump.
+
+    rows/cols record how much was rendered: a text preview is reused for
+    any width, a hex dump only for the width it was laid out for.
+    """
+
+    # Read by PanelView.render; a preview never scrolls
+    generation = 0
+    scroll_offset = 0
+
+    def __init__(self, lines: List[str], rows: int, cols: int = 0,
+                 complete=True, binary=False, summary=""):
+        self.lines = lines
+        self.rows = rows
+        self.cols = cols
+        self.complete = complete
+        self.binary = binary
+        self.summary = summary
+
+    @property
+    def weight(self) -> int:
+        return sum(len(line) for line in self.lines) + 64
+
+    def covers(self, rows: int, cols: int) -> bool:
+        if self.binary and cols != self.cols:
+            return False
+        return self.complete or self.rows >= rows
+
+
+def message(text: str) -> Preview:
+    return Preview([text], 1)
+
+
+def looks_binary(sample: bytes) -> bool:
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    return len(sample.translate(None, _TEXT_BYTES)) > len(sample) // 10
+
+
+def _text_lines(data: mmap.mmap, rows: int) -> Tuple[List[str], bool]:
+    """First rows lines; reads up to the last byte shown and no further"""
+    lines = []
+    pos, size = 0, len(data)
+    limit = PREVIEW_MAX_COLS * 4  # utf-8 worst case
+    while len(lines) < rows and pos < size:
+        end = data.find(b"\n", pos, min(size, pos + limit))
+        if end < 0:
+            end = min(size, pos + limit)
+            # Too long to show whole: skip to the real end of the line
+            nxt = data.find(b"\n", end, min(size, end + LINE_SCAN)) if end < size else size
+            if nxt < 0:
+                lines.append(printable(data[pos:end])[:PREVIEW_MAX_COLS])
+                return lines, False
+        else:
+            nxt = end
+        lines.append(printable(data[pos:end])[:PREVIEW_MAX_COLS])
+        pos = nxt + 1
+    return lines, pos >= size
+
+
+def printable(raw: bytes) -> str:
+    """One line of file content as text safe to hand to curses"""
+    text = raw.decode("utf-8", errors="replace").rstrip("\r").expandtabs(4)
+    return "".join(ch if ch.isprintable() else "." for ch in text)
+
+
+def hex_width(cols: int) -> int:
+    """Bytes per hex dump line that fit cols columns (a multiple of 4)"""
+    return max(4, (cols - 12) // 4 // 4 * 4)
+
+
+def _hex_lines(data: mmap.mmap, rows: int, cols: int) -> Tuple[List[str], bool]:
+    per_line = hex_width(cols)
+    end = min(len(data), rows * per_line)
+    lines = []
+    for offset in range(0, end, per_line):
+        chunk = data[offset: offset + per_line]
+        hex_part = " ".join(f"{b:02x}" for b in chunk).ljust(per_line * 3 - 1)
+        text_part = "".join(chr(b) if 0x20 <= b < 0x7F else "." for b in chunk)
+        lines.append(f"{offset:08x}  {hex_part}  {text_part}")
+    return lines, end >= len(data)
+
+
+def render(path: str, st: os.stat_result, rows: int, cols: int) -> Preview:
+    """Map the file and render only the part the pane can show"""
+    if stat.S_ISDIR(st.st_mode):
+        return message("<DIR>")
+    if not stat.S_ISREG(st.st_mode):
+        return message("<not a regular file>")
+    if st.st_size == 0:
+        return Preview([], rows, summary="empty")
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            binary = looks_binary(data[:SNIFF_BYTES])
+            if binary:
+                lines, complete = _hex_lines(data, rows, cols)
+            else:
+                lines, complete = _text_lines(data, rows)
+    except (OSError, ValueError) as e:
+        return message(f"Error: {e}")
+    return Preview(lines, rows, cols, complete, binary, "hex" if binary else "text")
+
+
+class PreviewCache:
+    """LRU of rendered previews bounded by PREVIEW_CACHE_BYTES.
+
+    Keyed by (device, inode, mtime), so a file that changes is rendered
+    again while moving back and forth over big files costs nothing.
+    """
+
+    def __init__(self, max_bytes: int = PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items: "OrderedDict[Key, Preview]" = OrderedDict()
+
+    @staticmethod
+    def key_for(entry) -> Optional[Key]:
+        st = entry.stat
+        if st is None:
+            return None
+        # st_ino 0: synthetic entries such as archive members
+        return (st.st_dev, st.st_ino, st.st_mtime_ns) if st.st_ino else (entry.path,)
+
+    def get(self, entry, rows: int, cols: int) -> Preview:
+        key = self.key_for(entry)
+        if key is None:
+            return message("<no info>")
+        preview = self.items.get(key)
+        if preview is not None and preview.covers(rows, cols):
+            self.items.move_to_end(key)
+            return preview
+
+        if not entry.stat.st_ino:
+            preview = message("<inside archive>")
+        else:
+            preview = render(entry.path, entry.stat, rows, cols)
+        self._store(key, preview)
+        return preview
+
+    def _store(self, key: Key, preview: Preview):
+        old = self.items.pop(key, None)
+        if old is not None:
+            self.size -= old.weight
+        self.items[key] = preview
+        self.size += preview.weight
+        while self.size > self.max_bytes and len(self.items) > 1:
+            _key, dropped = self.items.popitem(last=False)
+            self.size -= dropped.weight
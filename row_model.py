@@ -0,0 +1,93 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Color pair numbers (see colors.settings)
+PAIR_FILE = 1
+PAIR_SELECTED = 5
+PAIR_DIR = 6
+PAIR_DIR_SELECTED = 7
+PAIR_MARKED = 13
+PAIR_MARKED_SELECTED = 14
+
+Row = Tuple[str, int]
+
+
+class RowModel:
+    """Per-panel cache of formatted rows and their color pairs.
+
+    Every entry is formatted once per panel generation and width; cursor
+    moves only switch between the cached normal and selected variants.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.width = 0
+        self.generation = -1
+        self.sizes_version = -1
+        self.mark_version = -1
+        self.rows: Dict[int, List[Optional[Row]]] = {}
+
+    def invalidate(self):
+        self.rows.clear()
+
+    def format_row(self, entry, width: int, selected: bool, icon_for: Callable, dir_sizer=None, marked=False) -> Row:
+        name = entry.name
+        is_dir = entry.is_dir
+
+        if is_dir:
+            size_str = dir_sizer.label(entry) if dir_sizer else "<DIR>"
+        else:
+            size = entry.size
+            size_str = f"{size} B" if size is not None else "N/A"
+
+        icon = icon_for(entry, selected)
+        name_trim = name if len(name) <= width - 20 else name[:width - 23] + "..."
+        display_name = f"{icon} {name_trim}"
+        line = f"{display_name:<{width - 15}} {size_str:>10}"[: width - 3]
+
+        if marked:
+            pair = PAIR_MARKED_SELECTED if selected else PAIR_MARKED
+        elif selected:
+            pair = PAIR_DIR_SELECTED if is_dir else PAIR_SELECTED
+        else:
+            pair = PAIR_DIR if is_dir else PAIR_FILE
+        return line, pair
+
+    def visible_rows(self, count: int, width: int, icon_for: Callable, dir_sizer=None) -> List[Row]:
+        """Rows for the panel's scroll window, padded with blanks to count"""
+        panel = self.panel
+        sizes_version = dir_sizer.version if dir_sizer else 0
+        if (
+            width != self.width
+            or panel.generation != self.generation
+            or sizes_version != self.sizes_version
+            or panel.mark_version != self.mark_version
+        ):
+            self.rows.clear()
+            self.width = width
+            self.generation = panel.generation
+            self.sizes_version = sizes_version
+            self.mark_version = panel.mark_version
+
+        files = panel.files
+        start = panel.scroll_offset
+        end = min(start + count, len(files))
+        cursor = panel.cursor_pos
+        marked = panel.marked
+        rows = []
+
+        for idx in range(start, end):
+            selected = idx == cursor
+            cached = self.rows.get(idx)
+            if cached is None:
+                cached = self.rows[idx] = [None, None]
+            row = cached[selected]
+            if row is None:
+                entry = files[idx]
+                row = cached[selected] = self.format_row(
+                    entry, width, selected, icon_for, dir_sizer, entry.path in marked
+                )
+            rows.append(row)
+
+        blank = (" " * max(width - 3, 0), PAIR_FILE)
+        rows.extend([blank] * (count - len(rows)))
+        return rows
@@ -0,0 +1,84 @@
+import re
+from itertools import compress
+from typing import List, Tuple
+
+# Characters that start a new "word" inside a file name
+WORD_SEPARATORS = "._- "
+
+
+class SearchFilter:
+    """Incremental in-memory filter over a panel's entry list.
+
+    Each typed character narrows the previous result set; backspace pops
+    cached results off the stack instead of filtering again.
+    """
+
+    def __init__(self):
+        self.query = ""
+        self.fuzzy = False
+        # (query, matching entries, their lowercase names)
+        self.stack: List[Tuple[str, list, List[str]]] = []
+
+    def reset(self):
+        """Forget cached results, e.g. after the underlying list changed"""
+        self.stack.clear()
+
+    def clear(self):
+        self.query = ""
+        self.stack.clear()
+
+    def set_fuzzy(self, fuzzy: bool):
+        self.fuzzy = fuzzy
+        self.stack.clear()
+
+    def apply(self, entries: list, query: str) -> list:
+        """Filter entries for query, reusing results of its longest prefix"""
+        self.query = query
+        if not query:
+            self.stack.clear()
+            return entries
+
+        stack = self.stack
+        while stack and not query.startswith(stack[-1][0]):
+            stack.pop()
+        if stack and stack[-1][0] == query:
+            return stack[-1][1]
+
+        if stack:
+            base, names = stack[-1][1], stack[-1][2]
+        else:
+            base, names = entries, [e.sort_key[1] for e in entries]
+        results, result_names = self._match(base, names, query.lower())
+        stack.append((query, results, result_names))
+        return results
+
+    def match(self, entries: list, query: str) -> list:
+        """Filter entries from scratch (no stack) for the current mode"""
+        names = [e.sort_key[1] for e in entries]
+        return self._match(entries, names, query.lower())[0]
+
+    def _match(self, entries: list, names: List[str], query: str):
+        if not self.fuzzy:
+            hits = [query in name for name in names]
+            return list(compress(entries, hits)), list(compress(names, hits))
+
+        # Rank by gap (0 for a plain substring), then word-boundary start,
+        # then match position and name length; lower is better
+        pattern = re.compile(".*?".join(map(re.escape, query)))
+        hits = list(map(pattern.search, names))
+        qlen = len(query)
+        scored = []
+        for idx in compress(range(len(names)), hits):
+            name = names[idx]
+            pos = name.find(query)
+            if pos >= 0:
+                gap = 0
+            else:
+                m = hits[idx]
+                pos = m.start()
+                gap = m.end() - pos - qlen
+            boundary = pos == 0 or name[pos - 1] in WORD_SEPARATORS
+            scored.append((gap, not boundary, pos, len(name), idx))
+        scored.sort()
+        order = [key[-1] for key in scored]
+        return [entries[idx] for idx in order], [names[idx] for idx in order]
@@ -0,0 +1,269 @@
+import os
+import stat
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from copy_engine import candidate_paths, unique_destination
+from event_loop import notify
+from jobs import DeleteJob, PRIORITY_LOW
+from panel import DirectoryLoader, FileEntry, ResultPanel, sort_entries
+
+INFO_SUFFIX = ".trashinfo"
+TRASH_TITLE = "Trash"
+
+
+def home_trash() -> str:
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "Trash")
+
+
+def _device(path: str) -> Optional[int]:
+    """st_dev of path or of its nearest existing ancestor"""
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def mount_point(path: str) -> str:
+    path = os.path.abspath(path)
+    dev = os.lstat(path).st_dev
+    while path != "/":
+        parent = os.path.dirname(path)
+        if os.lstat(parent).st_dev != dev:
+            break
+        path = parent
+    return path
+
+
+def topdir_trashes(topdir: str) -> List[str]:
+    """Candidate trash directories of a mount point, per the freedesktop spec"""
+    uid = str(os.getuid())
+    shared = os.path.join(topdir, ".Trash")
+    candidates = []
+    try:
+        st = os.lstat(shared)
+        # Admin-created .Trash must be a real sticky directory
+        if stat.S_ISDIR(st.st_mode) and st.st_mode & stat.S_ISVTX:
+            candidates.append(os.path.join(shared, uid))
+    except OSError:
+        pass
+    candidates.append(os.path.join(topdir, f".Trash-{uid}"))
+    return candidates
+
+
+def _ensure(trash_dir: str) -> bool:
+    try:
+        os.makedirs(os.path.join(trash_dir, "files"), mode=0o700, exist_ok=True)
+        os.makedirs(os.path.join(trash_dir, "info"), mode=0o700, exist_ok=True)
+        return True
+    except OSError:
+        return False
+
+
+def trash_dir_for(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """(trash dir on the same filesystem as path, topdir or None for home)"""
+    dev = _device(os.path.dirname(os.path.abspath(path)))
+    home = home_trash()
+    if dev is not None and dev == _device(home):
+        return (home, None) if _ensure(home) else (None, None)
+
+    topdir = mount_point(os.path.dirname(os.path.abspath(path)))
+    for candidate in topdir_trashes(topdir):
+        if _ensure(candidate):
+            return candidate, topdir
+    return None, None
+
+
+def known_trashes() -> List[Tuple[str, Optional[str]]]:
+    """Home trash plus the per-mount trashes that exist right now"""
+    trashes = [(home_trash(), None)]
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1].replace("\\040", " ") for line in f]
+    except OSError:
+        mounts = ["/"]
+    for topdir in mounts:
+        for candidate in topdir_trashes(topdir):
+            if os.path.isdir(os.path.join(candidate, "info")):
+                trashes.append((candidate, topdir))
+    return trashes
+
+
+def move_to_trash(path: str) -> str:
+    """Rename path into its filesystem's trash, returns the trashed path"""
+    trash_dir, topdir = trash_dir_for(path)
+    if trash_dir is None:
+        raise OSError(f"No trash available for {path}")
+
+    original = os.path.abspath(path)
+    stored = os.path.relpath(original, topdir) if topdir else original
+    info = (
+        "[Trash Info]\n"
+        f"Path={quote(stored)}\n"
+        f"DeletionDate={time.strftime('%Y-%m-%dT%H:%M:%S')}\n"
+    )
+
+    # Reserve the name through the info file first (O_EXCL), as the spec asks
+    name = os.path.basename(original.rstrip("/"))
+    for target in candidate_paths(os.path.join(trash_dir, "files", name)):
+        if os.path.lexists(target):
+            continue
+        info_path = os.path.join(trash_dir, "info", os.path.basename(target) + INFO_SUFFIX)
+        try:
+            fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(info)
+        break
+
+    try:
+        os.rename(original, target)
+    except OSError:
+        os.remove(info_path)
+        raise
+    return target
+
+
+def info_path_for(trashed: str) -> str:
+    trash_dir = os.path.dirname(os.path.dirname(trashed))
+    return os.path.join(trash_dir, "info", os.path.basename(trashed) + INFO_SUFFIX)
+
+
+def read_info(info_path: str, topdir: Optional[str]) -> Tuple[str, float]:
+    """(original path, deletion time) from a .trashinfo file"""
+    original, deleted = "", 0.0
+    with open(info_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            key, _, value = line.strip().partition("=")
+            if key == "Path":
+                original = unquote(value)
+                if topdir and not os.path.isabs(original):
+                    original = os.path.join(topdir, original)
+            elif key == "DeletionDate":
+                try:
+                    deleted = time.mktime(time.strptime(value, "%Y-%m-%dT%H:%M:%S"))
+                except ValueError:
+                    pass
+    return original, deleted
+
+
+def restore(trashed: str) -> str:
+    """Move a trashed item back to where it came from, returns that path"""
+    info_path = info_path_for(trashed)
+    trash_dir = os.path.dirname(os.path.dirname(trashed))
+    topdir = None if trash_dir == home_trash() else mount_point(trash_dir)
+    original, _deleted = read_info(info_path, topdir)
+    if not original:
+        raise OSError(f"No original path recorded for {os.path.basename(trashed)}")
+    os.makedirs(os.path.dirname(original), exist_ok=True)
+    dest = unique_destination(original)
+    os.rename(trashed, dest)
+    os.remove(info_path)
+    return dest
+
+
+def list_trash(max_age_days: Optional[float] = None):
+    """Yield (trashed path, original path, deletion time, topdir) over all trashes.
+
+    With max_age_days only items deleted longer ago than that are listed.
+    """
+    cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    for trash_dir, topdir in known_trashes():
+        info_dir = os.path.join(trash_dir, "info")
+        try:
+            names = os.listdir(info_dir)
+        except OSError:
+            continue
+        for info_name in names:
+            if not info_name.endswith(INFO_SUFFIX):
+                continue
+            trashed = os.path.join(trash_dir, "files", info_name[: -len(INFO_SUFFIX)])
+            try:
+                original, deleted = read_info(os.path.join(info_dir, info_name), topdir)
+            except OSError:
+                continue
+            if cutoff is not None and deleted > cutoff:
+                continue
+            yield trashed, original, deleted, topdir
+
+
+class TrashLister(DirectoryLoader):
+    """Lists trashed items for the trash panel, named by original path"""
+
+    def __init__(self):
+        self.count = 0
+        super().__init__("trash:")
+
+    def _run(self):
+        entries: List[FileEntry] = []
+        for trashed, original, _deleted, _topdir in list_trash():
+            if self.cancelled:
+                break
+            entry = FileEntry.from_path(trashed)
+            if entry is None:
+                continue
+            entry.name = original or os.path.basename(trashed)
+            entry.sort_key = (not entry.is_dir, entry.name.lower())
+            entries.append(entry)
+            self.count += 1
+        sort_entries(entries)
+        with self.lock:
+            self.pending.extend(entries)
+            self.result = entries
+            self.done = True
+        notify()
+
+    def status(self) -> str:
+        return f"{self.count} items in trash"
+
+
+class TrashPanel(ResultPanel):
+    """Virtual panel over all trash directories; Enter restores"""
+
+    def __init__(self, origin):
+        super().__init__(TRASH_TITLE, origin, TrashLister())
+
+    def refresh_files(self):
+        if self._source is None:
+            self._source = TrashLister()
+        super().refresh_files()
+
+
+class PurgeJob(DeleteJob):
+    """Permanently removes trashed items and their info files.
+
+    Items are collected when the job starts: everything in the trash, or
+    with max_age_days only what was deleted longer ago than that.
+    """
+
+    kind = "Purge"
+
+    def __init__(self, max_age_days: Optional[float] = None, trashed: Optional[List[str]] = None):
+        title = "trash" if max_age_days is None else f"trash older than {max_age_days:g} days"
+        super().__init__([], title, PRIORITY_LOW)
+        self.touched = [TRASH_TITLE]
+        self.max_age_days = max_age_days
+        self.trashed = trashed
+
+    def work(self):
+        if self.trashed is None:
+            self.trashed = [item[0] for item in list_trash(self.max_age_days)]
+        for path in self.trashed:
+            self.paths.append(path)
+            self.paths.append(info_path_for(path))
+        self.result = f"Purged {len(self.trashed)} items from the trash"
+        super().work()
+
+    def _unlink(self, path: str, remove):
+        # An info file without its item (or the reverse) is fine to skip
+        if os.path.lexists(path):
+            super()._unlink(path, remove)
+        else:
+            self.done_files += 1
@@ -0,0 +1,152 @@
+import os
+import ctypes
+import ctypes.util
+import struct
+from typing import Dict, Iterable, List, Tuple
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o0004000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+_EVENT = struct.Struct("iIII")
+
+# Change kinds handed to FilePanel.apply_changes
+CREATED = "create"
+DELETED = "delete"
+MODIFIED = "modify"
+RESET = "reset"
+
+Change = Tuple[str, str, bool]
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    """Watches the directories shown by the panels through Linux inotify"""
+
+    def __init__(self):
+        self.fd = -1
+        self.wd_paths: Dict[int, str] = {}
+        self.path_wds: Dict[str, int] = {}
+        self.libc = _load_libc()
+        if self.libc is not None:
+            self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+    @property
+    def available(self) -> bool:
+        return self.fd >= 0
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def watching(self, path: str) -> bool:
+        return path in self.path_wds
+
+    def sync(self, paths: Iterable[str]):
+        """Watch exactly the given directories"""
+        if not self.available:
+            return
+        wanted = set(paths)
+
+        for path in list(self.path_wds):
+            if path not in wanted:
+                self.libc.inotify_rm_watch(self.fd, self.path_wds.pop(path))
+
+        for path in wanted:
+            if path in self.path_wds:
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd >= 0:
+                self.wd_paths[wd] = path
+                self.path_wds[path] = wd
+
+    def read_events(self) -> Dict[str, List[Change]]:
+        """Drain pending events, grouped per watched directory"""
+        changes: Dict[str, List[Change]] = {}
+        if not self.available:
+            return changes
+
+        modified: Dict[str, set] = {}
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    for path in self.path_wds:
+                        changes[path] = [(RESET, "", False)]
+                    continue
+
+                path = self.wd_paths.get(wd)
+                if path is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self.wd_paths.pop(wd, None)
+                    if self.path_wds.get(path) == wd:
+                        del self.path_wds[path]
+                    continue
+
+                is_dir = bool(mask & IN_ISDIR)
+                pending = changes.setdefault(path, [])
+                seen = modified.setdefault(path, set())
+
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    pending.append((RESET, "", True))
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    seen.discard(name)
+                    pending.append((CREATED, name, is_dir))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    seen.discard(name)
+                    pending.append((DELETED, name, is_dir))
+                elif mask & (IN_MODIFY | IN_ATTRIB):
+                    # Constantly written files only need one restat per poll
+                    if name not in seen:
+                        seen.add(name)
+                        pending.append((MODIFIED, name, is_dir))
+
+        return changes
+
+    def close(self):
+        if self.available:
+            os.close(self.fd)
+            self.fd = -1
+        self.wd_paths.clear()
+        self.path_wds.clear()